@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""📍 地址解析：建築地點 → 行政區，所有別名一次掃完 (keyword_automaton)。
+
+- 各城市給自己的行政區表 (含改制前的鄉鎮市舊名 → 現在的區)
+- 先正規化 (全形轉半形、去多餘空白)，同一個地址只解析一次 (LRU 快取，大量回補時重複地址很多)
+
+    resolver = AddressResolver(KAOHSIUNG_DISTRICTS, aliases=county_aliases(KAOHSIUNG_DISTRICTS[11:]))
+    resolver.resolve("高雄市鳳山區文化段 123-4 地號")
+    → ResolvedAddress(district="鳳山區", matched="鳳山區", normalized="高雄市鳳山區文化段 123-4 地號")
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import NamedTuple
+
+from keyword_automaton import KeywordAutomaton
+
+_SPACE_RE = re.compile(r"\s+")
+_CITY_PREFIX_RE = re.compile(r"^[\u4e00-\u9fff]{2}[縣市]")
+
+
+class ResolvedAddress(NamedTuple):
+    district: str      # 標準行政區名 (舊名已轉成現在的區)
+    matched: str       # 原文中實際比對到的字 (清理地點時要拿掉的)
+    normalized: str
+
+
+def normalize_address(text):
+    """全形英數 → 半形、合併空白 (NFKC)，臺 / 台 不動"""
+    return _SPACE_RE.sub(" ", unicodedata.normalize("NFKC", text or "")).strip()
+
+
+def county_aliases(districts):
+    """縣市合併前的鄉 / 鎮 / 市舊名 → 現在的區 (例：鳳山市、岡山鎮、大寮鄉)"""
+    return {d[:-1] + suffix: d for d in districts for suffix in "鄉鎮市"}
+
+
+class AddressResolver:
+    """districts: 行政區表；aliases: {舊名 / 別名: 標準區名}；
+    fallback_re: 字典沒中時的備援樣式 (第 1 組 = 行政區)，None = 留空不猜"""
+
+    def __init__(self, districts, aliases=None, fallback_re=None, cache_size=65536):
+        self.district_ac = KeywordAutomaton({**(aliases or {}), **{d: d for d in districts}})
+        self.fallback_re = fallback_re
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def _resolve(self, text):
+        norm = normalize_address(text)
+        hit = self.district_ac.leftmost_longest(norm)
+        if hit: return ResolvedAddress(hit[3], hit[2], norm)
+        if self.fallback_re:
+            # 字典沒中：先拿掉開頭的「XX市 / XX縣」，備援樣式才不會把城市名當成區
+            m = self.fallback_re.search(_CITY_PREFIX_RE.sub("", norm))
+            if m: return ResolvedAddress(m.group(1), m.group(1), norm)
+        return ResolvedAddress("", "", norm)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""⏱️ 瀏覽器模式基準測試：完整 Chrome vs 精簡模式 (driver_pool.PROFILES)，比每頁載入時間與記憶體。
+
+    # 兩個城市的查詢頁各載 20 次
+    python browser_bench.py
+    # 指定網址 (例如某張詳情頁)、次數、只比某些模式
+    python browser_bench.py --url https://buildmis.kcg.gov.tw/bupic/pages/querylic --rounds 50 --profile lean
+
+每個模式開一台新的 Chrome，輪流載入各網址，等到 body 出現且 innerText 非空才算載完
+(爬蟲只讀文字，量的就是「能開始讀」的時間)；RSS 是 chromedriver + Chrome 所有子行程的總和。
+"""
+import argparse
+import statistics
+import time
+
+from driver_pool import PROFILES, launch_driver, driver_rss_mb
+from page_waits import wait_for, js_truthy
+
+DEFAULT_URLS = [
+    "https://buildmis.kcg.gov.tw/bupic/pages/querylic",
+    "https://building.tycg.gov.tw/bupic/preLoginFormAction.do",
+]
+
+
+def bench_profile(profile, urls, rounds, timeout=30):
+    options_factory, on_launch = PROFILES[profile]
+    t0 = time.monotonic()
+    driver = launch_driver(options_factory, on_launch)
+    launch_s = time.monotonic() - t0
+    text_ready = js_truthy("return !!document.body && document.body.innerText.trim().length > 0;")
+    times, rss, failures = [], [], 0
+    try:
+        for _ in range(rounds):
+            for url in urls:
+                t0 = time.monotonic()
+                try:
+                    driver.get(url)
+                    if not wait_for(driver, text_ready, timeout): raise TimeoutError(url)
+                    times.append(time.monotonic() - t0)
+                except Exception:
+                    failures += 1
+                mb = driver_rss_mb(driver)
+                if mb: rss.append(mb)
+    finally:
+        driver.quit()
+    return {
+        "profile": profile,
+        "launch_s": launch_s,
+        "pages": len(times),
+        "failures": failures,
+        "p50_s": statistics.median(times) if times else None,
+        "mean_s": statistics.fmean(times) if times else None,
+        "rss_mb": max(rss) if rss else None,
+    }
+
+
+def _fmt(v, spec):
+    return format(v, spec) if v is not None else "-"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="瀏覽器模式基準測試 (完整 vs 精簡)")
+    ap.add_argument("--url", action="append", help="要載入的網址 (可多個，預設兩個城市的查詢頁)")
+    ap.add_argument("--rounds", type=int, default=20, help="每個網址載入幾次")
+    ap.add_argument("--profile", action="append", choices=sorted(PROFILES), help="只比某些模式 (預設全部)")
+    args = ap.parse_args()
+
+    urls = args.url or DEFAULT_URLS
+    results = [bench_profile(p, urls, args.rounds) for p in (args.profile or ["full", "lean"])]
+
+    print(f"\n{'模式':<6}{'啟動':>8}{'頁數':>6}{'失敗':>6}{'中位數':>9}{'平均':>9}{'RSS 峰值':>11}")
+    for r in results:
+        print(f"{r['profile']:<6}{_fmt(r['launch_s'], '7.2f')}s{r['pages']:>6}{r['failures']:>6}"
+              f"{_fmt(r['p50_s'], '8.3f')}s{_fmt(r['mean_s'], '8.3f')}s{_fmt(r['rss_mb'], '9.0f')}MB")
+    base = {r["profile"]: r for r in results}
+    if "full" in base and "lean" in base and base["full"]["p50_s"] and base["lean"]["p50_s"]:
+        full, lean = base["full"], base["lean"]
+        line = f"\n🪶 精簡模式每頁省 {full['p50_s'] - lean['p50_s']:.3f}s (中位數)"
+        if full["rss_mb"] and lean["rss_mb"]: line += f"，記憶體省 {full['rss_mb'] - lean['rss_mb']:.0f}MB"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
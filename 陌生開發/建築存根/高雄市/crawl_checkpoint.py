@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""💾 斷點續爬：每個 (城市, 年份) 一份只追加的 JSONL 紀錄檔。
+
+每查完一個號碼就寫一行 {"n": 號碼, "s": 狀態, "t": 時間}，寫入後立即 fsync。
+重啟時讀回來：
+- found / empty 直接跳過，不再打網站
+- failed (逾時、連線異常、驗證碼讀不到) 重新查
+同一個號碼若有多行，以最後一行為準。
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+FOUND = "found"
+EMPTY = "empty"
+FAILED = "failed"
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class CrawlCheckpoint:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._status = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path): return
+        bad = 0
+        line = "\n"
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                    self._status[int(row["n"])] = row["s"]
+                except Exception:
+                    bad += 1  # 崩潰時最後一行可能只寫一半
+        if not line.endswith("\n"):
+            # 補上換行，避免下一筆接在半行後面
+            with open(self.path, "a", encoding="utf-8") as f: f.write("\n")
+        c = self.counts()
+        logger.info(f"📌 讀取斷點 {os.path.basename(self.path)} | 有資料 {c[FOUND]} | 空號 {c[EMPTY]} | 待重試 {c[FAILED]}"
+                    + (f" | 略過損毀 {bad} 行" if bad else ""))
+
+    def reload(self):
+        """重讀紀錄檔 (分片模式：別的行程也在追加同一個檔，接手租約前先同步)"""
+        with self._lock:
+            self._status = {}
+            self._load()
+
+    def status(self, number):
+        return self._status.get(number)
+
+    def should_fetch(self, number):
+        """沒查過或上次失敗才需要查"""
+        return self._status.get(number, FAILED) == FAILED
+
+    def mark(self, number, status):
+        line = json.dumps({"n": number, "s": status, "t": round(time.time())}) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._status[number] = status
+
+    def reopen(self, numbers):
+        """把這些號碼中的空號改回「待查」(只改記憶體，不寫檔)，回傳重開幾號
+
+        增量模式用：前沿附近昨天還是空號，今天可能已經發出來了。
+        """
+        with self._lock:
+            empties = [n for n in numbers if self._status.get(n) == EMPTY]
+            for n in empties: del self._status[n]
+        return len(empties)
+
+    def found_numbers(self):
+        return sorted(n for n, s in self._status.items() if s == FOUND)
+
+    def max_found(self):
+        found = self.found_numbers()
+        return found[-1] if found else None
+
+    def counts(self):
+        c = {FOUND: 0, EMPTY: 0, FAILED: 0}
+        for s in self._status.values():
+            c[s] = c.get(s, 0) + 1
+        return c
+
+
+def open_checkpoint(folder, city, year):
+    """同一份紀錄檔在行程內只開一個實例，讓多個 worker 共用鎖與狀態"""
+    path = os.path.join(folder, f"checkpoint_{city}_{year}.jsonl")
+    with _registry_lock:
+        if path not in _registry:
+            os.makedirs(folder, exist_ok=True)
+            _registry[path] = CrawlCheckpoint(path)
+        return _registry[path]
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""📮 分片租約佇列：(城市, 年份, 號碼區間) 切成一張張租約放在 SQLite 檔，多個行程 / 多台主機搶著做。
+
+- 協調者 plan()：把每年要掃的範圍切成固定大小的區間 (同一輪 run 重複 plan 同一區間不會重複建立；
+  每日增量用日期當 run，隔天同一區間可以再發)
+- worker claim()：取一張「待做」或「租約已過期」的租約，寫上自己的名字與到期時間
+- 做的時候定期 renew() 續約；做完 complete()，放棄 release()
+- worker 當掉沒續約，租約到期後自動被別人接手；同一張被接手超過 max_attempts 次就不再發 (看 status)
+
+多台主機共用目錄時：佇列檔放在共用目錄，用 journal_mode=DELETE (WAL 需要共用記憶體，網路磁碟上不可靠)；
+每筆操作各開一次連線、BEGIN IMMEDIATE 取寫鎖，行程之間不共用任何狀態。
+"""
+import logging
+import os
+import sqlite3
+import time
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+SKIPPED = "skipped"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run TEXT NOT NULL DEFAULT '',
+    city TEXT NOT NULL,
+    year TEXT NOT NULL,
+    lo INTEGER NOT NULL,
+    hi INTEGER NOT NULL,
+    stop_loss INTEGER,
+    status TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    expires_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    found INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    UNIQUE (run, city, year, lo, hi)
+);
+CREATE INDEX IF NOT EXISTS idx_leases_status ON leases (status, expires_at);
+"""
+
+
+class Lease(NamedTuple):
+    id: int
+    run: str
+    city: str
+    year: str
+    lo: int
+    hi: int
+    stop_loss: int     # 租約內連續幾號無資料就停；None = 整段掃完
+    owner: str
+    attempts: int
+
+
+def split_range(lo, hi, shard_size):
+    """[lo, hi] → [(lo, lo+size-1), ...]"""
+    return [(a, min(a + shard_size - 1, hi)) for a in range(lo, hi + 1, shard_size)]
+
+
+class LeaseQueue:
+    def __init__(self, path, journal_mode="DELETE", max_attempts=5):
+        self.path = path
+        self.journal_mode = journal_mode
+        self.max_attempts = max_attempts
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        conn = self._connect()
+        try: conn.executescript(_SCHEMA)
+        finally: conn.close()
+
+    def _connect(self):
+        # autocommit，交易自己用 BEGIN IMMEDIATE 開；忙碌時等別的行程放鎖
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+        return conn
+
+    def _update(self, sql, args):
+        conn = self._connect()
+        try: return conn.execute(sql, args).rowcount
+        finally: conn.close()
+
+    def plan(self, city, year, lo, hi, shard_size=100, stop_loss=None, run=""):
+        """切區間寫入佇列，回傳新增幾張 (已存在的不動)"""
+        now = time.time()
+        rows = [(run, city, str(year), a, b, stop_loss, now) for a, b in split_range(lo, hi, shard_size)]
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO leases (run, city, year, lo, hi, stop_loss, updated_at)"
+                             " VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            added = conn.total_changes - before
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return added
+
+    def claim(self, owner, ttl, city=None):
+        """取一張待做 / 已過期的租約，沒有了回傳 None"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, run, city, year, lo, hi, stop_loss, status, owner, attempts FROM leases"
+                " WHERE (status = ? OR (status = ? AND expires_at < ?)) AND attempts < ?"
+                + (" AND city = ?" if city else "") +
+                " ORDER BY status = ?, id LIMIT 1",
+                (PENDING, LEASED, now, self.max_attempts) + ((city,) if city else ()) + (LEASED,)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            lease_id, run, c, year, lo, hi, stop_loss, status, old_owner, attempts = row
+            conn.execute("UPDATE leases SET status = ?, owner = ?, expires_at = ?, attempts = attempts + 1,"
+                         " updated_at = ? WHERE id = ?", (LEASED, owner, now + ttl, now, lease_id))
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        if status == LEASED:
+            logger.warning(f"♻️ 接手過期租約 {c}{year}年 {lo}~{hi} (原持有者 {old_owner}，第 {attempts + 1} 次)")
+        return Lease(lease_id, run, c, year, lo, hi, stop_loss, owner, attempts + 1)
+
+    def renew(self, lease, ttl):
+        """續約；租約已被別人接手回傳 False"""
+        now = time.time()
+        return self._update("UPDATE leases SET expires_at = ?, updated_at = ? WHERE id = ? AND owner = ? AND status = ?",
+                            (now + ttl, now, lease.id, lease.owner, LEASED)) == 1
+
+    def complete(self, lease, found=0):
+        return self._update("UPDATE leases SET status = ?, found = ?, expires_at = NULL, updated_at = ?"
+                            " WHERE id = ? AND owner = ? AND status = ?",
+                            (DONE, found, time.time(), lease.id, lease.owner, LEASED)) == 1
+
+    def release(self, lease):
+        """放回佇列 (不算失敗，下一個 worker 馬上可以拿)"""
+        return self._update("UPDATE leases SET status = ?, owner = NULL, expires_at = NULL, updated_at = ?"
+                            " WHERE id = ? AND owner = ? AND status = ?",
+                            (PENDING, time.time(), lease.id, lease.owner, LEASED)) == 1
+
+    def skip_after(self, lease):
+        """連續空號停損：同一輪、同年份在這張之後還沒人拿的租約不用做了，回傳略過幾張"""
+        return self._update("UPDATE leases SET status = ?, updated_at = ?"
+                            " WHERE run = ? AND city = ? AND year = ? AND lo > ? AND status = ?",
+                            (SKIPPED, time.time(), lease.run, lease.city, lease.year, lease.hi, PENDING))
+
+    def active(self, city=None):
+        """別人手上還沒做完、之後可能過期被接手的租約數"""
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM leases WHERE status = ? AND attempts < ?"
+                                + (" AND city = ?" if city else ""),
+                                (LEASED, self.max_attempts) + ((city,) if city else ())).fetchone()[0]
+        finally:
+            conn.close()
+
+    def status(self):
+        """[(城市, 年份, {狀態: 張數}, 有資料筆數)]；過期未還的另計為 expired，超過重試上限的計為 stuck"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT city, year, CASE WHEN status = ? AND expires_at >= ? THEN status"
+                " WHEN status IN (?, ?) AND attempts >= ? THEN 'stuck'"
+                " WHEN status = ? THEN 'expired' ELSE status END AS s,"
+                " COUNT(*), SUM(found) FROM leases GROUP BY city, year, s ORDER BY city, year DESC",
+                (LEASED, now, PENDING, LEASED, self.max_attempts, LEASED)).fetchall()
+        finally:
+            conn.close()
+        out = {}
+        for city, year, s, n, found in rows:
+            counts, total = out.get((city, year), ({}, 0))
+            counts[s] = n
+            out[(city, year)] = (counts, total + (found or 0))
+        return [(city, year, counts, found) for (city, year), (counts, found) in out.items()]
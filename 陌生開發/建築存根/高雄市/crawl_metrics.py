@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""📊 爬蟲指標：各階段耗時直方圖 + 計數器，本機 /metrics 端點 (Prometheus 文字格式) + 結束摘要。
+
+- timed("階段")：包住一段程式，耗時記進 permit_stage_seconds{stage=...}，另保留最近樣本算中位數 / p95
+- METRICS.inc / observe / set：計數器、直方圖、量表，標籤用關鍵字參數 (city=, year=, status=...)
+- start_metrics_server(port)：背景執行緒提供 http://127.0.0.1:port/metrics
+- log_summary()：每年有資料 / 空號 / 失敗、重試、直連退回、瀏覽器汰換、各階段耗時
+
+不依賴 prometheus_client，單純字典 + 鎖，熱路徑成本只有一次加鎖。
+"""
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+
+# 名稱 → (型別, 說明)
+METRIC_HELP = {
+    "permit_stage_seconds": ("histogram", "各階段耗時 (秒)"),
+    "permit_numbers_total": ("counter", "查完的號碼數，依結果 found / empty / failed"),
+    "permit_records_total": ("counter", "寫入的執照筆數"),
+    "permit_retries_total": ("counter", "同一號碼重試次數"),
+    "permit_http_fallbacks_total": ("counter", "直連失敗改用瀏覽器的次數"),
+    "permit_driver_restarts_total": ("counter", "瀏覽器汰換次數"),
+    "permit_host_rate": ("gauge", "自適應限速器目前速率 (次/秒)"),
+    "permit_cache_total": ("counter", "回應快取讀取，依結果 hit / miss"),
+    "permit_cache_evictions_total": ("counter", "回應快取 LRU 淘汰筆數"),
+}
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items: return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class MetricsRegistry:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._counters = {}
+        self._gauges = {}
+        self._hists = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name, value, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            hist = self._hists.get(key)
+            if hist is None: hist = self._hists[key] = _Histogram(self.buckets)
+            hist.observe(value)
+
+    def counter_values(self, name):
+        """{標籤 dict 的 tuple: 值}"""
+        with self._lock:
+            return {labels: v for (n, labels), v in self._counters.items() if n == name}
+
+    def render_prometheus(self):
+        lines, seen = [], set()
+
+        def header(name):
+            if name in seen: return
+            seen.add(name)
+            kind, help_text = METRIC_HELP.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            hists = sorted((k, (list(h.counts), h.count, h.sum)) for k, h in self._hists.items())
+        for (name, labels), value in counters + gauges:
+            header(name)
+            lines.append(f"{name}{_fmt_labels(labels)} {value}")
+        for (name, labels), (counts, count, total) in hists:
+            header(name)
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', '+Inf')])} {count}")
+            lines.append(f"{name}_sum{_fmt_labels(labels)} {total}")
+            lines.append(f"{name}_count{_fmt_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+
+class StepTimer:
+    """各階段耗時：寫進 METRICS 直方圖，另保留最近 window 筆算中位數 / p95，定期寫 log"""
+
+    def __init__(self, window=200, log_every=60.0, registry=METRICS):
+        self.window = window
+        self.log_every = log_every
+        self.registry = registry
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._last_log = time.monotonic()
+
+    def record(self, name, seconds):
+        self.registry.observe("permit_stage_seconds", seconds, stage=name)
+        with self._lock:
+            self._samples.setdefault(name, deque(maxlen=self.window)).append(seconds)
+            self._counts[name] = self._counts.get(name, 0) + 1
+        self._maybe_log()
+
+    @contextmanager
+    def step(self, name):
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(name, time.monotonic() - t0)
+
+    def snapshot(self):
+        """{步驟: {n, mean, p50, p95, max}} (秒)"""
+        with self._lock:
+            items = [(name, list(samples), self._counts[name]) for name, samples in self._samples.items()]
+        out = {}
+        for name, samples, n in items:
+            ordered = sorted(samples)
+            out[name] = {
+                "n": n,
+                "mean": statistics.fmean(ordered),
+                "p50": ordered[len(ordered) // 2],
+                "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                "max": ordered[-1],
+            }
+        return out
+
+    def log_summary(self):
+        snap = self.snapshot()
+        if not snap: return
+        logger.info("⏱️ 步驟耗時 | " + " | ".join(
+            f"{name}: 中位 {s['p50']:.2f}s / p95 {s['p95']:.2f}s ({s['n']} 次)" for name, s in snap.items()))
+
+    def _maybe_log(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_log < self.log_every: return
+            self._last_log = now
+        self.log_summary()
+
+
+STEP_TIMER = StepTimer()
+
+
+def timed(name):
+    """with timed("驗證碼"): ... → 記進 STEP_TIMER / permit_stage_seconds"""
+    return STEP_TIMER.step(name)
+
+
+def start_metrics_server(port, host="127.0.0.1", registry=METRICS):
+    """背景提供 /metrics；埠被占用時只警告，不影響爬蟲"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((host, port), Handler)
+    except OSError as e:
+        logger.warning(f"⚠️ 指標端點無法啟動 ({host}:{port}): {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"📊 指標端點: http://{host}:{port}/metrics")
+    return server
+
+
+def log_summary(registry=METRICS, timer=STEP_TIMER):
+    """結束摘要：每個 (城市, 年份) 的結果分布 + 全域計數 + 各階段耗時"""
+    per_year = {}
+    for labels, v in registry.counter_values("permit_numbers_total").items():
+        d = dict(labels)
+        per_year.setdefault((d.get("city", ""), d.get("year", "")), {})[d.get("status", "")] = v
+    for name, field in (("permit_retries_total", "retries"), ("permit_records_total", "records")):
+        for labels, v in registry.counter_values(name).items():
+            d = dict(labels)
+            per_year.setdefault((d.get("city", ""), d.get("year", "")), {})[field] = v
+
+    logger.info("📊 ======== 本次執行摘要 ========")
+    for (city, year), c in sorted(per_year.items()):
+        logger.info(f"   {city}{year}年: 有資料 {c.get('found', 0)} / 空號 {c.get('empty', 0)} / 失敗 {c.get('failed', 0)}"
+                    f" | 重試 {c.get('retries', 0)} | 寫入 {c.get('records', 0)} 筆")
+    fallbacks = sum(registry.counter_values("permit_http_fallbacks_total").values())
+    restarts = sum(registry.counter_values("permit_driver_restarts_total").values())
+    cache = {dict(labels).get("result"): v for labels, v in registry.counter_values("permit_cache_total").items()}
+    logger.info(f"   直連退回瀏覽器 {fallbacks} 次 | 瀏覽器汰換 {restarts} 次"
+                + (f" | 快取命中 {cache.get('hit', 0)} / 未命中 {cache.get('miss', 0)}" if cache else ""))
+    for name, s in sorted(timer.snapshot().items(), key=lambda kv: -kv[1]["mean"] * kv[1]["n"]):
+        logger.info(f"   ⏱️ {name}: {s['n']} 次 | 平均 {s['mean']:.3f}s | 中位 {s['p50']:.3f}s | p95 {s['p95']:.3f}s"
+                    f" | 最久 {s['max']:.3f}s")
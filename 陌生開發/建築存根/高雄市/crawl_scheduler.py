@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""🧵 asyncio 爬取排程器：所有 (城市, 年份, 編號) 共用一個工作佇列。
+
+- 全域同時查詢數由 concurrency 決定，不再是「幾個年份就幾條線程」
+- 每個主機各自限速：rate_limiter 的 AIMD 自適應限速器，
+  host_rate_limits 是每秒查詢次數的上限；worker 回報延遲與錯誤來加減速
+- 工作竊取：每個 slot 黏著自己的年份做，該年份停損結束後，
+  slot 會轉去支援目前人手最少、還有號碼的年份
+
+實際查詢仍是同步的 (requests / Selenium)，在專用的執行緒池裡跑。
+每個 slot 對同一年份持有自己的 worker 物件 (爬蟲實例)，不會兩條執行緒共用同一個 Chrome。
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from rate_limiter import get_limiter
+
+logger = logging.getLogger(__name__)
+
+
+class YearJob:
+    """單一 (城市, 年份) 的號碼序列與停損狀態
+
+    make_worker() 產生一個具有 process_number(n) -> bool 的物件 (可選 close())；
+    連續 max_consecutive_fails 個號碼 (依號碼順序計算) 無資料就停止派工；
+    None = 不停損 (號碼範圍已由 range_discovery 探測過)。
+    """
+
+    def __init__(self, city, year, host, numbers, make_worker, max_consecutive_fails, on_finish=None):
+        self.city = city
+        self.year = year
+        self.host = host
+        self.numbers = list(numbers)
+        self.make_worker = make_worker
+        self.max_consecutive_fails = max_consecutive_fails
+        self.on_finish = on_finish
+        self.next_idx = 0
+        self.slots = 0
+        self.inflight = 0
+        self.stopped = False
+        self.found = 0
+        self.consecutive_fails = 0
+        self._done = {}
+        self._checked_idx = 0
+
+    @property
+    def label(self):
+        return f"{self.city}{self.year}年"
+
+    def has_work(self):
+        return not self.stopped and self.next_idx < len(self.numbers)
+
+    def take(self):
+        idx = self.next_idx
+        self.next_idx += 1
+        self.inflight += 1
+        return idx
+
+    def complete(self, idx, found):
+        """登記結果，依號碼順序推進連續空號計數"""
+        self.inflight -= 1
+        self._done[idx] = found
+        while self._checked_idx in self._done:
+            ok = self._done.pop(self._checked_idx)
+            self._checked_idx += 1
+            if ok:
+                self.found += 1
+                self.consecutive_fails = 0
+            else:
+                self.consecutive_fails += 1
+            if self.max_consecutive_fails and not self.stopped and self.consecutive_fails >= self.max_consecutive_fails:
+                self.stopped = True
+                logger.info(f"🛑 [{self.label}] 連續 {self.max_consecutive_fails} 筆無資料，釋出人手給其他年份。")
+
+    def is_finished(self):
+        return not self.has_work() and self.inflight == 0
+
+
+class _Slot:
+    def __init__(self, index):
+        self.index = index
+        self.job = None
+        self.worker = None
+
+
+class CrawlScheduler:
+    def __init__(self, concurrency=5, host_rate_limits=None, host_initial_rates=None):
+        self.concurrency = concurrency
+        self.host_rate_limits = dict(host_rate_limits or {})
+        self.host_initial_rates = dict(host_initial_rates or {})
+        self.jobs = []
+
+    def add_job(self, job):
+        self.jobs.append(job)
+        return job
+
+    def _limiter(self, host):
+        # 參數要跟 PermitCrawler 建的一樣 (get_limiter 以第一次建立的為準)
+        kwargs = {"max_rate": self.host_rate_limits.get(host), "initial_rate": self.host_initial_rates.get(host)}
+        return get_limiter(host, **{k: v for k, v in kwargs.items() if v})
+
+    def _pick_job(self):
+        """還有號碼的年份中，目前 slot 最少的那個 (工作竊取)"""
+        candidates = [j for j in self.jobs if j.has_work()]
+        if not candidates: return None
+        return min(candidates, key=lambda j: (j.slots, self.jobs.index(j)))
+
+    async def _run_in_pool(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def _release_worker(self, slot):
+        if slot.worker is not None and hasattr(slot.worker, "close"):
+            try: await self._run_in_pool(slot.worker.close)
+            except Exception as e: logger.warning(f"⚠️ slot {slot.index} 關閉 worker 失敗: {e}")
+        slot.worker = None
+        if slot.job is not None:
+            slot.job.slots -= 1
+            slot.job = None
+
+    async def _finish_job(self, job):
+        logger.info(f"🏁 [{job.label}] 完成 | 找到 {job.found} 號")
+        if job.on_finish:
+            try: await self._run_in_pool(job.on_finish)
+            except Exception as e: logger.error(f"❌ [{job.label}] 收尾失敗: {e}")
+
+    async def _slot_loop(self, slot):
+        while True:
+            if slot.job is None or not slot.job.has_work():
+                await self._release_worker(slot)
+                job = self._pick_job()
+                if job is None: break
+                slot.job = job
+                job.slots += 1
+                slot.worker = await self._run_in_pool(job.make_worker)
+
+            job = slot.job
+            idx = job.take()
+            number = job.numbers[idx]
+            # 斷點已完成 / 快取齊全的號碼不打網站，不用排限速
+            needs_network = getattr(slot.worker, "needs_network", None)
+            if needs_network is None or await self._run_in_pool(needs_network, number):
+                await self._limiter(job.host).wait_async()
+            try:
+                found = bool(await self._run_in_pool(slot.worker.process_number, number))
+            except Exception as e:
+                logger.error(f"❌ [{job.label}][{number:05d}] 查詢例外: {e}")
+                found = False
+            job.complete(idx, found)
+            if job.is_finished() and job not in self._finished:
+                self._finished.add(job)
+                await self._finish_job(job)
+        await self._release_worker(slot)
+
+    async def run(self):
+        self._finished = set()
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="crawl")
+        logger.info(f"🚀 排程啟動 | 年份 {len(self.jobs)} 個 | 同時查詢 {self.concurrency} | 限速 {self.host_rate_limits}")
+        try:
+            await asyncio.gather(*(self._slot_loop(_Slot(i)) for i in range(self.concurrency)))
+            # 沒有任何號碼可派的年份也要收尾
+            for job in self.jobs:
+                if job not in self._finished:
+                    self._finished.add(job)
+                    await self._finish_job(job)
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def run_sync(self):
+        asyncio.run(self.run())
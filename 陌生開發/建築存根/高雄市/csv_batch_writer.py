@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""📝 批次 CSV 寫入器：每個輸出檔只有一個寫入者，多執行緒共用。
+
+取代「每筆都 open → write → flush → fsync」：
+- 資料先放記憶體，累積 max_rows 筆或最舊一筆超過 max_seconds 秒就一次寫入
+- 背景執行緒負責計時，崩潰時最多遺失 max_seconds 秒內的資料
+- durability: "fsync" = 寫入後 fsync (最安全)；"flush" = 只交給作業系統；"none" = 交給 Python 緩衝
+- after_commit(callback): 目前排隊中的資料落地後才呼叫，用來在資料安全後才記斷點
+"""
+import atexit
+import csv
+import logging
+import os
+import threading
+import time
+
+from crawl_metrics import timed
+
+logger = logging.getLogger(__name__)
+
+DURABILITY_LEVELS = ("fsync", "flush", "none")
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+class BatchedCsvWriter:
+    def __init__(self, path, fieldnames, max_rows=50, max_seconds=5.0, durability="fsync", encoding="utf-8-sig"):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"durability 必須是 {DURABILITY_LEVELS} 之一")
+        self.path = path
+        self.fieldnames = list(fieldnames)
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self.durability = durability
+        self.rows_written = 0
+        self._lock = threading.Lock()
+        self._pending = []
+        self._callbacks = []
+        self._oldest = None
+        self._closed = False
+
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        # 續寫舊檔時 TextIOWrapper 不會再寫 BOM；Header 只在新檔寫一次
+        self._file = open(path, mode='a', newline='', encoding=encoding)
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction='ignore')
+        if is_new:
+            self._writer.writeheader()
+            self._sync()
+            logger.info(f"📁 CSV 建立成功: {path}")
+
+        self._timer = threading.Thread(target=self._tick, name=f"csv-flush-{os.path.basename(path)}", daemon=True)
+        self._timer.start()
+
+    def _sync(self):
+        if self.durability == "none": return
+        self._file.flush()
+        if self.durability == "fsync": os.fsync(self._file.fileno())
+
+    def write_row(self, record, on_commit=None):
+        self.write_rows([record], on_commit)
+
+    def write_rows(self, records, on_commit=None):
+        with self._lock:
+            if self._closed: raise ValueError(f"CSV 已關閉: {self.path}")
+            if not self._pending: self._oldest = time.monotonic()
+            self._pending.extend(records)
+            if on_commit: self._callbacks.append(on_commit)
+            full = len(self._pending) >= self.max_rows
+        if full: self.flush()
+
+    def after_commit(self, callback):
+        """排隊中的資料都落地後才執行；沒有排隊資料就立刻執行"""
+        with self._lock:
+            if self._pending:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def flush(self):
+        with self._lock:
+            rows, callbacks = self._pending, self._callbacks
+            self._pending, self._callbacks, self._oldest = [], [], None
+            if rows:
+                try:
+                    with timed("CSV落地"):
+                        self._writer.writerows(rows)
+                        self._sync()
+                    self.rows_written += len(rows)
+                except Exception as e:
+                    # 寫入失敗：資料放回佇列，callback 不執行 (斷點不前進)
+                    self._pending[:0] = rows
+                    self._callbacks[:0] = callbacks
+                    self._oldest = time.monotonic()
+                    logger.error(f"❌ 寫入 CSV 失敗 ({len(rows)} 筆待重試): {e}")
+                    return
+        for cb in callbacks:
+            try: cb()
+            except Exception as e: logger.error(f"❌ 寫入後回呼失敗: {e}")
+
+    def _tick(self):
+        interval = max(0.2, min(1.0, self.max_seconds / 2))
+        while not self._closed:
+            time.sleep(interval)
+            oldest = self._oldest
+            if oldest is not None and time.monotonic() - oldest >= self.max_seconds:
+                self.flush()
+
+    def close(self):
+        if self._closed: return
+        self.flush()
+        with self._lock:
+            self._closed = True
+            try:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except: pass
+            self._file.close()
+
+
+def get_csv_writer(path, fieldnames, **kwargs):
+    """同一路徑在行程內只有一個寫入者"""
+    path = os.path.abspath(path)
+    with _writers_lock:
+        writer = _writers.get(path)
+        if writer is None or writer._closed:
+            writer = _writers[path] = BatchedCsvWriter(path, fieldnames, **kwargs)
+        return writer
+
+
+def flush_csv(path):
+    writer = _writers.get(os.path.abspath(path))
+    if writer: writer.flush()
+
+
+def close_all_writers():
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
+
+
+atexit.register(close_all_writers)
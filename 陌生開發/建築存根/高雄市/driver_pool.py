@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""🚗 WebDriver 池：瀏覽器只啟動一次，借出 / 歸還給各 worker。
+
+取代「每 50 號重開一次」與「一有連線異常就重開」：
+- 依實測的記憶體 (RSS)、已載入頁數、近期錯誤率判斷是否該換一台
+- 出錯時先 ping，真的掛了才重開
+- chromedriver 路徑只解析一次 (行程內 + 磁碟快取)，重開不必再跑 ChromeDriverManager
+- profile="lean"：只讀 innerText 與幾個輸入框，圖片 / 字型 / CSS / 影音 / 統計追蹤一律不載，
+  頁面載入策略 eager (DOM 好了就回來)，關掉用不到的 Chrome 背景功能；效果用 browser_bench.py 量
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+from crawl_metrics import METRICS
+
+try:
+    import psutil
+except ImportError:  # 沒裝 psutil 就略過 RSS 檢查
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+PATH_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".cache", "permit_scraper_chromedriver.json")
+
+_driver_path = None
+_path_lock = threading.Lock()
+
+
+def chromedriver_path():
+    """解析 chromedriver 路徑：環境變數 > 行程快取 > 磁碟快取 > ChromeDriverManager"""
+    global _driver_path
+    with _path_lock:
+        if _driver_path and os.path.exists(_driver_path): return _driver_path
+        path = os.environ.get("CHROMEDRIVER_PATH")
+        if not path:
+            try:
+                with open(PATH_CACHE_FILE, encoding="utf-8") as f:
+                    path = json.load(f).get("path")
+            except: path = None
+        if not path or not os.path.exists(path):
+            from webdriver_manager.chrome import ChromeDriverManager
+            path = ChromeDriverManager().install()
+            try:
+                os.makedirs(os.path.dirname(PATH_CACHE_FILE), exist_ok=True)
+                with open(PATH_CACHE_FILE, "w", encoding="utf-8") as f:
+                    json.dump({"path": path, "resolved_at": time.time()}, f)
+            except: pass
+            logger.info(f"🔧 chromedriver 路徑已快取: {path}")
+        _driver_path = path
+        return path
+
+
+def build_chrome_options():
+    options = Options()
+    options.add_argument('--headless=new')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--window-size=1920,1080')
+    options.add_argument(f"user-agent={USER_AGENT}")
+    return options
+
+
+# 精簡模式擋掉的請求 (CDP Network.setBlockedURLs 萬用字元)
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.css", "*.mp4", "*.webm", "*.mp3",
+]
+# 第三方統計 / 廣告：直接解析到無效位址，所有分頁都生效
+BLOCKED_HOSTS = [
+    "www.google-analytics.com", "analytics.google.com", "www.googletagmanager.com", "stats.g.doubleclick.net",
+    "connect.facebook.net", "static.hotjar.com", "script.hotjar.com",
+]
+
+
+def build_lean_chrome_options():
+    options = build_chrome_options()
+    options.arguments.remove('--window-size=1920,1080')
+    options.add_argument('--window-size=1280,800')
+    options.page_load_strategy = "eager"
+    for arg in ('--blink-settings=imagesEnabled=false', '--disable-extensions', '--disable-background-networking',
+                '--disable-sync', '--disable-default-apps', '--disable-component-update', '--no-first-run',
+                '--mute-audio', '--disable-notifications',
+                '--disable-features=Translate,OptimizationHints,MediaRouter,AutofillServerCommunication'):
+        options.add_argument(arg)
+    options.add_argument('--host-resolver-rules=' + ", ".join(f"MAP {h} 0.0.0.0" for h in BLOCKED_HOSTS))
+    options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2,
+        "profile.default_content_setting_values.media_stream": 2,
+    })
+    return options
+
+
+def block_heavy_requests(driver):
+    """CDP 擋字型 / CSS / 影音 (只作用在目前分頁；詳情頁分頁由 window.open 開，圖片與統計仍由啟動參數擋)"""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+    except Exception as e:
+        logger.warning(f"⚠️ CDP 擋請求失敗，改用一般載入: {e}")
+
+
+# profile → (options_factory, 啟動後設定)
+PROFILES = {
+    "full": (build_chrome_options, None),
+    "lean": (build_lean_chrome_options, block_heavy_requests),
+}
+
+
+def launch_driver(options_factory=build_chrome_options, on_launch=None):
+    driver = webdriver.Chrome(service=Service(chromedriver_path()), options=options_factory())
+    if on_launch: on_launch(driver)
+    return driver
+
+
+def driver_rss_mb(driver):
+    """chromedriver 與其所有子行程 (Chrome 主程式 / renderer) 的 RSS 總和"""
+    if psutil is None: return None
+    try:
+        proc = psutil.Process(driver.service.process.pid)
+        procs = [proc] + proc.children(recursive=True)
+        total = 0
+        for p in procs:
+            try: total += p.memory_info().rss
+            except psutil.Error: pass
+        return total / (1024 * 1024)
+    except Exception:
+        return None
+
+
+class _DriverStats:
+    def __init__(self, window):
+        self.pages = 0
+        self.outcomes = deque(maxlen=window)
+        self.pending_error = False
+        self.launched_at = time.monotonic()
+
+
+class DriverPool:
+    """執行緒安全的 Chrome 池
+
+    size: 最多同時存在幾台瀏覽器
+    max_pages / max_rss_mb / max_error_rate: 任一超標就換新的一台
+    profile: "full" = 完整 Chrome；"lean" = 精簡模式 (見 PROFILES)；給 options_factory 時以它為準
+    """
+
+    def __init__(self, size=5, max_pages=400, max_rss_mb=1500, max_error_rate=0.5, error_window=20,
+                 rss_check_every=10, options_factory=None, profile="full"):
+        self.size = size
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.max_error_rate = max_error_rate
+        self.error_window = error_window
+        self.rss_check_every = rss_check_every
+        default_factory, self.on_launch = PROFILES[profile]
+        self.options_factory = options_factory or default_factory
+        self._idle = queue.LifoQueue()
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._launched = 0
+        self.restarts = 0
+
+    def _launch(self):
+        driver = launch_driver(self.options_factory, self.on_launch)
+        with self._lock:
+            self._stats[id(driver)] = _DriverStats(self.error_window)
+        return driver
+
+    def _discard(self, driver, free_slot=False):
+        """關掉並除名；free_slot=True 時一併釋出名額 (只有還在名冊上的才釋出，同一台不會扣兩次)"""
+        with self._lock:
+            registered = self._stats.pop(id(driver), None) is not None
+            if free_slot and registered: self._launched -= 1
+        try: driver.quit()
+        except: pass
+
+    def acquire(self, timeout=None):
+        """借一台：有閒置的直接用，未達上限就開新的，否則等別人歸還"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_launch = self._launched < self.size
+            if can_launch: self._launched += 1
+        if can_launch:
+            try:
+                return self._launch()
+            except Exception:
+                with self._lock: self._launched -= 1
+                raise
+        return self._idle.get(timeout=timeout)
+
+    def release(self, driver, broken=False):
+        """歸還；壞掉或不健康的直接關掉，名額讓下一次 acquire 重開"""
+        if driver is None: return
+        if broken or self._unhealthy_reason(driver, ping=False):
+            self._discard(driver, free_slot=True)
+        else:
+            self._idle.put(driver)
+
+    def mark_error(self, driver):
+        stats = self._stats.get(id(driver))
+        if stats: stats.pending_error = True
+
+    def check(self, driver, pages=1):
+        """登記本次使用並做健康檢查；需要換台時回傳新的 driver
+
+        舊的已經關掉、新的又開不起來時回傳 None (名額已釋出)，呼叫端下次用之前再 acquire。
+        """
+        stats = self._stats.get(id(driver))
+        if stats is None: return driver
+        stats.pages += pages
+        stats.outcomes.append(stats.pending_error)
+        had_error = stats.pending_error
+        stats.pending_error = False
+
+        reason = self._unhealthy_reason(driver, ping=had_error)
+        if not reason: return driver
+        logger.info(f"♻️ 瀏覽器汰換 ({reason}) | 已載入 {stats.pages} 頁")
+        self._discard(driver)
+        self.restarts += 1
+        METRICS.inc("permit_driver_restarts_total")
+        try:
+            return self._launch()
+        except Exception as e:
+            with self._lock: self._launched -= 1
+            logger.warning(f"⚠️ 瀏覽器重開失敗，稍後再借: {e}")
+            return None
+
+    def _unhealthy_reason(self, driver, ping):
+        stats = self._stats.get(id(driver))
+        if stats is None: return "未登記"
+        if ping:
+            try: driver.execute_script("return 1")
+            except Exception: return "無回應"
+        if stats.pages >= self.max_pages:
+            return f"頁數 {stats.pages}"
+        if len(stats.outcomes) >= self.error_window:
+            rate = sum(stats.outcomes) / len(stats.outcomes)
+            if rate > self.max_error_rate: return f"錯誤率 {rate:.0%}"
+        if self.max_rss_mb and stats.pages and stats.pages % self.rss_check_every == 0:
+            rss = driver_rss_mb(driver)
+            if rss and rss > self.max_rss_mb: return f"記憶體 {rss:.0f}MB"
+        return ""
+
+    def close_all(self):
+        while True:
+            try: driver = self._idle.get_nowait()
+            except queue.Empty: break
+            self._discard(driver, free_slot=True)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""🧩 詳情頁欄位擷取：欄位規格宣告一次、編譯一次，一頁文字一次抽完所有欄位。
+
+舊寫法每個欄位都 `key in text` + `text.split(key, 1)` 複製整頁文字好幾次；
+這裡改成以位置 (offset) 走訪：
+- 每個關鍵字在整頁的第一次出現位置只找一次，所有欄位共用
+- 結束關鍵字從起點往後找，只切出需要的那一行，不複製整段文字
+- 執照號碼的年份 Regex 預先編譯並快取
+
+結果與舊寫法完全一致 (對照測試見 tests/test_field_extractor.py)。
+"""
+import hashlib
+import re
+from functools import lru_cache
+
+_COLONS = (":", "：")
+PLACEHOLDER = "[需人工確認]"  # 解析不出執照號碼時的佔位前綴
+
+
+class FieldSpec:
+    """單一欄位規格
+
+    starts: 起始關鍵字 (依優先順序，第一個有出現的為準)
+    ends: 結束關鍵字 (依優先順序，第一個在後文出現的為準)
+    unit: 有值時補上的單位 (例如 ㎡)
+    after: 只在此關鍵字第一次出現之後尋找 (例如「建築面積」之後的「其他」)
+    block: True = 取到結束關鍵字為止的整段 (可跨行)；False = 只取第一行
+    max_len: block 模式下的長度上限；clip_always=False 時只在找不到結束關鍵字時截斷
+    strip_colon: 是否去掉開頭的冒號
+    """
+
+    def __init__(self, name, starts, ends=(), unit="", after=None, block=False, max_len=None,
+                 clip_always=False, strip_colon=True):
+        self.name = name
+        self.starts = tuple(starts)
+        self.ends = tuple(ends or ())
+        self.unit = unit
+        self.after = after
+        self.block = block
+        self.max_len = max_len
+        self.clip_always = clip_always
+        self.strip_colon = strip_colon
+
+
+class _FirstHits:
+    """一頁文字內各關鍵字第一次出現的位置快取"""
+    __slots__ = ("text", "cache")
+
+    def __init__(self, text):
+        self.text = text
+        self.cache = {}
+
+    def first(self, key, lo=0):
+        pos = self.cache.get(key)
+        if pos is None:
+            pos = self.cache[key] = self.text.find(key)
+        if pos >= lo or pos < 0:
+            return pos
+        # 第一次出現在 lo 之前，才需要從 lo 往後再找
+        return self.text.find(key, lo)
+
+
+def _skip_space(text, i, n):
+    while i < n and text[i].isspace():
+        i += 1
+    return i
+
+
+class FieldExtractor:
+    def __init__(self, specs):
+        self.specs = list(specs)
+        self.by_name = {s.name: s for s in self.specs}
+
+    def extract(self, text):
+        """{欄位名: 值}，全部欄位共用同一份關鍵字位置快取"""
+        hits = _FirstHits(text)
+        return {spec.name: self._extract(spec, text, hits) for spec in self.specs}
+
+    def extract_field(self, text, name):
+        return self._extract(self.by_name[name], text, _FirstHits(text))
+
+    def _extract(self, spec, text, hits):
+        n = len(text)
+        lo = 0
+        if spec.after:
+            p = hits.first(spec.after)
+            if p < 0: return ""
+            lo = p + len(spec.after)
+
+        for key in spec.starts:
+            p = hits.first(key, lo)
+            if p >= 0: break
+        else:
+            return ""
+        begin = p + len(key)
+
+        if spec.block:
+            value = self._block(spec, text, begin, n, hits)
+        else:
+            value = self._line(spec, text, begin, n, hits)
+        if value and spec.unit and spec.unit not in value:
+            value += " " + spec.unit
+        return value
+
+    def _find_end(self, spec, hits, lo):
+        for end_key in spec.ends:
+            e = hits.first(end_key, lo)
+            if e >= 0: return e
+        return -1
+
+    def _line(self, spec, text, begin, n, hits):
+        i = _skip_space(text, begin, n)
+        if i < n and text[i] in _COLONS:
+            i = _skip_space(text, i + 1, n)
+        e = self._find_end(spec, hits, i)
+        stop = e if e >= 0 else n
+        nl = text.find("\n", i, stop)
+        return text[i:nl if nl >= 0 else stop].strip()
+
+    def _block(self, spec, text, begin, n, hits):
+        i = begin
+        if spec.strip_colon:
+            j = _skip_space(text, begin, n)
+            if j < n and text[j] in _COLONS: i = j + 1
+        e = self._find_end(spec, hits, i)
+        if spec.clip_always:
+            value = text[i:e if e >= 0 else n].strip()
+            return value[:spec.max_len] if spec.max_len else value
+        if e < 0 and spec.max_len:
+            return text[i:i + spec.max_len].strip()
+        return text[i:e if e >= 0 else n].strip()
+
+
+@lru_cache(maxsize=None)
+def license_pattern(target_year):
+    """「(114)…號」執照號碼 Regex，每個年份只編譯一次"""
+    return re.compile(fr"(\(\s*{re.escape(str(target_year))}\s*\).*?號)")
+
+
+def placeholder_license(search_num, full_text):
+    """解析不出執照號碼時的佔位：'[需人工確認] 00012 #3fa9c2d1'
+
+    同一個搜尋編號底下可能有好幾頁都解析不出號碼，只用搜尋編號會在資料庫主鍵 (城市, 年份, 執照號碼) 撞成一筆；
+    後面接頁面內容的短雜湊區分，同一頁重抓、重新解析還是同一個鍵 (upsert 不會多出一筆)。
+    """
+    digest = hashlib.sha1(full_text.encode("utf-8")).hexdigest()[:8]
+    return f"{PLACEHOLDER} {search_num} #{digest}"
+
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""🔤 多關鍵字比對 (Aho-Corasick)：一次掃過文字，找出字典裡所有出現的詞。
+
+有裝 pyahocorasick (C 實作) 就用它，沒裝就用純 Python 版，結果一樣。
+只要「最早、最長的一個」(leftmost_longest) 時，純 Python 版改用長詞優先的 regex 聯集，由 re 的 C 引擎掃。
+    ac = KeywordAutomaton({"三民區": "三民區", "三民鄉": "那瑪夏區"})
+    list(ac.iter_matches("高雄縣三民鄉民權村"))  → [(3, 6, "三民鄉", "那瑪夏區")]
+"""
+import re
+from collections import deque
+
+try:
+    import ahocorasick
+except ImportError:  # 沒裝就用純 Python 版
+    ahocorasick = None
+
+
+class KeywordAutomaton:
+    """words: {關鍵字: 附帶值} 或關鍵字清單 (附帶值 = 關鍵字本身)"""
+
+    def __init__(self, words):
+        if not isinstance(words, dict): words = {w: w for w in words}
+        self.words = {w: v for w, v in words.items() if w}
+        if ahocorasick is not None:
+            self._auto = ahocorasick.Automaton()
+            for word, value in self.words.items():
+                self._auto.add_word(word, (word, value))
+            if self.words: self._auto.make_automaton()
+        else:
+            self._auto = None
+            self._build()
+        # 長詞排前面：同一位置 regex 會先試長的，等於最早 + 最長
+        ordered = sorted(self.words, key=len, reverse=True)
+        self._regex = re.compile("|".join(map(re.escape, ordered))) if ordered else None
+
+    def _build(self):
+        # 節點 = (轉移表, 失敗連結, 結尾的詞)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for word in self.words:
+            node = 0
+            for ch in word:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(word)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]: f = self._fail[f]
+                cand = self._goto[f].get(ch, 0)
+                self._fail[nxt] = cand if cand != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_matches(self, text):
+        """依結尾位置產生 (起, 迄, 關鍵字, 附帶值)，迄為切片終點"""
+        if not self.words or not text: return
+        if self._auto is not None:
+            for end, (word, value) in self._auto.iter(text):
+                yield end + 1 - len(word), end + 1, word, value
+            return
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]: node = fail[node]
+            node = goto[node].get(ch, 0)
+            for word in out[node]:
+                yield i + 1 - len(word), i + 1, word, self.words[word]
+
+    def leftmost_longest(self, text):
+        """最早出現、同位置取最長的一個；沒有回傳 None"""
+        if self._auto is None:
+            m = self._regex.search(text) if self._regex and text else None
+            return (m.start(), m.end(), m.group(), self.words[m.group()]) if m else None
+        best = None
+        for m in self.iter_matches(text):
+            if best is None or m[0] < best[0] or (m[0] == best[0] and m[1] > best[1]): best = m
+        return best
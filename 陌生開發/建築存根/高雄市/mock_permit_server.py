@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""🧪 本機模擬建照查詢站：同時模擬高雄 buildmis 與桃園 bupic 的查詢流程，給爬蟲壓力測試用。
+
+    python mock_permit_server.py --port 8800 --latency 0.2 --error-rate 0.05
+
+然後讓爬蟲指向本機 (不必改程式):
+    KCG_SITE_ROOT=http://127.0.0.1:8800  python 成功的程式碼/kaohsiung_v14_data_safe.py
+    TYCG_SITE_ROOT=http://127.0.0.1:8800 python ty_scraper_114_110_all_at_once.py
+
+模擬內容:
+- 高雄: /bupic/pages/querylic 查詢頁 (Vue 風格驗證碼放在 #wrapper.__vue_app__)、
+        loading_div、查無資料 alert、table.licstable 結果、詳情頁
+- 桃園: /bupic/preLoginFormAction.do 表單 (#checkCode 明文驗證碼，Session 綁定)、
+        查無資料 alert、結果表格 *.do 連結、詳情頁
+- 每年有一個號碼上限 (--ceiling)，上限內依 --gap-rate 隨機空號，--multi-rate 的號碼有多筆執照
+- --latency / --jitter 模擬延遲，--error-rate 回 HTTP 500，--hang-rate 讓請求卡住 --hang-seconds 秒
+- GET /stats 回傳各路徑請求數 / 注入錯誤數 (JSON)
+"""
+import argparse
+import hashlib
+import html
+import json
+import random
+import secrets
+import threading
+import time
+from collections import Counter
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+KAOHSIUNG_DISTRICTS = ["楠梓區", "左營區", "鼓山區", "三民區", "苓雅區", "前鎮區", "小港區", "鳳山區", "岡山區", "旗山區"]
+TAOYUAN_DISTRICTS = ["桃園區", "中壢區", "平鎮區", "八德區", "楊梅區", "蘆竹區", "大溪區", "龍潭區", "龜山區", "大園區"]
+ROADS = ["中正路", "中山路", "民族路", "建國路", "自由路", "光華路", "和平路", "復興路"]
+ZONES = ["住宅區", "商業區", "第二種住宅區", "乙種工業區", "農業區"]
+USAGES = ["H-2 住宅", "G-3 辦公服務", "B-2 商場百貨", "C-2 倉儲", "H-1 宿舍安養"]
+BUILDERS = ["王大明", "陳建設股份有限公司", "林美華", "大福營造有限公司", "張志豪"]
+
+
+class MockConfig:
+    def __init__(self, latency=0.1, jitter=0.05, error_rate=0.0, hang_rate=0.0, hang_seconds=35.0,
+                 ceiling=300, gap_rate=0.1, multi_rate=0.1, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.ceiling = ceiling
+        self.gap_rate = gap_rate
+        self.multi_rate = multi_rate
+        self.seed = seed
+
+
+def _unit(*parts):
+    """(城市, 年份, 號碼, ...) → 固定的 0~1 亂數，同樣參數永遠同樣結果"""
+    digest = hashlib.sha1("|".join(map(str, parts)).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+
+def permits_for(config, city, year, number):
+    """該號碼有幾張執照 (0 = 空號)"""
+    # 年份越早上限越高，讓每年的天花板不同
+    ceiling = int(config.ceiling * (1 + 0.15 * max(0, 114 - int(year))))
+    if number < 1 or number > ceiling: return 0
+    if _unit(config.seed, city, year, number, "gap") < config.gap_rate: return 0
+    if _unit(config.seed, city, year, number, "multi") < config.multi_rate:
+        return 2 + int(_unit(config.seed, city, year, number, "n") * 2)
+    return 1
+
+
+def detail_fields(config, city, year, number, seq):
+    r = lambda tag: _unit(config.seed, city, year, number, seq, tag)
+    pick = lambda items, tag: items[int(r(tag) * len(items))]
+    districts = KAOHSIUNG_DISTRICTS if city == "kcg" else TAOYUAN_DISTRICTS
+    city_name = "高雄市" if city == "kcg" else "桃園市"
+    prefix = "高市建字" if city == "kcg" else "桃市建字"
+    floors = 2 + int(r("floors") * 20)
+    site = round(100 + r("site") * 2000, 2)
+    return {
+        "license": f"({year}){prefix}第{number:05d}{'' if seq == 1 else f'-{seq}'}號",
+        "builder": pick(BUILDERS, "builder"),
+        "location": f"{city_name}{pick(districts, 'dist')}{pick(ROADS, 'road')}{1 + int(r('no') * 300)}號",
+        "zoning": pick(ZONES, "zone"),
+        "units": f"地上{floors}層 地下{1 + int(r('b') * 3)}層 1棟 {floors * 2}戶",
+        "site_area": f"{site}",
+        "other_area": f"{round(site * 0.5, 2)}",
+        "open_area": f"{round(site * 0.4, 2)}",
+        "floor_area": f"{round(site * floors * 0.6, 2)}",
+        "date": f"{year}/{1 + int(r('m') * 12):02d}/{1 + int(r('d') * 28):02d}",
+        "usage": pick(USAGES, "usage"),
+    }
+
+
+def render_detail(fields):
+    f = {k: html.escape(v) for k, v in fields.items()}
+    return f"""<html><head><meta charset="utf-8"><title>執照明細</title>
+<link rel="stylesheet" href="/static/site.css"></head><body>
+<h2>建造執照明細</h2>
+<table class="detail">
+<tr><th>執照號碼</th><td>{f['license']}</td></tr>
+<tr><th>起造人</th><td>姓名：{f['builder']}</td></tr>
+<tr><th>設計人</th><td>某某建築師事務所 電話 07-1234567</td></tr>
+<tr><th>建築地點</th><td>{f['location']}</td></tr>
+<tr><th>使用分區</th><td>{f['zoning']}</td></tr>
+<tr><th>基地面積</th><td>合計 {f['site_area']} ㎡ 騎樓地 0 ㎡</td></tr>
+<tr><th>建築面積</th><td>騎樓 0 ㎡ 其他 {f['other_area']} ㎡</td></tr>
+<tr><th>層棟戶數</th><td>{f['units']}</td></tr>
+<tr><th>設計建蔽率</th><td>50%</td></tr>
+<tr><th>法定空地面積</th><td>{f['open_area']} ㎡</td></tr>
+<tr><th>總樓地板面積</th><td>{f['floor_area']} ㎡</td></tr>
+<tr><th>使用類組</th><td>{f['usage']}</td></tr>
+<tr><th>備註</th><td>無</td></tr>
+<tr><th>發照日期</th><td>{f['date']}</td></tr>
+</table>
+<p>注意事項：本資料僅供參考</p>
+<img src="/static/logo.png"></body></html>"""
+
+
+KCG_QUERY_PAGE = """<html><head><meta charset="utf-8"><title>建照查詢</title>
+<link rel="stylesheet" href="/static/site.css"></head><body>
+<div id="wrapper">
+<form id="qform" action="/bupic/pages/querylic" method="post">
+  <input id="license_yy" name="license_yy" type="text" placeholder="年度">
+  <input id="license_no1" name="license_no1" type="text" placeholder="號碼">
+  <input id="inputCode" name="inputCode" type="text" placeholder="驗證碼">
+  <input type="hidden" name="token" value="{token}">
+  <button id="btnLogin" type="button">查詢</button>
+</form>
+<div id="loading_div" style="display:none">查詢中...</div>
+<div id="result"></div>
+</div>
+<div class="footer">高雄市政府工務局</div>
+<script>
+  var code = String(Math.floor(Math.random() * 10000)).padStart(4, '0');
+  document.querySelector('#wrapper').__vue_app__ = {{_instance: {{data: {{code: code}}, proxy: {{code: code}}}}}};
+  document.getElementById('btnLogin').onclick = function () {{
+    var loading = document.getElementById('loading_div');
+    loading.style.display = 'block';
+    fetch('/bupic/pages/querylic', {{method: 'POST', body: new URLSearchParams(new FormData(document.getElementById('qform')))}})
+      .then(function (r) {{ return r.text(); }})
+      .then(function (html) {{
+        loading.style.display = 'none';
+        var m = html.match(/alert\\('([^']*)'\\)/);
+        if (m) {{ alert(m[1]); return; }}
+        var doc = new DOMParser().parseFromString(html, 'text/html');
+        var table = doc.querySelector('table.licstable');
+        document.getElementById('result').innerHTML = table ? table.outerHTML : '';
+      }});
+  }};
+</script></body></html>"""
+
+TYCG_QUERY_PAGE = """<html><head><meta charset="utf-8"><title>建照查詢</title>
+<link rel="stylesheet" href="/static/site.css"></head><body>
+<form action="queryAction.do" method="post">
+  <input name="keYear" type="text" placeholder="年度">
+  <input name="keNo" type="text" placeholder="號碼">
+  <input name="checkCode" type="text" placeholder="驗證碼"> <span id="checkCode">{code}</span>
+  <input type="hidden" name="formToken" value="{token}">
+  <input type="button" value="查詢" onclick="this.form.submit()">
+</form>
+<img src="/static/banner.jpg"></body></html>"""
+
+
+def render_result_list(links, table_class):
+    rows = "".join(f'<tr><td><a href="{html.escape(href)}">{html.escape(label)}</a></td><td>建造執照</td></tr>' for href, label in links)
+    return f"""<html><head><meta charset="utf-8"></head><body>
+<table class="{table_class}"><tr><th>執照號碼</th><th>類別</th></tr>{rows}</table></body></html>"""
+
+
+def render_alert(message):
+    return f"""<html><head><meta charset="utf-8"></head><body>
+<script>alert('{message}');</script></body></html>"""
+
+
+class MockState:
+    def __init__(self, config):
+        self.config = config
+        self.sessions = {}
+        self.stats = Counter()
+        self.lock = threading.Lock()
+        self.rng = random.Random(config.seed)
+
+    def roll(self):
+        with self.lock: return self.rng.random()
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    server_version = "MockPermit/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    # --- 共用 ---
+    def _session(self):
+        cookie = SimpleCookie(self.headers.get("Cookie") or "")
+        sid = cookie["JSESSIONID"].value if "JSESSIONID" in cookie else None
+        new = sid not in self.state.sessions
+        if new:
+            sid = secrets.token_hex(8)
+            self.state.sessions[sid] = {}
+        return sid, self.state.sessions[sid], new
+
+    def _send(self, body, status=200, sid=None, content_type="text/html; charset=utf-8"):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        if sid: self.send_header("Set-Cookie", f"JSESSIONID={sid}; Path=/")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _inject_faults(self, path):
+        """延遲 / 卡住 / 500；回傳 True 代表已回應錯誤"""
+        cfg = self.state.config
+        with self.state.lock: self.state.stats[f"req {path}"] += 1
+        delay = max(0.0, cfg.latency + (self.state.roll() * 2 - 1) * cfg.jitter)
+        if cfg.hang_rate and self.state.roll() < cfg.hang_rate:
+            with self.state.lock: self.state.stats["injected hang"] += 1
+            delay = cfg.hang_seconds
+        if delay: time.sleep(delay)
+        if cfg.error_rate and self.state.roll() < cfg.error_rate:
+            with self.state.lock: self.state.stats["injected 500"] += 1
+            self._send("<html><body>Internal Server Error</body></html>", status=500)
+            return True
+        return False
+
+    def _form(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length).decode("utf-8") if length else ""
+        return {k: v[0] for k, v in parse_qs(raw).items()}
+
+    # --- 路由 ---
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == "/stats":
+            with self.state.lock: stats = dict(self.state.stats)
+            return self._send(json.dumps(stats, ensure_ascii=False), content_type="application/json")
+        if url.path.startswith("/static/"):
+            return self._send("", content_type="text/css" if url.path.endswith(".css") else "image/png")
+        if self._inject_faults(url.path): return
+
+        sid, session, new = self._session()
+        if url.path == "/bupic/pages/querylic":
+            session["token"] = secrets.token_hex(4)
+            return self._send(KCG_QUERY_PAGE.format(token=session["token"]), sid=sid)
+        if url.path == "/bupic/preLoginFormAction.do":
+            session["code"] = "".join(self.state.rng.choice("ABCDEFGHJKLMNPQRSTUVWXYZ23456789") for _ in range(4))
+            session["token"] = secrets.token_hex(4)
+            return self._send(TYCG_QUERY_PAGE.format(code=session["code"], token=session["token"]), sid=sid)
+        if url.path in ("/bupic/pages/licdetail", "/bupic/detailAction.do"):
+            city = "kcg" if url.path.startswith("/bupic/pages") else "tycg"
+            try:
+                year, number, seq = query["year"], int(query["no"]), int(query.get("seq", 1))
+            except (KeyError, ValueError):
+                return self._send("<html><body>參數錯誤</body></html>", status=400)
+            if seq > permits_for(self.state.config, city, year, number):
+                return self._send("<html><body>查無資料</body></html>", status=404)
+            return self._send(render_detail(detail_fields(self.state.config, city, year, number, seq)), sid=sid if new else None)
+        self._send("<html><body>Not Found</body></html>", status=404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if self._inject_faults(url.path): return
+        sid, session, new = self._session()
+        form = self._form()
+        if url.path == "/bupic/pages/querylic":
+            # 驗證碼是前端產生的，後端只檢查有填與 Session 是否有效
+            if new or form.get("token") != session.get("token") or not form.get("inputCode"):
+                return self._send("<html><body>Session 逾時，請重新查詢</body></html>", status=403, sid=sid)
+            return self._query("kcg", form.get("license_yy", ""), form.get("license_no1", ""),
+                               "/bupic/pages/licdetail", "licstable")
+        if url.path == "/bupic/queryAction.do":
+            if new or form.get("checkCode", "").upper() != session.pop("code", None):
+                # 驗證碼錯 → 回到查詢表單
+                return self._send(TYCG_QUERY_PAGE.format(code="----", token=""), sid=sid)
+            return self._query("tycg", form.get("keYear", ""), form.get("keNo", ""),
+                               "/bupic/detailAction.do", "list")
+        self._send("<html><body>Not Found</body></html>", status=404)
+
+    def _query(self, city, year, num_str, detail_path, table_class):
+        try: number = int(num_str)
+        except ValueError: number = -1
+        count = permits_for(self.state.config, city, year, number)
+        with self.state.lock: self.state.stats[f"{city} {'found' if count else 'empty'}"] += 1
+        if not count:
+            return self._send(render_alert("查無資料"))
+        links = [(f"{detail_path}?{urlencode({'year': year, 'no': f'{number:05d}', 'seq': seq})}",
+                  detail_fields(self.state.config, city, year, number, seq)["license"]) for seq in range(1, count + 1)]
+        self._send(render_result_list(links, table_class))
+
+
+def make_server(host="127.0.0.1", port=8800, config=None):
+    server = ThreadingHTTPServer((host, port), MockHandler)
+    server.daemon_threads = True
+    server.state = MockState(config or MockConfig())
+    return server
+
+
+def main():
+    ap = argparse.ArgumentParser(description="本機模擬建照查詢站 (高雄 + 桃園)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8800)
+    ap.add_argument("--latency", type=float, default=0.1, help="每個請求平均延遲秒數")
+    ap.add_argument("--jitter", type=float, default=0.05, help="延遲上下浮動秒數")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="回 HTTP 500 的比例")
+    ap.add_argument("--hang-rate", type=float, default=0.0, help="請求卡住的比例")
+    ap.add_argument("--hang-seconds", type=float, default=35.0, help="卡住多久")
+    ap.add_argument("--ceiling", type=int, default=300, help="114 年的號碼上限 (越早年份越高)")
+    ap.add_argument("--gap-rate", type=float, default=0.1, help="上限內空號比例")
+    ap.add_argument("--multi-rate", type=float, default=0.1, help="一號多筆執照的比例")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    config = MockConfig(args.latency, args.jitter, args.error_rate, args.hang_rate, args.hang_seconds,
+                        args.ceiling, args.gap_rate, args.multi_rate, args.seed)
+    server = make_server(args.host, args.port, config)
+    print(f"🧪 模擬站啟動: http://{args.host}:{args.port}  (高雄 /bupic/pages/querylic | 桃園 /bupic/preLoginFormAction.do | 統計 /stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""📚 詳情頁語料庫：把抓到的原始詳情頁 (innerText / HTML) 存到本機，供離線重跑解析 (parser_bench / reparse)。
+
+目錄結構: <corpus>/<城市>/<年份>/<搜尋編號>_<內容雜湊>.txt (+ .html / .json)
+同一頁內容相同只存一份。
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def save_page(corpus_dir, city, year, search_num, text, html=None, url=None):
+    """存一頁；回傳 .txt 路徑 (失敗只記 log，不影響爬取)"""
+    try:
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:10]
+        folder = os.path.join(corpus_dir, city, str(year))
+        os.makedirs(folder, exist_ok=True)
+        base = os.path.join(folder, f"{search_num}_{digest}")
+        if os.path.exists(base + ".txt"): return base + ".txt"
+        if html:
+            with open(base + ".html", "w", encoding="utf-8") as f: f.write(html)
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump({"city": city, "year": str(year), "search_num": search_num, "url": url,
+                       "captured_at": time.strftime("%Y-%m-%d %H:%M:%S")}, f, ensure_ascii=False)
+        # .txt 最後寫，存在即代表這頁完整
+        tmp = base + ".txt.tmp"
+        with open(tmp, "w", encoding="utf-8") as f: f.write(text)
+        os.replace(tmp, base + ".txt")
+        return base + ".txt"
+    except Exception as e:
+        logger.warning(f"⚠️ 語料存檔失敗 [{city}{year}-{search_num}]: {e}")
+        return None
+
+
+def list_pages(corpus_dir, city=None, year=None):
+    """只列路徑不讀內容：[(城市, 年份, .txt 路徑)]，依檔名排序 (重新解析時分批交給各行程自己讀)"""
+    pages = []
+    cities = [city] if city else sorted(os.listdir(corpus_dir)) if os.path.isdir(corpus_dir) else []
+    for c in cities:
+        city_dir = os.path.join(corpus_dir, c)
+        if not os.path.isdir(city_dir): continue
+        years = [str(year)] if year else sorted(os.listdir(city_dir))
+        for y in years:
+            year_dir = os.path.join(city_dir, y)
+            if not os.path.isdir(year_dir): continue
+            pages += [(c, y, os.path.join(year_dir, name)) for name in sorted(os.listdir(year_dir)) if name.endswith(".txt")]
+    return pages
+
+
+def read_page(path, city, year):
+    """{"id", "city", "year", "search_num", "url", "captured_at", "text", "path"}"""
+    stem = os.path.basename(path)[:-4]
+    meta = {}
+    try:
+        with open(path[:-4] + ".json", encoding="utf-8") as f: meta = json.load(f)
+    except: pass
+    with open(path, encoding="utf-8") as f: text = f.read()
+    return {
+        "id": f"{city}/{year}/{stem}",
+        "city": city,
+        "year": year,
+        "search_num": meta.get("search_num") or stem.split("_", 1)[0],
+        "url": meta.get("url"),
+        "captured_at": meta.get("captured_at") or "",
+        "text": text,
+        "path": path,
+    }
+
+
+def iter_pages(corpus_dir, city=None, year=None):
+    """依檔名排序逐頁產生 read_page() 的 dict"""
+    for c, y, path in list_pages(corpus_dir, city, year):
+        yield read_page(path, c, y)
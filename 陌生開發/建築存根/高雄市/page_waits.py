@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""⏱️ 事件式等待：等頁面上的具體訊號 (驗證碼出現、loading 消失、結果表格或 alert 先到者)，不再固定 sleep。
+
+- wait_first(driver, [(結果, 條件), ...], timeout)：輪詢多個條件，回傳第一個成立的結果
+- 條件工廠：alert_present / element_present / js_truthy / text_contains / idle_for / after
+
+條件函式跟 Selenium expected_conditions 一樣是 f(driver)，回傳真值即成立；
+條件裡的 WebDriverException (alert 擋住 execute_script、元素過期…) 視為尚未成立。
+"""
+import time
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+POLL_SECONDS = 0.1
+
+
+def _holds(condition, driver):
+    try: return condition(driver)
+    except WebDriverException: return False
+
+
+def wait_first(driver, conditions, timeout, poll=POLL_SECONDS):
+    """conditions: [(結果, 條件函式), ...]，依序檢查，回傳第一個成立的結果；逾時回傳 None"""
+    def first(d):
+        for result, condition in conditions:
+            if _holds(condition, d): return result
+        return False
+    try: return WebDriverWait(driver, timeout, poll_frequency=poll).until(first)
+    except TimeoutException: return None
+
+
+def wait_for(driver, condition, timeout, poll=POLL_SECONDS):
+    """單一條件，成立回傳 True"""
+    return wait_first(driver, [(True, condition)], timeout, poll) is True
+
+
+def alert_present():
+    return EC.alert_is_present()
+
+
+def element_present(locator):
+    return EC.presence_of_element_located(locator)
+
+
+def js_truthy(script, *args):
+    return lambda d: d.execute_script(script, *args)
+
+
+def text_contains(text):
+    """body.innerText 出現指定文字 (詳情頁內容由 JS 填入時用)"""
+    return js_truthy("return !!document.body && document.body.innerText.indexOf(arguments[0]) >= 0;", text)
+
+
+def all_of(*conditions):
+    return lambda d: all(_holds(c, d) for c in conditions)
+
+
+def idle_for(condition, seconds):
+    """condition 連續成立 seconds 秒才算成立 (例：loading 已消失但結果遲遲不來)"""
+    since = [None]
+    def check(d):
+        if not _holds(condition, d):
+            since[0] = None
+            return False
+        if since[0] is None: since[0] = time.monotonic()
+        return time.monotonic() - since[0] >= seconds
+    return check
+
+
+def after(trigger, condition):
+    """trigger 成立過一次之後才開始檢查 condition (例：loading 出現過，才開始算它消失多久)"""
+    seen = [False]
+    def check(d):
+        if not seen[0] and not _holds(trigger, d): return False
+        seen[0] = True
+        return _holds(condition, d)
+    return check
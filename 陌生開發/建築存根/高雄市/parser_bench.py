@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""⏱️ 離線解析基準測試：把語料庫重新餵給高雄 / 桃園解析器，完全不連網。
+
+    # 量速度 + 各欄位耗時
+    python parser_bench.py --corpus ./corpus
+    # 建立黃金輸出 (確認目前解析結果正確後再做)
+    python parser_bench.py --corpus ./corpus --write-golden golden.jsonl
+    # 改完解析邏輯後，逐欄位比對差異
+    python parser_bench.py --corpus ./corpus --golden golden.jsonl
+
+語料來源：爬蟲設定 CAPTURE_DIR 後，每個詳情頁都會存進語料庫 (見 page_corpus.py)。
+"""
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+
+from page_corpus import iter_pages
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PARSER_FILES = {
+    "高雄市": os.path.join(HERE, "成功的程式碼", "kaohsiung_v14_data_safe.py"),
+    "桃園市": os.path.join(HERE, "ty_scraper_114_110_all_at_once.py"),
+}
+
+
+def load_parser(city):
+    """載入爬蟲模組 (不會啟動瀏覽器)，取出 parse_detail_text 與欄位規格"""
+    path = PARSER_FILES[city]
+    spec = importlib.util.spec_from_file_location(f"_bench_{abs(hash(city))}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_bench(pages, parsers, repeat=3):
+    results = {}
+    totals = Counter()
+    field_time = defaultdict(float)
+    field_calls = Counter()
+
+    # 整頁解析：records/sec
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            mod = parsers[page["city"]]
+            record = mod.parse_detail_text(page["text"], page["search_num"], page["year"])
+            results[page["id"]] = record
+            totals[page["city"]] += 1
+    elapsed = time.perf_counter() - start
+
+    # 各欄位單獨計時 (每個欄位自己掃一次，用來找出慢的規格)
+    for _ in range(repeat):
+        for page in pages:
+            fields = parsers[page["city"]].DETAIL_FIELDS
+            for spec in fields.specs:
+                t0 = time.perf_counter()
+                fields.extract_field(page["text"], spec.name)
+                field_time[(page["city"], spec.name)] += time.perf_counter() - t0
+                field_calls[(page["city"], spec.name)] += 1
+    return results, totals, elapsed, field_time, field_calls
+
+
+def diff_golden(results, golden):
+    """逐欄位比對；回傳 (各欄位差異數, 差異範例, 缺少 / 新增的頁面)"""
+    field_diffs = Counter()
+    examples = defaultdict(list)
+    missing = [k for k in golden if k not in results]
+    added = [k for k in results if k not in golden]
+    for page_id, expected in golden.items():
+        if page_id not in results: continue
+        got = results[page_id] or {}
+        expected = expected or {}
+        for field in sorted(set(expected) | set(got)):
+            if str(expected.get(field, "")) != str(got.get(field, "")):
+                field_diffs[field] += 1
+                if len(examples[field]) < 3:
+                    examples[field].append((page_id, expected.get(field), got.get(field)))
+    return field_diffs, examples, missing, added
+
+
+def main():
+    ap = argparse.ArgumentParser(description="離線解析基準測試")
+    ap.add_argument("--corpus", required=True, help="語料庫目錄 (CAPTURE_DIR)")
+    ap.add_argument("--city", choices=sorted(PARSER_FILES), help="只跑某個城市")
+    ap.add_argument("--year", help="只跑某個年份")
+    ap.add_argument("--repeat", type=int, default=3, help="重複次數 (取平均)")
+    ap.add_argument("--golden", help="黃金輸出 (jsonl) 比對")
+    ap.add_argument("--write-golden", help="把目前解析結果寫成黃金輸出")
+    args = ap.parse_args()
+
+    pages = list(iter_pages(args.corpus, args.city, args.year))
+    if not pages:
+        print(f"⚠️ 語料庫沒有資料: {args.corpus}")
+        return 1
+    parsers = {city: load_parser(city) for city in sorted({p["city"] for p in pages})}
+
+    results, totals, elapsed, field_time, field_calls = run_bench(pages, parsers, args.repeat)
+    n = sum(totals.values())
+    print(f"\n📚 語料 {len(pages)} 頁 × {args.repeat} 次 | " + " | ".join(f"{c} {v // args.repeat} 頁" for c, v in sorted(totals.items())))
+    print(f"⚡ 整頁解析: {n / elapsed:,.0f} records/s ({elapsed / n * 1e6:,.1f} µs/頁)")
+    print("\n⏱️ 各欄位平均耗時 (µs/頁):")
+    for (city, field), t in sorted(field_time.items(), key=lambda kv: -kv[1]):
+        print(f"   {city} {field:<14} {t / field_calls[(city, field)] * 1e6:8.2f}")
+
+    if args.write_golden:
+        with open(args.write_golden, "w", encoding="utf-8") as f:
+            for page_id in sorted(results):
+                f.write(json.dumps({"id": page_id, "record": results[page_id]}, ensure_ascii=False) + "\n")
+        print(f"\n💾 黃金輸出已寫入: {args.write_golden} ({len(results)} 頁)")
+
+    if args.golden:
+        with open(args.golden, encoding="utf-8") as f:
+            golden = {row["id"]: row["record"] for row in map(json.loads, f)}
+        field_diffs, examples, missing, added = diff_golden(results, golden)
+        print(f"\n🔍 與黃金輸出比對 ({len(golden)} 頁):")
+        if not field_diffs and not missing and not added:
+            print("   ✅ 全部一致")
+        for field, count in field_diffs.most_common():
+            print(f"   ❌ {field}: {count} 頁不同")
+            for page_id, exp, got in examples[field]:
+                print(f"      {page_id}\n         黃金: {exp!r}\n         目前: {got!r}")
+        if missing: print(f"   ⚠️ 黃金有、語料缺少: {len(missing)} 頁")
+        if added: print(f"   ⚠️ 語料新增、黃金沒有: {len(added)} 頁")
+        return 1 if field_diffs else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
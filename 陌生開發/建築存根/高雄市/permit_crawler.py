@@ -0,0 +1,733 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""🏗️ 共用爬蟲引擎：查詢、重試、限速、斷點、存檔、排程都在這裡，城市差異交給 CityAdapter。
+
+新增一個縣市 = 寫一個 CityAdapter 子類別：
+- query_path / http_engine_class：查詢頁與直連引擎 (permit_http)
+- fill_query_form()：填年份、號碼、驗證碼並送出 (驗證碼怎麼讀由城市決定)
+- wait_for_results()：等查詢結果，回傳 FOUND / EMPTY / FAILED (用 page_waits 等訊號，不固定 sleep)
+- result_link_locator：結果表格裡的詳情連結
+- parse_detail()：詳情頁 innerText → 一筆紀錄 (行政區表也在城市腳本)
+再用 CrawlSettings 帶入城市腳本頂端的設定，呼叫 run_city() 即可。
+城市腳本帶參數執行進 city_main()：多個行程 / 多台主機分片 (plan / work / status，租約佇列在 crawl_leases)、
+從存下的原始頁面重建輸出 (reparse)。
+限速、瀏覽器池、批次 CSV、SQLite、上限探測、增量模式等效能改進都在引擎裡，所有城市一起受惠。
+"""
+import argparse
+import copy
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlparse
+
+import requests
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.by import By
+
+from crawl_scheduler import CrawlScheduler, YearJob
+from crawl_checkpoint import open_checkpoint, FOUND, EMPTY, FAILED
+from crawl_leases import LeaseQueue
+from csv_batch_writer import get_csv_writer, flush_csv, close_all_writers
+from driver_pool import DriverPool
+from crawl_metrics import METRICS, STEP_TIMER, timed, start_metrics_server, log_summary
+from page_waits import wait_for, all_of, element_present, text_contains
+from page_corpus import save_page
+from permit_http import HttpStatusError, HttpEngineUnsupported
+from permit_store import get_store, close_all_stores
+from rate_limiter import get_limiter, classify_error, OK, ALERT, ERROR
+from response_cache import get_cache, close_all_caches
+from range_discovery import plan_year_range, plan_incremental_range, recent_roc_years
+from reparse import reparse_corpus, write_records_csv
+from xlsx_export import csv_to_xlsx, build_workbook
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlSettings:
+    """城市腳本頂端的設定值，原樣交給引擎"""
+
+    def __init__(self, output_dir, csv_columns, start_num=1, end_num=3000, max_consecutive_fails=20, max_retries=2,
+                 engine="http", concurrency=5, host_rate_limit=1.0, host_initial_rate=None, detail_concurrency=4,
+                 csv_flush_rows=50, csv_flush_seconds=5.0, csv_durability="fsync", sqlite_path=None, capture_dir=None,
+                 capture_html=False,
+                 range_discovery=True, discovery_window=5, discovery_margin=50, discovery_sample_step=25,
+                 crawl_mode="full", recheck_window=50, incremental_years=None,
+                 year_excel=False, consolidated_xlsx=False, metrics_port=None, browser_profile="full",
+                 cache_path=None, cache_ttl=7 * 86400, cache_max_bytes=512 * 2**20):
+        self.output_dir = output_dir
+        self.csv_columns = list(csv_columns)
+        self.start_num = start_num
+        self.end_num = end_num
+        self.max_consecutive_fails = max_consecutive_fails
+        self.max_retries = max_retries
+        self.engine = engine
+        self.concurrency = concurrency
+        self.host_rate_limit = host_rate_limit
+        self.host_initial_rate = host_initial_rate  # 限速器起始速率；None = 上限的 40%
+        self.detail_concurrency = detail_concurrency
+        self.csv_flush_rows = csv_flush_rows
+        self.csv_flush_seconds = csv_flush_seconds
+        self.csv_durability = csv_durability
+        self.sqlite_path = sqlite_path
+        self.capture_dir = capture_dir
+        self.capture_html = capture_html
+        self.range_discovery = range_discovery
+        self.discovery_window = discovery_window
+        self.discovery_margin = discovery_margin
+        self.discovery_sample_step = discovery_sample_step
+        self.crawl_mode = crawl_mode
+        self.recheck_window = recheck_window
+        self.incremental_years = incremental_years
+        self.year_excel = year_excel
+        self.consolidated_xlsx = consolidated_xlsx
+        self.metrics_port = metrics_port
+        self.browser_profile = browser_profile
+        self.cache_path = cache_path
+        self.cache_ttl = cache_ttl
+        self.cache_max_bytes = cache_max_bytes
+
+
+class CityAdapter:
+    """城市外掛：只描述「這個城市的查詢站長怎樣」，流程都在 PermitCrawler"""
+
+    city = ""                   # 城市名稱 (斷點檔、資料庫、語料用)
+    query_path = ""             # 查詢頁路徑 (接在 site_root 後面)
+    http_engine_class = None    # permit_http 的直連引擎；None = 只能用瀏覽器
+    result_link_locator = None  # Selenium：結果表格裡的詳情連結
+    detail_ready_text = "執照"   # 詳情頁表格出現且文字含這個才讀 (內容可能由 JS 後填)
+    districts = ()              # 行政區表 (parse_detail 用)
+
+    def __init__(self, site_root):
+        self.site_root = site_root.rstrip("/")
+        self.host = urlparse(self.site_root).netloc
+
+    @property
+    def query_url(self):
+        return self.site_root + self.query_path
+
+    def make_http_engine(self):
+        return self.http_engine_class(site_root=self.site_root) if self.http_engine_class else None
+
+    def fill_query_form(self, driver, year, num_str):
+        """查詢頁已載入：填表 + 驗證碼 + 送出；驗證碼讀不到回傳 False"""
+        raise NotImplementedError
+
+    def wait_for_results(self, driver):
+        """送出後等結果：FOUND (有結果連結) / EMPTY (查無資料) / FAILED (逾時、看不懂)"""
+        raise NotImplementedError
+
+    def parse_detail(self, full_text, search_num, year):
+        """詳情頁 innerText → 一筆紀錄 (CSV 欄名 dict)；不像執照頁面時回傳 None"""
+        raise NotImplementedError
+
+
+def host_limiter(adapter, settings):
+    """這個城市主機的限速器 (上限 / 起始速率都取自設定，跟排程器建的是同一個)"""
+    kwargs = {"max_rate": settings.host_rate_limit, "initial_rate": settings.host_initial_rate}
+    return get_limiter(adapter.host, **{k: v for k, v in kwargs.items() if v})
+
+
+class PermitCrawler:
+    """單一 (城市, 年份) 的查詢 worker：排程器每個 slot 一個，彼此不共用瀏覽器"""
+
+    # 直連連續幾號看不懂回應就放棄，這個 worker 之後都走 Selenium (每號先撞一次直連再退回太浪費)
+    http_give_up_after = 5
+
+    def __init__(self, adapter, settings, target_year, start_num, end_num, output_filename,
+                 engine=None, driver_pool=None):
+        self.adapter = adapter
+        self.settings = settings
+        self.url = adapter.query_url
+        self.engine = engine or settings.engine
+        self.http = adapter.make_http_engine() if self.engine == "http" else None
+        self._http_misses = 0  # 直連連續看不懂回應的號數
+        self.target_year = target_year
+        self.start_num = start_num
+        self.end_num = end_num
+        self.output_filename = output_filename
+        self.csv_filename = output_filename.replace(".xlsx", ".csv")
+        self.driver = None
+        self.driver_pool = driver_pool
+        self._detail_pool = None
+        # 🚦 同主機共用的自適應限速器
+        self.limiter = host_limiter(adapter, settings)
+        self.target_folder = os.path.join(settings.output_dir, self.target_year)
+        os.makedirs(self.target_folder, exist_ok=True)
+        self.init_csv()
+        self.store = get_store(settings.sqlite_path) if settings.sqlite_path else None
+        # 📦 回應快取：重試 / 重跑時查詢結果與詳情頁都在就不連網
+        self.cache = get_cache(settings.cache_path, ttl=settings.cache_ttl,
+                               max_bytes=settings.cache_max_bytes) if settings.cache_path else None
+        self._cached = None  # needs_network() 剛查過的 (號碼, 快取頁面或 None)，下一次查詢不用再讀
+        # 💾 斷點紀錄：重啟時跳過已完成的號碼
+        self.checkpoint = open_checkpoint(self.target_folder, adapter.city, self.target_year)
+
+    @property
+    def label(self):
+        return f"{self.adapter.city}{self.target_year}年"
+
+    # ---------- 存檔 ----------
+    def init_csv(self):
+        # 同一個檔案全行程共用一個寫入者 (只有新檔才寫 Header)
+        s = self.settings
+        csv_path = os.path.join(self.target_folder, self.csv_filename)
+        self.csv_writer = get_csv_writer(csv_path, s.csv_columns, max_rows=s.csv_flush_rows,
+                                         max_seconds=s.csv_flush_seconds, durability=s.csv_durability)
+
+    def save_row_to_csv(self, record):
+        """🔥 數據保全核心：批次落地，最多遺失 csv_flush_seconds 秒"""
+        self.csv_writer.write_row(record)
+
+    def save_record(self, record):
+        """資料庫 upsert + CSV 批次寫入"""
+        if self.store: self.store.upsert(self.adapter.city, self.target_year, record)
+        self.save_row_to_csv(record)
+
+    def process_detail_text(self, full_text, search_num, html=None, url=None):
+        """詳情頁文字 → 解析 → 存檔 (Selenium / 直連共用)；有存到回傳 True
+
+        空白頁、不像執照頁 (parse_detail 回傳 None)、解析或存檔出錯都回傳 False，
+        呼叫端要把這個號碼記成 FAILED 重查，不能當成有資料記斷點 (否則這筆就永遠漏掉)。
+        """
+        if not (full_text or "").strip():
+            logger.error(f"   ❌ [{self.label}][{search_num}] 詳情頁空白: {url}")
+            return False
+        if self.settings.capture_dir:
+            save_page(self.settings.capture_dir, self.adapter.city, self.target_year, search_num, full_text,
+                      html if self.settings.capture_html else None, url)
+        try:
+            with timed("解析"): record = self.adapter.parse_detail(full_text, search_num, self.target_year)
+        except Exception as e:
+            record, error = None, e
+        else:
+            error = "不像執照詳情頁" if record is None else None
+        if error:
+            logger.error(f"   ❌ [{self.label}][{search_num}] 解析失敗: {error}")
+            # 快取裡的可能就是壞頁 (錯誤頁、載到一半)，丟掉讓重試重新抓
+            if self.cache and url: self.cache.drop_detail(url)
+            return False
+        try:
+            with timed("存檔"): self.save_record(record)
+        except Exception as e:
+            logger.error(f"   ❌ [{self.label}][{search_num}] 存檔失敗: {e}")
+            return False
+        METRICS.inc("permit_records_total", city=self.adapter.city, year=self.target_year)
+        logger.info(f"   ✅ [{self.label}] 已寫入: {record['執照號碼']} | {record['行政區']}")
+        return True
+
+    # ---------- 瀏覽器 ----------
+    def init_driver(self):
+        # 從池子借一台，不再每次重新啟動 Chrome
+        self.driver = self.driver_pool.acquire()
+
+    def close_driver(self):
+        if self.driver:
+            self.driver_pool.release(self.driver)
+            self.driver = None
+
+    def get_full_text_safe(self):
+        """取不到 (alert 擋住、分頁已關) 回傳空字串，由 process_detail_text 判為失敗"""
+        try: return self.driver.execute_script("return document.body.innerText;") or ""
+        except WebDriverException: return ""
+
+    def process_detail_page(self, search_num, href=None):
+        """目前分頁的詳情頁 → 解析存檔；有存到回傳 True"""
+        try:
+            with timed("詳情頁"):
+                ready = all_of(element_present((By.TAG_NAME, "table")), text_contains(self.adapter.detail_ready_text))
+                if not wait_for(self.driver, ready, 15): raise TimeoutError("詳情頁 15 秒內未就緒")
+            html = self.driver.page_source if self.settings.capture_dir and self.settings.capture_html else None
+            text = self.get_full_text_safe()
+            url = self.driver.current_url
+        except (TimeoutError, WebDriverException) as e:
+            logger.error(f"   ❌ [{self.label}][{search_num}] 詳情頁載入失敗: {e}")
+            return False
+        if self.cache and href: self.cache.put_detail(href, text)
+        return self.process_detail_text(text, search_num, html, url)
+
+    # ---------- 快取 ----------
+    def cached_pages(self, num_str):
+        """快取裡有這號的查詢結果且每個詳情頁都在 → [(連結, 文字)]；缺任何一頁回傳 None"""
+        if self._cached and self._cached[0] == num_str:
+            pages, self._cached = self._cached[1], None
+            return pages
+        hrefs = self.cache.get_search(self.adapter.city, self.target_year, num_str) if self.cache else None
+        if not hrefs: return None
+        pages = [(href, self.cache.get_detail(href)) for href in hrefs]
+        return pages if all(text for _, text in pages) else None
+
+    def needs_network(self, i):
+        """這號要不要打網站 (決定要不要排限速)：斷點已完成、或快取齊全就不用"""
+        if not self.checkpoint.should_fetch(i): return False
+        if not self.cache: return True
+        num_str = f"{i:05d}"
+        pages = self.cached_pages(num_str)
+        self._cached = (num_str, pages)
+        return pages is None
+
+    def search_and_process_cached(self, num_str):
+        pages = self.cached_pages(num_str)
+        if not pages: return None
+        logger.info(f"📦 [{self.label}][{num_str}] 快取 {len(pages)} 筆 (不連網)")
+        saved = sum(self.process_detail_text(text, num_str, url=href) for href, text in pages)
+        return self.detail_status(num_str, saved, len(pages))
+
+    # ---------- 查詢 ----------
+    def fetch_detail_http(self, href):
+        """單一詳情頁 (詳情池的執行緒跑)：快取有就直接用；否則照限速出發，延遲回報給限速器"""
+        text = self.cache.get_detail(href) if self.cache else None
+        if text: return None, text
+        self.limiter.wait()
+        t0 = time.monotonic()
+        html, text = self.http.fetch_detail(href)
+        latency = time.monotonic() - t0
+        self.limiter.record(OK, latency)
+        STEP_TIMER.record("直連詳情", latency)
+        if self.cache: self.cache.put_detail(href, text)
+        return html, text
+
+    def search_and_process_http(self, num_str):
+        """⚡ 直連查詢：回傳 FOUND / EMPTY / FAILED (詳情頁沒全部存到)，看不懂回應時丟 HttpEngineError"""
+        # 上次查到了、只是詳情頁沒抓齊：查詢結果直接用快取
+        hrefs = self.cache.get_search(self.adapter.city, self.target_year, num_str) if self.cache else None
+        if not hrefs:
+            t0 = time.monotonic()
+            hrefs = self.http.search(self.target_year, num_str)
+            latency = time.monotonic() - t0
+            self.limiter.record(OK if hrefs else ALERT, latency)
+            STEP_TIMER.record("直連查詢", latency)
+            if not hrefs: return EMPTY
+            if self.cache: self.cache.put_search(self.adapter.city, self.target_year, num_str, hrefs)
+        logger.info(f"🔎 [{self.label}][{num_str}] 找到 {len(hrefs)} 筆 (直連)")
+        if len(hrefs) == 1 or self.settings.detail_concurrency <= 1:
+            pages = map(self.fetch_detail_http, hrefs)
+        else:
+            # 一號多筆：詳情頁同時抓 (共用 Session 連線池)，依原順序解析存檔
+            if not self._detail_pool:
+                self._detail_pool = ThreadPoolExecutor(max_workers=self.settings.detail_concurrency)
+            pages = self._detail_pool.map(self.fetch_detail_http, hrefs)
+        saved = sum(self.process_detail_text(text, num_str, html, href) for href, (html, text) in zip(hrefs, pages))
+        return self.detail_status(num_str, saved, len(hrefs))
+
+    def detail_status(self, num_str, saved, total):
+        """詳情頁全部存到才算 FOUND；有任何一頁失敗整號記 FAILED 重查 (已存的會重寫一次，合併時去重)"""
+        if saved == total: return FOUND
+        logger.warning(f"⚠️ [{self.label}][{num_str}] 詳情頁只存到 {saved}/{total} 筆，稍後重查")
+        return FAILED
+
+    def search_and_process_selenium(self, num_str):
+        try:
+            with timed("查詢頁"): self.driver.get(self.url)
+            with timed("填表"): filled = self.adapter.fill_query_form(self.driver, self.target_year, num_str)
+            if not filled:
+                logger.warning(f"⚠️ [{self.label}][{num_str}] 驗證碼讀取失敗")
+                return FAILED
+            with timed("等結果"): status = self.adapter.wait_for_results(self.driver)
+            if status != FOUND: return status
+            return self.open_result_links(num_str)
+        except Exception as e:
+            # 交給池子 ping：真的崩潰才重開；冷卻交給限速器退避
+            logger.warning(f"⚠️ [{self.label}][{num_str}] 連線異常: {e}")
+            self.driver_pool.mark_error(self.driver)
+            return FAILED
+
+    def open_result_links(self, num_str):
+        """結果連結一次收齊 → 每批 detail_concurrency 個分頁同時載入 → 依序等表格、解析、關分頁"""
+        hrefs = [a.get_attribute('href') for a in self.driver.find_elements(*self.adapter.result_link_locator)]
+        hrefs = [h for h in hrefs if h]
+        if not hrefs: return EMPTY
+        logger.info(f"🔎 [{self.label}][{num_str}] 找到 {len(hrefs)} 筆")
+        if self.cache: self.cache.put_search(self.adapter.city, self.target_year, num_str, hrefs)
+        main_window = self.driver.current_window_handle
+        batch_size = max(1, self.settings.detail_concurrency)
+        saved = 0
+        for b in range(0, len(hrefs), batch_size):
+            tabs = []
+            for href in hrefs[b:b + batch_size]:
+                # 快取有的詳情頁不用開分頁
+                text = self.cache.get_detail(href) if self.cache else None
+                if text:
+                    saved += self.process_detail_text(text, num_str, url=href)
+                    continue
+                self.limiter.wait()
+                before = set(self.driver.window_handles)
+                self.driver.execute_script("window.open(arguments[0], '_blank');", href)
+                tabs += [(w, href) for w in self.driver.window_handles if w not in before]
+            # 分頁在背景同時載入，這裡只是輪流收成
+            for tab, href in tabs:
+                self.driver.switch_to.window(tab)
+                saved += self.process_detail_page(num_str, href)
+                self.driver.close()
+            self.driver.switch_to.window(main_window)
+        return self.detail_status(num_str, saved, len(hrefs))
+
+    def search_and_process_single_try(self, number_val):
+        """單次查詢，回傳 FOUND / EMPTY / FAILED"""
+        num_str = f"{number_val:05d}"
+        status = self.search_and_process_cached(num_str)
+        if status: return status
+        if self.http:
+            try:
+                status = self.search_and_process_http(num_str)
+                self._http_misses = 0
+                return status
+            except Exception as e:
+                METRICS.inc("permit_http_fallbacks_total", city=self.adapter.city)
+                logger.warning(f"⚠️ [{self.label}][{num_str}] 直連失敗，改用瀏覽器: {e}")
+                self.http_failed(e)
+
+        if not self.driver: self.init_driver()
+        status = self.search_and_process_selenium(num_str)
+        # 失敗交給限速器降速 + 指數退避；整輪含開分頁，只回報結果不計延遲
+        self.limiter.record({FOUND: OK, EMPTY: ALERT}.get(status, ERROR))
+        # 依頁數 / 記憶體 / 錯誤率決定要不要換一台
+        self.driver = self.driver_pool.check(self.driver)
+        return status
+
+    def http_failed(self, error):
+        """直連失敗：連線層錯誤回報限速器；看不懂回應 (改版、SPA 空殼) 不降速，連續太多次就停用直連"""
+        if isinstance(error, (requests.RequestException, HttpStatusError)):
+            self.limiter.record(classify_error(error))
+            return
+        self._http_misses += 1
+        if isinstance(error, HttpEngineUnsupported) or self._http_misses >= self.http_give_up_after:
+            logger.warning(f"🔌 [{self.label}] 直連無法處理這個查詢站，此 worker 之後改用瀏覽器")
+            self.http.close()
+            self.http = None
+
+    def process_number(self, i):
+        """單一號碼 (含重試)，有資料回傳 True；已有斷點紀錄的號碼不再查詢"""
+        if not self.checkpoint.should_fetch(i):
+            return self.checkpoint.status(i) == FOUND
+
+        status = FAILED
+        for retry in range(self.settings.max_retries):
+            if retry:
+                METRICS.inc("permit_retries_total", city=self.adapter.city, year=self.target_year)
+                if self.needs_network(i): self.limiter.wait()
+            result = self.search_and_process_single_try(i)
+            if result == FOUND:
+                status = FOUND
+                break
+            if result == EMPTY: status = EMPTY
+        METRICS.inc("permit_numbers_total", city=self.adapter.city, year=self.target_year, status=status)
+        # 資料落地 CSV 後才記斷點，崩潰時最多重查這幾號
+        self.csv_writer.after_commit(lambda: self.checkpoint.mark(i, status))
+        return status == FOUND
+
+    def probe_number(self, i):
+        """排程器以外的單號查詢 (上限探測)：照限速等候，斷點跳過 / 快取齊全的號碼不用等"""
+        if self.needs_network(i): self.limiter.wait()
+        return self.process_number(i)
+
+    def close(self):
+        self.close_driver()
+        if self._detail_pool:
+            self._detail_pool.shutdown(wait=False)
+            self._detail_pool = None
+        if self.http: self.http.close()
+
+
+def export_year_excel(settings, year, output_filename):
+    """年份結束後從已落地的 CSV 串流產出 Excel (openpyxl write_only)"""
+    folder = os.path.join(settings.output_dir, year)
+    csv_path = os.path.join(folder, output_filename.replace(".xlsx", ".csv"))
+    flush_csv(csv_path)
+    try:
+        if not os.path.exists(csv_path):
+            logger.info(f"⚠️ [{year}年] 無資料")
+            return
+        output_path = os.path.join(folder, output_filename)
+        n = csv_to_xlsx(csv_path, output_path, sheet_name=f"{year}年")
+        if n == 0:
+            os.remove(output_path)
+            logger.info(f"⚠️ [{year}年] 無資料")
+            return
+        logger.info(f"💾 [{year}年] Excel 產出: {output_path} ({n} 筆)")
+    except Exception as e:
+        logger.error(f"❌ [{year}年] Excel 產出失敗: {e}")
+
+
+def discover_year_range(make_crawler, settings, year):
+    """🧭 探測單一年份的號碼上限，回傳要密集掃描的 (起, 迄)"""
+    bot = make_crawler(year)
+    try:
+        return plan_year_range(bot.probe_number, settings.start_num, settings.end_num,
+                               known=bot.checkpoint.max_found(), window=settings.discovery_window,
+                               margin=settings.discovery_margin, sample_step=settings.discovery_sample_step,
+                               label=bot.label)
+    finally:
+        bot.close()
+
+
+def incremental_year_range(adapter, settings, year):
+    """🔁 增量模式：從斷點紀錄的前沿往後查，回傳 (起, 迄)"""
+    checkpoint = open_checkpoint(os.path.join(settings.output_dir, year), adapter.city, year)
+    return plan_incremental_range(checkpoint, settings.start_num, settings.end_num, settings.recheck_window,
+                                  label=f"{adapter.city}{year}年")
+
+
+def plan_year_ranges(adapter, settings, years, make_crawler):
+    """各年份要掃的範圍 → ({年份: (起, 迄)}, 連續空號停損；None = 範圍內整段掃完)"""
+    s = settings
+    if s.crawl_mode == "incremental":
+        # 增量：前沿之後有多少號未知，仍靠連續空號停損收尾
+        return {year: incremental_year_range(adapter, s, year) for year in years}, s.max_consecutive_fails
+    if s.range_discovery:
+        # 各年份同時探測，節奏一樣由限速器控制；密集區內不停損
+        with ThreadPoolExecutor(max_workers=min(s.concurrency, len(years))) as pool:
+            ranges = dict(zip(years, pool.map(lambda y: discover_year_range(make_crawler, s, y), years)))
+        return ranges, None
+    return {year: (s.start_num, s.end_num) for year in years}, s.max_consecutive_fails
+
+
+def run_city(adapter, settings, year_batches, filename_for, driver_pool=None):
+    """整個城市的排程：探測 / 增量 → 共用佇列平行查詢 → (選配) Excel
+
+    filename_for(年份, 標籤, 時間戳) → 輸出檔名 (.xlsx，CSV 同名)；標籤為 ALL_AT_ONCE / DELTA。
+    """
+    s = settings
+    stamp = datetime.now().strftime('%Y%m%d_%H%M')
+    incremental = s.crawl_mode == "incremental"
+    # 增量模式只跑最近的年份
+    batches = [s.incremental_years or recent_roc_years()] if incremental else year_batches
+    tag = "DELTA" if incremental else "ALL_AT_ONCE"
+    year_csvs = {}
+    metrics_server = start_metrics_server(s.metrics_port) if s.metrics_port else None
+
+    for batch in batches:
+        logger.info(f"======== 🎬 [{adapter.city}] 開始執行批次：{batch} | 模式: {s.crawl_mode} ========")
+        filenames = {year: filename_for(year, tag, stamp) for year in batch}
+        for year in batch:
+            year_csvs[f"{year}年"] = os.path.join(s.output_dir, year, filenames[year].replace(".xlsx", ".csv"))
+
+        def make_crawler(year):
+            return PermitCrawler(adapter, s, year, s.start_num, s.end_num, filenames[year], driver_pool=driver_pool)
+
+        try:
+            ranges, stop_loss = plan_year_ranges(adapter, s, batch, make_crawler)
+            scheduler = CrawlScheduler(concurrency=s.concurrency, host_rate_limits={adapter.host: s.host_rate_limit},
+                                       host_initial_rates={adapter.host: s.host_initial_rate})
+            for year in batch:
+                lo, hi = ranges.get(year, (s.start_num, s.end_num))
+                scheduler.add_job(YearJob(
+                    adapter.city, year, adapter.host, range(lo, hi + 1),
+                    make_worker=lambda y=year: make_crawler(y),
+                    max_consecutive_fails=stop_loss,
+                    on_finish=(lambda y=year: export_year_excel(s, y, filenames[y])) if s.year_excel else None,
+                ))
+            scheduler.run_sync()
+        finally:
+            if driver_pool: driver_pool.close_all()
+            close_all_writers()
+            close_all_stores()
+            close_all_caches()
+
+    if s.consolidated_xlsx:
+        # 本次各年份 CSV 串流合併成一個活頁簿 (「全部」+ 每年一張工作表)
+        try: build_workbook(os.path.join(s.output_dir, filename_for("ALL_YEARS", tag, stamp)), year_csvs)
+        except Exception as e: logger.error(f"❌ 合併活頁簿產出失敗: {e}")
+
+    log_summary()
+    if metrics_server: metrics_server.shutdown()
+
+
+# ======== 🧩 分片模式：協調者切租約 → 多個行程 / 主機領租約來做 ========
+
+def shard_owner():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def shard_filename(file_prefix, year, owner):
+    """每個 worker 寫自己的 CSV (多個行程不搶同一個檔)，事後用 permit_merge.py 合併去重"""
+    return f"{file_prefix}_{year}_SHARD_{owner}.csv"
+
+
+def plan_shards(adapter, settings, years, queue, file_prefix, shard_size=100):
+    """協調者：探測 / 增量規劃每年範圍 (跟 run_city 同一套)，切成租約寫入佇列"""
+    s = settings
+    incremental = s.crawl_mode == "incremental"
+    if incremental: years = s.incremental_years or recent_roc_years()
+    # 增量每天一輪 (隔天同一區間要能再發)；整年掃描同一個佇列檔重複 plan 不會多出租約
+    run = f"DELTA_{datetime.now():%Y%m%d}" if incremental else "FULL"
+    owner = shard_owner()
+    driver_pool = DriverPool(size=s.concurrency, profile=s.browser_profile)
+
+    def make_crawler(year):
+        # 探測時查到的資料照樣存下來
+        return PermitCrawler(adapter, s, year, s.start_num, s.end_num, shard_filename(file_prefix, year, owner),
+                             driver_pool=driver_pool)
+
+    try:
+        ranges, stop_loss = plan_year_ranges(adapter, s, years, make_crawler)
+    finally:
+        driver_pool.close_all()
+        close_all_writers()
+        close_all_stores()
+        close_all_caches()
+    for year in years:
+        lo, hi = ranges[year]
+        added = queue.plan(adapter.city, year, lo, hi, shard_size=shard_size, stop_loss=stop_loss, run=run)
+        logger.info(f"📮 [{adapter.city}{year}年] {lo}~{hi} 每 {shard_size} 號一張租約，新增 {added} 張 ({run})")
+
+
+def run_lease(adapter, settings, queue, lease, filename, driver_pool, ttl):
+    """做一張租約：排程器跑 [lo, hi]，背景定期續約；回傳是否正常交回"""
+    s = settings
+    # 別的行程可能剛做過同一年 (或是這張的前一位持有者當掉前做了一半)，先同步斷點
+    open_checkpoint(os.path.join(s.output_dir, lease.year), adapter.city, lease.year).reload()
+    label = f"{lease.city}{lease.year}年 {lease.lo}~{lease.hi}"
+    logger.info(f"📥 領到租約 [{label}] (第 {lease.attempts} 次)")
+
+    stop, lost = threading.Event(), threading.Event()
+
+    def heartbeat():
+        while not stop.wait(ttl / 3):
+            if not queue.renew(lease, ttl):
+                lost.set()
+                logger.warning(f"⚠️ 租約 [{label}] 已被接手 (續約太晚)，做完這段不交回")
+                return
+
+    threading.Thread(target=heartbeat, name=f"lease-{lease.id}", daemon=True).start()
+    job = YearJob(adapter.city, lease.year, adapter.host, range(lease.lo, lease.hi + 1),
+                  make_worker=lambda: PermitCrawler(adapter, s, lease.year, lease.lo, lease.hi, filename,
+                                                    driver_pool=driver_pool),
+                  max_consecutive_fails=lease.stop_loss)
+    scheduler = CrawlScheduler(concurrency=s.concurrency, host_rate_limits={adapter.host: s.host_rate_limit},
+                               host_initial_rates={adapter.host: s.host_initial_rate})
+    scheduler.add_job(job)
+    try:
+        scheduler.run_sync()
+        # 資料 (與其後的斷點) 落地才交回租約
+        flush_csv(os.path.join(s.output_dir, lease.year, filename))
+    except Exception as e:
+        logger.error(f"❌ 租約 [{label}] 失敗，放回佇列: {e}")
+        queue.release(lease)
+        return False
+    finally:
+        stop.set()
+    if lost.is_set(): return False
+    queue.complete(lease, found=job.found)
+    logger.info(f"✅ 租約 [{label}] 完成 | 有資料 {job.found} 號")
+    if job.stopped:
+        skipped = queue.skip_after(lease)
+        if skipped: logger.info(f"🛑 [{lease.city}{lease.year}年] 連續空號停損，略過後面 {skipped} 張租約")
+    return True
+
+
+def shard_worker(adapter, settings, queue_path, file_prefix, ttl=300.0):
+    """worker 行程：一直領租約來做；佇列空了但別人手上還有 (可能過期被接手) 就等，全部做完才結束"""
+    s = settings
+    owner = shard_owner()
+    queue = LeaseQueue(queue_path)
+    driver_pool = DriverPool(size=s.concurrency, profile=s.browser_profile)
+    done = 0
+    logger.info(f"🟢 [{owner}] worker 啟動 | 佇列: {queue_path} | 每秒上限 {s.host_rate_limit:.2f}")
+    try:
+        while True:
+            lease = queue.claim(owner, ttl, city=adapter.city)
+            if lease is None:
+                if not queue.active(adapter.city): break
+                time.sleep(min(30.0, ttl / 3))
+                continue
+            if run_lease(adapter, s, queue, lease, shard_filename(file_prefix, lease.year, owner), driver_pool, ttl):
+                done += 1
+    finally:
+        driver_pool.close_all()
+        close_all_writers()
+        close_all_stores()
+        close_all_caches()
+    logger.info(f"🏁 [{owner}] 佇列已清空，本行程完成 {done} 張租約")
+    log_summary()
+
+
+def log_queue_status(queue, output_dir):
+    for city, year, counts, found in queue.status():
+        parts = " / ".join(f"{k} {v}" for k, v in sorted(counts.items()))
+        logger.info(f"📮 {city}{year}年: {parts} | 有資料 {found} 號")
+    logger.info(f"💡 全部 done 之後合併各 worker 的 CSV: python permit_merge.py --input 城市={output_dir} --out 合併.csv")
+
+
+# ======== ♻️ 重新解析：語料庫 → CSV / 資料庫，不連網 ========
+
+def reparse_city(adapter, settings, file_prefix, years=None, workers=None):
+    """語料庫重跑解析，每年寫一份 REPARSE CSV (year_excel 時另出 Excel)，資料庫 upsert 蓋掉舊值"""
+    s = settings
+    if not s.capture_dir or not os.path.isdir(s.capture_dir):
+        logger.error(f"❌ 找不到語料庫 (CAPTURE_DIR = {s.capture_dir})，沒有原始頁面可以重新解析")
+        return 1
+    stamp = datetime.now().strftime('%Y%m%d_%H%M')
+    by_year = reparse_corpus(adapter, s.capture_dir, years, workers)
+    store = get_store(s.sqlite_path) if s.sqlite_path else None
+    try:
+        for year, records in sorted(by_year.items(), reverse=True):
+            filename = f"{file_prefix}_{year}_REPARSE_{stamp}" + (".xlsx" if s.year_excel else ".csv")
+            csv_path = os.path.join(s.output_dir, year, filename.replace(".xlsx", ".csv"))
+            write_records_csv(csv_path, s.csv_columns, records)
+            if store: store.upsert_many(adapter.city, year, records)
+            logger.info(f"💾 [{adapter.city}{year}年] {len(records)} 筆 → {csv_path}" + (" + 資料庫" if store else ""))
+            if s.year_excel: export_year_excel(s, year, filename)
+    finally:
+        close_all_stores()
+    return 0
+
+
+def city_main(adapter, settings, year_batches, file_prefix, argv=None):
+    """城市腳本帶參數執行時的進入點
+
+        python 城市腳本.py plan    [--queue 佇列.sqlite] [--shard-size 100]  # 協調者：切租約 (跑一次)
+        python 城市腳本.py work    [--queue 佇列.sqlite] [--processes 4]     # 每台主機各跑一個，行程數自訂
+        python 城市腳本.py status  [--queue 佇列.sqlite]
+        python 城市腳本.py reparse [--workers 8] [--year 114]                # 語料庫重跑解析，不連網
+
+    多台主機：BASE_PATH 與佇列檔都指到共用目錄；--rate 是「這台主機」的總速率，各主機加總別超過網站能承受的量。
+    """
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--queue", default=os.path.join(settings.output_dir, "shard_queue.sqlite"),
+                        help="租約佇列 SQLite (多台主機時放共用目錄)")
+    ap = argparse.ArgumentParser(description=f"{adapter.city} 分片爬取 / 重新解析")
+    sub = ap.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("plan", parents=[common], help="規劃每年範圍並切成租約")
+    p.add_argument("--shard-size", type=int, default=100, help="每張租約幾個號碼")
+    w = sub.add_parser("work", parents=[common], help="領租約來做，全部做完才結束")
+    w.add_argument("--processes", type=int, default=1, help="本機開幾個 worker 行程 (每個最多 CONCURRENCY 個 Chrome)")
+    w.add_argument("--ttl", type=float, default=300.0, help="租約秒數，過期沒續約就給別人接手")
+    w.add_argument("--rate", type=float, help="本機所有行程合計每秒查詢上限 (預設 HOST_RATE_LIMIT)")
+    sub.add_parser("status", parents=[common], help="各年份租約進度")
+    r = sub.add_parser("reparse", help="用存下的原始頁面重跑解析，重建 CSV / 資料庫")
+    r.add_argument("--workers", type=int, help="平行行程數 (預設 CPU 核心數)")
+    r.add_argument("--year", action="append", help="只重跑某些年份 (可多個；預設語料庫裡全部)")
+    args = ap.parse_args(argv)
+
+    if args.command == "reparse":
+        return reparse_city(adapter, settings, file_prefix, args.year, args.workers)
+    queue = LeaseQueue(args.queue)
+    if args.command == "plan":
+        plan_shards(adapter, settings, [y for batch in year_batches for y in batch], queue, file_prefix,
+                    shard_size=args.shard_size)
+        log_queue_status(queue, settings.output_dir)
+        return 0
+    if args.command == "status":
+        log_queue_status(queue, settings.output_dir)
+        return 0
+
+    # 每個行程各有自己的限速器，本機總速率平均分給各行程
+    n = max(1, args.processes)
+    s = copy.copy(settings)
+    s.host_rate_limit = (args.rate or settings.host_rate_limit) / n
+    if s.host_initial_rate: s.host_initial_rate /= n
+    if n == 1:
+        shard_worker(adapter, s, args.queue, file_prefix, args.ttl)
+        return 0
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=shard_worker, args=(adapter, s, args.queue, file_prefix, args.ttl), name=f"shard-{k}")
+             for k in range(n)]
+    for proc in procs: proc.start()
+    for proc in procs: proc.join()
+    log_queue_status(queue, settings.output_dir)
+    return max(proc.exitcode or 0 for proc in procs)
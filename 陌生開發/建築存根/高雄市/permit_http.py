@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""🚀 直連查詢引擎：不開瀏覽器，直接用 HTTP Session 打查詢 / 詳情頁。
+
+每個引擎持有一個 keep-alive 連線池 (requests.Session)，Cookie、驗證碼、
+表單欄位都在程式內處理。遇到看不懂的回應就丟 HttpEngineError，
+呼叫端 (爬蟲主程式) 接到後退回 Selenium 路徑。
+"""
+import logging
+import random
+import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 政府網站憑證鏈常不完整，與主程式的 SSL 修正一致：不驗證憑證
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# innerText 會換行的區塊元素
+_BLOCK_TAGS = {
+    "address", "article", "br", "caption", "dd", "div", "dl", "dt", "fieldset", "footer",
+    "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav",
+    "ol", "p", "pre", "section", "table", "tbody", "thead", "tfoot", "tr", "ul",
+}
+_SKIP_TAGS = {"script", "style", "noscript", "template", "head", "title"}
+_ALERT_RE = re.compile(r"""alert\s*\(\s*(['"])(.*?)\1""", re.S)
+# 查無資料的 alert 訊息；其他 alert (請輸入驗證碼、系統維護…) 不能當空號
+EMPTY_MARKERS = ("查無",)
+
+
+class HttpEngineError(Exception):
+    """直連引擎無法判讀回應，呼叫端應退回 Selenium。"""
+
+
+class HttpStatusError(HttpEngineError):
+    """伺服器回非 200 (過載、擋爬、維護)：跟連線錯誤一樣要讓限速器降速"""
+
+
+class HttpEngineUnsupported(HttpEngineError):
+    """查詢頁的結構直連處理不了 (例如欄位全在 Vue 元件裡)：這個 worker 之後直接走 Selenium，不用每號重試"""
+
+
+def build_session(pool_size=4):
+    """建立帶連線池與自動重試的 Session (一個 worker 一個)"""
+    session = requests.Session()
+    retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504), allowed_methods=None)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"User-Agent": USER_AGENT, "Accept-Language": "zh-TW,zh;q=0.9"})
+    session.verify = False
+    return session
+
+
+class PageScanner(HTMLParser):
+    """一次掃過 HTML：收集 innerText、表單欄位、表格內連結、指定 id 的文字"""
+
+    def __init__(self, watch_ids=()):
+        super().__init__(convert_charrefs=True)
+        self.watch_ids = set(watch_ids)
+        self.id_text = {}
+        self.forms = []
+        self.loose_fields = {}  # 不在 <form> 裡的欄位 (Vue 頁面常見)
+        self.table_links = []
+        self.table_classes = []  # 每個 <table> 的 class (判斷結果表格有沒有出現)
+        self.scripts = []        # 行內 <script> 內容
+        self.header_cells = []   # 每個 <th> 的文字 (認結果表格的表頭)
+        self._chunks = []
+        self._skip = 0
+        self._tables = []       # 巢狀 table 的 class 堆疊
+        self._in_td = 0
+        self._id_stack = []     # (tag, id) 目前正在收集文字的元素
+        self._form = None
+        self._in_script = False
+        self._th = None
+
+    # --- 結構 ---
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "script":
+            self.scripts.append("")
+            self._in_script = True
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+            return
+        if tag in _BLOCK_TAGS: self._chunks.append("\n")
+        if tag in ("td", "th"):
+            self._chunks.append("\t")
+            self._in_td += 1
+        if tag == "th": self._th = ""
+        if tag == "table":
+            self._tables.append((attrs.get("class") or "").split())
+            self.table_classes.append(tuple(self._tables[-1]))
+        if tag == "form":
+            self._form = {"action": attrs.get("action") or "", "method": (attrs.get("method") or "get").lower(), "fields": {}}
+            self.forms.append(self._form)
+        if tag in ("input", "select", "textarea") and attrs.get("name"):
+            target = self._form["fields"] if self._form is not None else self.loose_fields
+            if tag != "input" or (attrs.get("type") or "text").lower() not in ("button", "submit", "image", "reset"):
+                target.setdefault(attrs["name"], attrs.get("value") or "")
+        if tag == "a" and attrs.get("href") and self._tables and self._in_td:
+            self.table_links.append((attrs["href"], tuple(c for cls in self._tables for c in cls)))
+        if attrs.get("id") in self.watch_ids:
+            self._id_stack.append((tag, attrs["id"]))
+            self.id_text.setdefault(attrs["id"], "")
+            if attrs.get("value"): self.id_text[attrs["id"]] = attrs["value"]
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if self._id_stack and self._id_stack[-1][0] == tag: self._id_stack.pop()
+
+    def handle_endtag(self, tag):
+        if tag == "script": self._in_script = False
+        if tag in _SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+            return
+        if tag in _BLOCK_TAGS: self._chunks.append("\n")
+        if tag in ("td", "th"): self._in_td = max(0, self._in_td - 1)
+        if tag == "th" and self._th is not None:
+            self.header_cells.append(self._th.strip())
+            self._th = None
+        if tag == "table" and self._tables: self._tables.pop()
+        if tag == "form": self._form = None
+        if self._id_stack and self._id_stack[-1][0] == tag: self._id_stack.pop()
+
+    def handle_data(self, data):
+        if self._in_script: self.scripts[-1] += data
+        if self._skip: return
+        self._chunks.append(data)
+        if self._th is not None: self._th += data
+        for _, el_id in self._id_stack:
+            self.id_text[el_id] += data
+
+    # --- 結果 ---
+    def has_fields(self, *names):
+        """表單 / 散落欄位裡有任一個指定欄位 (用來認出查詢頁本身)"""
+        return any(n in f["fields"] for f in self.forms for n in names) or any(n in self.loose_fields for n in names)
+
+    def has_table(self, table_class):
+        return any(table_class in classes for classes in self.table_classes)
+
+    def text(self):
+        raw = "".join(self._chunks).replace("\xa0", " ")
+        lines = [re.sub(r"[ \t\r\f\v]+", lambda m: "\t" if "\t" in m.group(0) else " ", ln).strip() for ln in raw.split("\n")]
+        return "\n".join(ln for ln in lines if ln)
+
+
+def scan_html(html, watch_ids=()):
+    scanner = PageScanner(watch_ids)
+    scanner.feed(html)
+    scanner.close()
+    return scanner
+
+
+def html_to_text(html):
+    """近似 document.body.innerText，讓既有的文字解析邏輯可以直接套用"""
+    return scan_html(html).text()
+
+
+def find_alert(page):
+    """第一個行內 script 裡的 alert('…') 訊息 (只看 script 內容，頁面文字裡的字樣不算)"""
+    for script in page.scripts:
+        match = _ALERT_RE.search(script)
+        if match: return match.group(2)
+    return None
+
+
+def is_empty_alert(page, query_fields=()):
+    """查詢結果是「只有一個查無資料 alert」的回應頁
+
+    查詢頁本身 (SPA 外殼) 的 script 裡也可能寫著 alert('…') 或 查無 的樣板字串，
+    所以帶查詢欄位的頁面一律不算；alert 訊息也要是查無資料，其他提示 (驗證碼錯、維護中) 不算。
+    """
+    if query_fields and page.has_fields(*query_fields): return False
+    message = find_alert(page)
+    return message is not None and any(m in message for m in EMPTY_MARKERS)
+
+
+class _BaseHttpEngine:
+    def __init__(self, session=None, timeout=20):
+        self.session = session or build_session()
+        self.timeout = timeout
+
+    def _request(self, method, url, **kw):
+        resp = self.session.request(method, url, timeout=self.timeout, **kw)
+        if resp.status_code != 200:
+            raise HttpStatusError(f"{method} {url} -> HTTP {resp.status_code}")
+        # 沒宣告編碼時 requests 預設 ISO-8859-1，中文會變亂碼
+        if not resp.encoding or resp.encoding.lower() == "iso-8859-1":
+            resp.encoding = resp.apparent_encoding
+        return resp
+
+    def _get(self, url, **kw):
+        return self._request("GET", url, **kw)
+
+    def _post(self, url, data, **kw):
+        return self._request("POST", url, data=data, **kw)
+
+    def fetch_detail(self, href):
+        """抓詳情頁，回傳 (原始 HTML, innerText 格式文字)"""
+        resp = self._get(href)
+        text = html_to_text(resp.text)
+        if not text: raise HttpEngineError(f"詳情頁空白: {href}")
+        return resp.text, text
+
+    def close(self):
+        try: self.session.close()
+        except: pass
+
+
+class KaohsiungHttpEngine(_BaseHttpEngine):
+    """高雄 buildmis querylic 直連版
+
+    查詢頁的驗證碼是前端 Vue 自己產生、存在 app data 裡 (get_captcha_vue 讀的就是它)，
+    所以直連時由程式自行產生一組，與表單欄位一起送出。
+
+    ⚠️ 通訊協定是推測的：「驗證碼只在前端比對、後端只看 Session」、「查詢送到查詢頁 <form action>」
+    都只在 mock_permit_server.py 上驗證過，沒對正式站確認。所以一律從嚴 (fail closed)：
+    查詢頁沒有明確的 <form action>、回應不是結果表格也不是查無資料 alert，都丟 HttpEngineError 改走 Selenium。
+    """
+    site_root = "https://buildmis.kcg.gov.tw"
+    query_path = "/bupic/pages/querylic"
+    result_table_class = "licstable"
+    query_fields = ("license_yy", "license_no1", "inputCode")
+
+    def __init__(self, session=None, timeout=20, site_root=None):
+        super().__init__(session, timeout)
+        if site_root: self.site_root = site_root.rstrip("/")
+        self._primed = False
+
+    @property
+    def query_url(self):
+        return self.site_root + self.query_path
+
+    def _prime(self):
+        # 先進查詢頁拿 Session Cookie 與隱藏欄位
+        resp = self._get(self.query_url)
+        page = scan_html(resp.text)
+        form = next((f for f in page.forms if "license_yy" in f["fields"] or "license_no1" in f["fields"]), None)
+        if form is None or not form["action"]:
+            # 欄位散在 Vue 元件裡、由 XHR 送出：真正的端點不在 HTML 上，猜網址送不如直接交給瀏覽器
+            raise HttpEngineUnsupported("查詢頁沒有帶 action 的 license_yy / license_no1 表單")
+        self._form_action = urljoin(resp.url, form["action"])
+        self._hidden = {k: v for k, v in form["fields"].items() if k not in self.query_fields}
+        self._primed = True
+
+    def search(self, target_year, num_str):
+        """送出查詢，回傳詳情頁連結清單；空號回傳 []"""
+        if not self._primed: self._prime()
+        code = f"{random.randint(0, 9999):04d}"
+        data = dict(self._hidden, license_yy=target_year, license_no1=num_str, inputCode=code)
+        resp = self._post(self._form_action, data, headers={"Referer": self.query_url})
+        page = scan_html(resp.text)
+        links = [urljoin(resp.url, href) for href, classes in page.table_links if self.result_table_class in classes]
+        if links: return links
+        # 空號只認結果專屬的訊號：查無資料 alert 回應頁，或沒有任何列的結果表格
+        if is_empty_alert(page, self.query_fields) or page.has_table(self.result_table_class):
+            return []
+        # 看不懂的頁面 (改版、被擋、Session 失效)：下次重新取 Cookie，交給 Selenium
+        self._primed = False
+        if page.has_fields(*self.query_fields):
+            # 回來的還是查詢頁 (SPA 外殼，結果要靠前端 JS 填)：直連拿不到結果
+            raise HttpEngineError(f"回應是尚未填入結果的查詢頁 [{target_year}-{num_str}]")
+        raise HttpEngineError(f"無法判讀查詢結果 [{target_year}-{num_str}]")
+
+
+class TaoyuanHttpEngine(_BaseHttpEngine):
+    """桃園 bupic preLoginFormAction.do 直連版
+
+    驗證碼以明文放在 #checkCode 元素內，直接從 HTML 讀出後連同表單送出；
+    查詢結果的詳情連結 (*.do) 用 GET 直接抓，不用開分頁、不用等 2 秒。
+    """
+    site_root = "https://building.tycg.gov.tw"
+    query_path = "/bupic/preLoginFormAction.do"
+    query_fields = ("keYear", "keNo")
+    result_header = "執照號碼"  # 結果表格的表頭欄位
+
+    def __init__(self, session=None, timeout=20, site_root=None):
+        super().__init__(session, timeout)
+        if site_root: self.site_root = site_root.rstrip("/")
+
+    @property
+    def query_url(self):
+        return self.site_root + self.query_path
+
+    def _load_form(self):
+        # 每次查詢都重新取頁：驗證碼與 Session 綁定，一次一組
+        resp = self._get(self.query_url)
+        page = scan_html(resp.text, watch_ids=("checkCode",))
+        form = next((f for f in page.forms if "keNo" in f["fields"] or "keYear" in f["fields"]), None)
+        if form is None and not {"keNo", "keYear"} & set(page.loose_fields):
+            raise HttpEngineUnsupported("查詢頁找不到 keYear / keNo 欄位")
+        fields = dict(form["fields"] if form else page.loose_fields)
+        action = urljoin(resp.url, form["action"]) if form and form["action"] else resp.url
+        code = page.id_text.get("checkCode", "").strip()
+        if not code: raise HttpEngineError("查詢頁找不到驗證碼")
+        return action, fields, code
+
+    def search(self, target_year, num_str):
+        """送出查詢，回傳詳情頁連結清單；空號回傳 []"""
+        action, fields, code = self._load_form()
+        fields.update(keYear=target_year, keNo=num_str, checkCode=code)
+        resp = self._post(action, fields, headers={"Referer": self.query_url})
+        page = scan_html(resp.text)
+        links = [urljoin(resp.url, href) for href, _ in page.table_links if "do" in href]
+        if links: return links
+        # 回到查詢表單 = 驗證碼被退
+        if page.has_fields(*self.query_fields):
+            raise HttpEngineError(f"查詢被退回表單 [{target_year}-{num_str}]")
+        # 空號只認查無資料 alert，或有結果表頭、卻沒有任何詳情連結的結果表格；
+        # 錯誤頁、維護公告、Session 逾時頁就算有 <table> 也不算，交給 Selenium
+        if is_empty_alert(page) or self.result_header in page.header_cells: return []
+        raise HttpEngineError(f"無法判讀查詢結果 [{target_year}-{num_str}]")
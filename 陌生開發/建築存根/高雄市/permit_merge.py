@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""🧹 去重合併：把歷次執行留下的各年份 CSV 合成一份標準資料集，不用 pandas 全部讀進來再排序。
+
+重複的來源：每次執行的檔名都帶時間戳、重試、同一張執照出現在不同搜尋編號底下。
+做法 (兩趟串流，記憶體只放雜湊索引，不放整列資料)：
+1. 第一趟：每列算出鍵 (城市, 正規化執照號碼)，索引只記「目前最好的那一列在哪個檔的第幾列」
+   - 最好 = 有值的欄位最多；一樣多時取較新的檔 (修改時間)、較後面的列
+   - [需人工確認] 佔位列的鍵是 (城市, 年份, #搜尋編號, 佔位號碼) (佔位號碼帶頁面雜湊，同一號的不同頁各留一筆)；
+     同一個搜尋編號只要有任何一列解析出真的執照號碼，佔位列就丟掉
+2. 第二趟：依序重讀，只輸出被選中的列
+
+    python permit_merge.py --input 高雄市=/path/高雄市 --input 桃園市=/path/桃園市 --out merged.csv [--db permits.sqlite]
+
+--input 的目錄底下遞迴找 *.csv (年份取自上層資料夾名稱或執照號碼的「(114)」)。
+"""
+import argparse
+import csv
+import glob
+import logging
+import os
+import re
+import unicodedata
+
+from field_extractor import PLACEHOLDER
+from permit_store import FIELD_COLUMNS, get_store
+
+logger = logging.getLogger(__name__)
+
+FIELDNAMES = ["城市", "年份"] + [name for name, _ in FIELD_COLUMNS]
+
+_SPACE_RE = re.compile(r"\s+")
+_SERIAL_RE = re.compile(r"第0*(\d)")
+_YEAR_RE = re.compile(r"^\((\d{2,3})\)")
+_DIR_YEAR_RE = re.compile(r"^\d{2,3}$")
+
+
+def canonical_license(license_no):
+    """輸出用：全形轉半形、去空白，流水號前面的 0 保留 (跟爬蟲寫出的格式一致)"""
+    text = unicodedata.normalize("NFKC", license_no or "")
+    return text.strip() if PLACEHOLDER in text else _SPACE_RE.sub("", text)
+
+
+def normalize_license(license_no):
+    """比對用：'（114）高市建字第 00012 號' → '(114)高市建字第12號'；佔位 / 空白回傳 ''"""
+    text = canonical_license(license_no)
+    if not text or PLACEHOLDER in text: return ""
+    return _SERIAL_RE.sub(r"第\1", text)
+
+
+def record_key(city, year, record):
+    """(鍵, 是否為佔位)"""
+    license_no = normalize_license(record.get("執照號碼"))
+    if license_no: return (city, license_no), False
+    search_num = (record.get("搜尋編號") or "").strip()
+    return (city, str(year), "#" + search_num, canonical_license(record.get("執照號碼"))), True
+
+
+def _score(record):
+    return sum(1 for name, _ in FIELD_COLUMNS if (record.get(name) or "").strip())
+
+
+def find_csvs(root):
+    """root 底下的 CSV，舊檔在前 (同分時新檔勝出)"""
+    paths = glob.glob(os.path.join(root, "**", "*.csv"), recursive=True)
+    return sorted(paths, key=lambda p: (os.path.getmtime(p), p))
+
+
+def _year_of(path, record):
+    m = _YEAR_RE.match(normalize_license(record.get("執照號碼")))
+    if m: return m.group(1)
+    folder = os.path.basename(os.path.dirname(path))
+    return folder if _DIR_YEAR_RE.match(folder) else ""
+
+
+def iter_sources(sources):
+    """sources: [(城市, csv 路徑)] → (檔序, 列序, 城市, 年份, record)"""
+    for file_idx, (city, path) in enumerate(sources):
+        try:
+            with open(path, encoding="utf-8-sig", newline="") as f:
+                for row_idx, rec in enumerate(csv.DictReader(f)):
+                    yield file_idx, row_idx, city, _year_of(path, rec), rec
+        except (OSError, csv.Error, UnicodeDecodeError) as e:
+            logger.warning(f"⚠️ 略過無法讀取的檔案 {path}: {e}")
+
+
+def build_index(sources):
+    """第一趟：{鍵: (分數, 檔序, 列序)} + 有真執照號碼的 (城市, 年份, 搜尋編號)"""
+    best, resolved, rows = {}, set(), 0
+    for file_idx, row_idx, city, year, rec in iter_sources(sources):
+        rows += 1
+        key, placeholder = record_key(city, year, rec)
+        if not placeholder: resolved.add((city, year, (rec.get("搜尋編號") or "").strip()))
+        cand = (_score(rec), file_idx, row_idx)
+        if key not in best or cand > best[key]: best[key] = cand
+    return best, resolved, rows
+
+
+def merge(sources):
+    """產生去重後的紀錄 (含 城市 / 年份)，依來源順序"""
+    best, resolved, rows = build_index(sources)
+    chosen = {(f, r) for key, (_, f, r) in best.items()
+              if not (len(key) == 4 and (key[0], key[1], key[2][1:]) in resolved)}
+    kept = 0
+    for file_idx, row_idx, city, year, rec in iter_sources(sources):
+        if (file_idx, row_idx) not in chosen: continue
+        kept += 1
+        out = {"城市": city, "年份": year}
+        out.update((name, rec.get(name, "")) for name, _ in FIELD_COLUMNS)
+        out["執照號碼"] = canonical_license(out["執照號碼"])
+        yield out
+    logger.info(f"🧹 讀入 {rows} 列 → 保留 {kept} 筆 (去掉 {rows - kept} 筆重複 / 已解析的佔位)")
+
+
+def write_merged(records, out_path=None, store=None):
+    n = 0
+    f = open(out_path, "w", newline="", encoding="utf-8-sig") if out_path else None
+    try:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES) if f else None
+        if writer: writer.writeheader()
+        batch = []
+        for rec in records:
+            if writer: writer.writerow(rec)
+            if store: batch.append(rec)
+            if len(batch) >= 500:
+                _upsert(store, batch)
+                batch = []
+            n += 1
+        if batch: _upsert(store, batch)
+    finally:
+        if f: f.close()
+    return n
+
+
+def _upsert(store, records):
+    groups = {}
+    for rec in records:
+        groups.setdefault((rec["城市"], rec["年份"]), []).append(rec)
+    for (city, year), recs in groups.items():
+        store.upsert_many(city, year, recs)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    ap = argparse.ArgumentParser(description="歷次 CSV 去重合併成一份標準資料集")
+    ap.add_argument("--input", action="append", required=True, metavar="城市=目錄", help="城市與其輸出目錄 (可多個)")
+    ap.add_argument("--out", help="合併後的 CSV")
+    ap.add_argument("--db", help="同時 upsert 進 permit_store 的 SQLite")
+    args = ap.parse_args()
+    if not args.out and not args.db: ap.error("請指定 --out 或 --db")
+    if not all("=" in a for a in args.input): ap.error("--input 格式為 城市=目錄")
+
+    out_abs = os.path.abspath(args.out) if args.out else None
+    sources = []
+    for item in args.input:
+        city, root = item.split("=", 1)
+        sources += [(city, p) for p in find_csvs(root) if os.path.abspath(p) != out_abs]
+    logger.info(f"📂 共 {len(sources)} 個 CSV")
+    n = write_merged(merge(sources), args.out, get_store(args.db) if args.db else None)
+    logger.info(f"💾 合併完成: {n} 筆" + (f" → {args.out}" if args.out else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""📦 匯出 Parquet：面積、層棟戶數、發照日期轉成數值 / 日期欄，原始文字保留在旁邊。
+
+輸出依城市 / 年份分區 (hive 格式)，pandas / pyarrow / DuckDB 都能直接讀整個目錄：
+    out/city=高雄市/year=114/part-0.parquet
+
+資料來源：
+- 資料庫 (permit_store.py 的 SQLite)：python permit_parquet.py --db permits.sqlite --out parquet/
+- CSV (要自己指定城市 / 年份)：python permit_parquet.py --csv kaohsiung_v14_114.csv --city 高雄市 --year 114 --out parquet/
+
+逐批寫入 (每個分區一個 ParquetWriter)，記憶體只放 chunk_rows 筆。
+"""
+import argparse
+import csv
+import logging
+import os
+import re
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from permit_store import FIELD_COLUMNS, get_store
+
+logger = logging.getLogger(__name__)
+
+# 面積欄位 (CSV 欄名 → 數值欄名，單位 ㎡)
+AREA_FIELDS = {
+    "基地面積(合計)": "site_area_m2",
+    "建築面積(其他)": "building_area_m2",
+    "法定空地面積": "open_space_area_m2",
+    "總樓地板面積": "total_floor_area_m2",
+}
+
+SCHEMA = pa.schema(
+    [(col, pa.string()) for _, col in FIELD_COLUMNS]
+    + [(col, pa.float64()) for col in AREA_FIELDS.values()]
+    + [("floors_above", pa.int32()), ("floors_below", pa.int32()), ("buildings", pa.int32()), ("units", pa.int32()),
+       ("issue_date_ad", pa.date32())]
+)
+
+_NUMBER_RE = re.compile(r"\d[\d,]*(?:\.\d+)?")
+_FLOORS_PATTERNS = {
+    "floors_above": [re.compile(r"地上\s*(?:層數)?\s*[:：]?\s*(\d+)"), re.compile(r"(\d+)\s*層(?!數)")],
+    "floors_below": [re.compile(r"地下\s*(?:層數)?\s*[:：]?\s*(\d+)")],
+    "buildings": [re.compile(r"[棟幢]數\s*[:：]?\s*(\d+)"), re.compile(r"(\d+)\s*[棟幢](?!數)")],
+    "units": [re.compile(r"戶數\s*[:：]?\s*(\d+)"), re.compile(r"(\d+)\s*戶(?!數)")],
+}
+_BELOW_RE = re.compile(r"地下\s*(?:層數)?\s*[:：]?\s*\d+\s*層?")
+_ROC_DATE_RES = [
+    re.compile(r"(\d{2,3})\s*[/.\-年]\s*(\d{1,2})\s*[/.\-月]\s*(\d{1,2})"),
+    re.compile(r"(?<!\d)(\d{3})(\d{2})(\d{2})(?!\d)"),   # 1141012
+]
+
+
+def parse_area(text):
+    """'1,234.56 ㎡' → 1234.56；沒有數字回傳 None"""
+    m = _NUMBER_RE.search(text or "")
+    return float(m.group().replace(",", "")) if m else None
+
+
+def parse_floors_units(text):
+    """'地上7層 地下3層 1棟 14戶' → {floors_above: 7, floors_below: 3, buildings: 1, units: 14}"""
+    text = text or ""
+    above_only = _BELOW_RE.sub("", text)   # 「地下3層」不能被當成地上層數
+    out = {}
+    for key, patterns in _FLOORS_PATTERNS.items():
+        out[key] = None
+        for pattern in patterns:
+            m = pattern.search(above_only if key == "floors_above" else text)
+            if m:
+                out[key] = int(m.group(1))
+                break
+    return out
+
+
+def parse_roc_date(text):
+    """'114/10/12'、'114年10月12日'、'1141012' → date(2025, 10, 12)；看不懂回傳 None"""
+    for pattern in _ROC_DATE_RES:
+        m = pattern.search(text or "")
+        if not m: continue
+        y, mth, d = (int(g) for g in m.groups())
+        try: return date(y + 1911, mth, d)
+        except ValueError: return None
+    return None
+
+
+def normalize_record(record):
+    """CSV / 資料庫的一筆 (中文欄名) → Parquet 一列 (原始文字 + 數值欄)"""
+    row = {col: (record.get(name) or None) for name, col in FIELD_COLUMNS}
+    for name, col in AREA_FIELDS.items():
+        row[col] = parse_area(record.get(name))
+    row.update(parse_floors_units(record.get("層棟戶數")))
+    row["issue_date_ad"] = parse_roc_date(record.get("發照日期"))
+    return row
+
+
+class PartitionedParquetWriter:
+    """每個 (城市, 年份) 一個檔，累積 chunk_rows 筆寫一個 row group"""
+
+    def __init__(self, out_dir, chunk_rows=50000):
+        self.out_dir = out_dir
+        self.chunk_rows = chunk_rows
+        self._writers = {}
+        self._buffers = {}
+        self.counts = {}
+
+    def write(self, city, year, row):
+        key = (city, str(year))
+        buf = self._buffers.setdefault(key, [])
+        buf.append(row)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        if len(buf) >= self.chunk_rows: self._flush(key)
+
+    def _flush(self, key):
+        rows = self._buffers.get(key)
+        if not rows: return
+        if key not in self._writers:
+            folder = os.path.join(self.out_dir, f"city={key[0]}", f"year={key[1]}")
+            os.makedirs(folder, exist_ok=True)
+            self._writers[key] = pq.ParquetWriter(os.path.join(folder, "part-0.parquet"), SCHEMA, compression="zstd")
+        self._writers[key].write_table(pa.Table.from_pylist(rows, schema=SCHEMA))
+        self._buffers[key] = []
+
+    def close(self):
+        for key in list(self._buffers):
+            self._flush(key)
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+
+
+def export_records(records, out_dir, chunk_rows=50000):
+    """records: 可迭代的 dict，需帶 城市 / 年份 欄 (permit_store.iter_records 的格式)"""
+    writer = PartitionedParquetWriter(out_dir, chunk_rows)
+    try:
+        for rec in records:
+            writer.write(rec["城市"], rec["年份"], normalize_record(rec))
+    finally:
+        writer.close()
+    for (city, year), n in sorted(writer.counts.items()):
+        logger.info(f"📦 {city} {year}年: {n} 筆 → {out_dir}")
+    return writer.counts
+
+
+def iter_csv(path, city, year):
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for rec in csv.DictReader(f):
+            rec["城市"], rec["年份"] = city, year
+            yield rec
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    ap = argparse.ArgumentParser(description="建照資料匯出 Parquet (城市 / 年份分區)")
+    ap.add_argument("--db", help="permit_store 的 SQLite 檔")
+    ap.add_argument("--csv", nargs="*", default=[], help="爬蟲輸出的 CSV (需搭配 --city / --year)")
+    ap.add_argument("--city", help="只匯出某城市 (--db) / CSV 的城市")
+    ap.add_argument("--year", help="只匯出某年份 (--db) / CSV 的年份")
+    ap.add_argument("--out", required=True, help="輸出目錄")
+    ap.add_argument("--chunk-rows", type=int, default=50000)
+    args = ap.parse_args()
+    if not args.db and not args.csv: ap.error("請指定 --db 或 --csv")
+    if args.csv and not (args.city and args.year): ap.error("--csv 需要 --city 與 --year")
+
+    def records():
+        if args.db:
+            yield from get_store(args.db).iter_records(args.city, args.year)
+        for path in args.csv:
+            yield from iter_csv(path, args.city, args.year)
+
+    export_records(records(), args.out, args.chunk_rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""🗄️ 建照資料庫：本機 SQLite (WAL)，所有城市 / 年份放同一張表。
+
+- 主鍵 (city, year, license_no)，重爬同一張執照時更新 (upsert)，不會重複
+- 行政區、發照日期、起造人、使用分區有索引，跨年份查詢 / 匯出不用再讀整批 CSV
+- 每次寫入就 commit；WAL + synchronous=NORMAL，寫入成本很低，爬蟲記憶體不再隨筆數成長
+
+欄位沿用 CSV 的中文欄名 (record dict)，資料表內用英文欄名。
+命令列：python permit_store.py permits.sqlite [--city 高雄市] [--year 114] [--out 匯出.csv]
+"""
+import argparse
+import atexit
+import csv
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# (CSV 欄名, 資料表欄名)
+FIELD_COLUMNS = [
+    ("搜尋編號", "search_num"),
+    ("執照號碼", "license_no"),
+    ("起造人", "builder"),
+    ("行政區", "district"),
+    ("建築地點", "location"),
+    ("使用分區", "zoning"),
+    ("層棟戶數", "floors_units"),
+    ("基地面積(合計)", "site_area"),
+    ("建築面積(其他)", "building_area"),
+    ("法定空地面積", "open_space_area"),
+    ("總樓地板面積", "total_floor_area"),
+    ("發照日期", "issue_date"),
+    ("使用類組", "usage_class"),
+]
+_DATA_COLS = [col for _, col in FIELD_COLUMNS]
+_UPDATE_COLS = [col for col in _DATA_COLS if col != "license_no"]
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS permits (
+    city TEXT NOT NULL,
+    year TEXT NOT NULL,
+    {", ".join(f"{col} TEXT" for col in _DATA_COLS)},
+    first_seen REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (city, year, license_no)
+);
+CREATE INDEX IF NOT EXISTS idx_permits_district ON permits (city, district);
+CREATE INDEX IF NOT EXISTS idx_permits_issue_date ON permits (issue_date);
+CREATE INDEX IF NOT EXISTS idx_permits_builder ON permits (builder);
+CREATE INDEX IF NOT EXISTS idx_permits_zoning ON permits (zoning);
+"""
+
+_UPSERT = (
+    f"INSERT INTO permits (city, year, {', '.join(_DATA_COLS)}, first_seen, updated_at) "
+    f"VALUES (?, ?, {', '.join('?' for _ in _DATA_COLS)}, ?, ?) "
+    f"ON CONFLICT (city, year, license_no) DO UPDATE SET "
+    + ", ".join(f"{col} = excluded.{col}" for col in _UPDATE_COLS)
+    + ", updated_at = excluded.updated_at"
+)
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class PermitStore:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        # 多個 worker 執行緒共用一條連線，靠 _lock 排隊
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def upsert(self, city, year, record):
+        self.upsert_many(city, year, [record])
+
+    def upsert_many(self, city, year, records):
+        now = time.time()
+        rows = [(city, str(year), *[str(r.get(name, "") or "") for name, _ in FIELD_COLUMNS], now, now)
+                for r in records]
+        with self._lock:
+            self._conn.executemany(_UPSERT, rows)
+            self._conn.commit()
+
+    def iter_records(self, city=None, year=None, order_by="city, year, search_num"):
+        """逐筆讀出 (中文欄名 dict，多帶 城市 / 年份)，不會整批載入記憶體"""
+        where, params = [], []
+        if city: where.append("city = ?"); params.append(city)
+        if year: where.append("year = ?"); params.append(str(year))
+        sql = f"SELECT city, year, {', '.join(_DATA_COLS)} FROM permits"
+        if where: sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order_by}"
+        # 讀取用另一條連線，不卡住寫入
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            for row in conn.execute(sql, params):
+                rec = {"城市": row[0], "年份": row[1]}
+                rec.update((name, value) for (name, _), value in zip(FIELD_COLUMNS, row[2:]))
+                yield rec
+        finally:
+            conn.close()
+
+    def counts(self):
+        """{(城市, 年份): 筆數}"""
+        with self._lock:
+            rows = self._conn.execute("SELECT city, year, COUNT(*) FROM permits GROUP BY city, year").fetchall()
+        return {(c, y): n for c, y, n in rows}
+
+    def close(self):
+        with self._lock:
+            try:
+                self._conn.commit()
+                self._conn.close()
+            except sqlite3.ProgrammingError: pass
+
+
+def get_store(path):
+    """同一個資料庫在行程內只開一條寫入連線"""
+    path = os.path.abspath(path)
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = PermitStore(path)
+            logger.info(f"🗄️ 資料庫就緒: {path}")
+        return _stores[path]
+
+
+def close_all_stores():
+    with _stores_lock:
+        stores = list(_stores.values())
+        _stores.clear()
+    for store in stores:
+        store.close()
+
+
+atexit.register(close_all_stores)
+
+
+def export_csv(store, out_path, city=None, year=None):
+    n = 0
+    with open(out_path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=["城市", "年份"] + [name for name, _ in FIELD_COLUMNS])
+        writer.writeheader()
+        for rec in store.iter_records(city, year):
+            writer.writerow(rec)
+            n += 1
+    return n
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    ap = argparse.ArgumentParser(description="建照資料庫統計 / 匯出")
+    ap.add_argument("db")
+    ap.add_argument("--city")
+    ap.add_argument("--year")
+    ap.add_argument("--out", help="匯出 CSV 路徑 (不給就只印統計)")
+    args = ap.parse_args()
+
+    store = get_store(args.db)
+    for (city, year), n in sorted(store.counts().items()):
+        print(f"{city} {year}年: {n} 筆")
+    if args.out:
+        n = export_csv(store, args.out, args.city, args.year)
+        print(f"💾 匯出 {n} 筆 → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
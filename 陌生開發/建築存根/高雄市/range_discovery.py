@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""🧭 號碼上限探測：正式爬之前先估出每個年份大概發到幾號。
+
+原本從 START_NUM 一路掃到 END_NUM，靠「連續 N 號空」停損：
+遇到中段空號區會太早停，尾端死號段又白白多查 N 次。
+改成先探測：
+1. 指數探測：從已知有資料的號碼往後跳 first_step, 2x, 4x... 直到碰到空窗
+2. 二分搜尋：在最後有資料 / 第一個空窗之間逼近上限
+3. 尾段抽樣：上限 + margin 之後每隔 sample_step 號抽查一次，抽到就從該號再探一次上限、把密集區延伸過去
+每個探測點看 window 個連號，任一有資料就算「有資料」，避免被單一空號騙到。
+探測本身走正常查詢流程，查到的資料一樣寫 CSV 與斷點，正式爬時會直接跳過。
+
+增量模式 (plan_incremental_range) 則不探測，直接從斷點紀錄的前沿往後查。
+"""
+import logging
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+
+def find_ceiling(probe, lo, hi, window=5, first_step=64, known=None):
+    """估計 [lo, hi] 內最後一個有資料的號碼；整段都沒有回傳 None
+
+    probe(n) -> bool：查單一號碼是否有資料。known：已知有資料的號碼 (例如斷點紀錄)，可省去前段探測。
+    """
+    def alive(n):
+        return any(probe(k) for k in range(n, min(n + window, hi + 1)))
+
+    if known is None:
+        if not alive(lo): return None
+        known = lo
+
+    # 1. 指數探測
+    step, dead = first_step, None
+    while dead is None:
+        n = known + step
+        if n > hi: break
+        if alive(n):
+            known, step = n, step * 2
+        else:
+            dead = n
+    if dead is None:
+        # 跳過頭了：還要確認 hi 附近
+        if alive(max(known, hi - window + 1)): return hi
+        dead = hi
+
+    # 2. 二分搜尋 (known 有資料、dead 空窗)
+    while dead - known > window:
+        mid = (known + dead) // 2
+        if alive(mid): known = mid
+        else: dead = mid
+    return dead - 1
+
+
+def plan_year_range(probe, start, end, known=None, window=5, first_step=64, margin=50, sample_step=25, label=""):
+    """回傳正式要密集掃描的 (起, 迄)；整年都沒資料時迄 < 起"""
+    queries = [0]
+
+    def counted(n):
+        queries[0] += 1
+        try:
+            return probe(n)
+        except Exception as e:
+            logger.warning(f"⚠️ [{label}][{n:05d}] 探測失敗，當作無資料: {e}")
+            return False
+
+    ceiling = find_ceiling(counted, start, end, window, first_step, known)
+    dense_end = min(end, ceiling + margin) if ceiling is not None else start - 1
+
+    # 3. 尾段抽樣：抽到就從該號往後再探上限 (後面可能還有一大段)，密集區延伸到新上限 + margin，再從新的尾端繼續抽
+    n = dense_end + sample_step
+    while n <= end:
+        if counted(n):
+            ceiling = find_ceiling(counted, n, end, window, first_step, known=n)
+            dense_end = min(end, ceiling + margin)
+            logger.info(f"🧭 [{label}] 尾段抽樣在 {n} 號有資料，密集區延伸到 {dense_end}")
+            n = dense_end + sample_step
+        else:
+            n += sample_step
+
+    if dense_end < start:
+        logger.info(f"🧭 [{label}] 探測 {queries[0]} 次，{start}~{end} 都沒有資料")
+    else:
+        logger.info(f"🧭 [{label}] 探測 {queries[0]} 次 | 估計上限 {ceiling} | 密集掃描 {start}~{dense_end} "
+                    f"(原本最多 {end - start + 1} 號)")
+    return start, dense_end
+
+
+def recent_roc_years(count=2, today=None):
+    """今年往前 count 個民國年 (字串)，增量模式預設只看今年與去年"""
+    year = (today or date.today()).year - 1911
+    return [str(year - i) for i in range(count)]
+
+
+def dense_frontier(found, window):
+    """最高的「有鄰居」的有資料號碼：前 window 號內還有別的有資料號碼
+
+    尾段抽樣偶爾抽到的孤立號碼不算前沿，否則增量模式會直接跳過中間一大段。
+    """
+    for i in range(len(found) - 1, 0, -1):
+        if found[i] - found[i - 1] <= window: return found[i]
+    return found[0] if found else None
+
+
+def plan_incremental_range(checkpoint, start, end, recheck_window=50, label=""):
+    """🔁 增量模式：從上次的前沿 (最高有資料號碼) 往後查
+
+    前沿前 recheck_window 號內的空號、以及前沿之後所有記成空號的號碼都重開，
+    晚上架的執照與昨天還沒發出的號碼都會再查一次；已有資料的號碼仍然跳過。
+    沒有紀錄的年份 (例如剛跨年) 從 start 開始。回傳 (起, 迄)，交給連續空號停損收尾。
+    """
+    frontier = dense_frontier(checkpoint.found_numbers(), recheck_window)
+    if frontier is None:
+        logger.info(f"🔁 [{label}] 沒有前沿紀錄，從 {start} 開始")
+        return start, end
+    lo = max(start, frontier - recheck_window + 1)
+    reopened = checkpoint.reopen(range(lo, end + 1))
+    logger.info(f"🔁 [{label}] 前沿 {frontier} | 從 {lo} 往後查 | 重開空號 {reopened} 個")
+    return lo, end
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""🚦 每個主機一個自適應限速器 (AIMD)，取代寫死的 random.uniform(2.5, 4.0) 休息。
+
+- 起始速率 initial_rate (城市腳本的 HOST_INITIAL_RATE)，最高到 max_rate (HOST_RATE_LIMIT)
+- 回應正常且延遲低於 latency_target → 速率加法遞增 (+increase 次/秒，預設上限的 2%，約 50 次回應從 0 爬到上限)
+- 延遲偏高 → 小幅降速 (× slow_factor)
+- 錯誤 / 逾時 → 速率乘法遞減 (× decrease)，並依連續錯誤次數指數退避暫停
+- 查無資料的 alert 也是正常回應 (空號很多)，和 OK 一樣可以加速，只在統計上分開
+目前速率每 log_every 秒寫一次 log。
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+
+from crawl_metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+OK = "ok"
+ALERT = "alert"
+ERROR = "error"
+TIMEOUT = "timeout"
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+class AdaptiveRateLimiter:
+    def __init__(self, host, initial_rate=None, min_rate=0.05, max_rate=2.0, increase=None, decrease=0.5,
+                 slow_factor=0.9, latency_target=4.0, backoff_base=2.0, backoff_max=120.0, log_every=30.0):
+        self.host = host
+        # 沒指定起始速率就從上限的 40% 起跳；加速步伐跟著上限縮放 (上限調高不用爬好幾百次)
+        self.rate = min(initial_rate or max_rate * 0.4, max_rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase or max_rate * 0.02
+        self.decrease = decrease
+        self.slow_factor = slow_factor
+        self.latency_target = latency_target
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.log_every = log_every
+        self.consecutive_errors = 0
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=50)   # (種類, 延遲)
+        self._last_log = time.monotonic()
+
+    def _reserve(self):
+        """預約下一個時段，回傳需要等待的秒數"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_at)
+            self._next_at = start + 1.0 / self.rate
+            return start - now
+
+    def wait(self):
+        delay = self._reserve()
+        if delay > 0: time.sleep(delay)
+
+    async def wait_async(self):
+        delay = self._reserve()
+        if delay > 0: await asyncio.sleep(delay)
+
+    def record(self, kind, latency=None):
+        """回報一次請求的結果 (OK / ALERT / ERROR / TIMEOUT) 與耗時秒數"""
+        with self._lock:
+            self._recent.append((kind, latency))
+            if kind in (ERROR, TIMEOUT):
+                self.consecutive_errors += 1
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                pause = min(self.backoff_max, self.backoff_base * 2 ** (self.consecutive_errors - 1))
+                self._next_at = max(self._next_at, time.monotonic() + pause)
+                logger.warning(f"🚦 [{self.host}] {kind}，降速至 {self.rate:.2f} 次/秒，暫停 {pause:.0f} 秒")
+            else:
+                self.consecutive_errors = 0
+                if latency is not None and latency > self.latency_target:
+                    self.rate = max(self.min_rate, self.rate * self.slow_factor)
+                else:
+                    self.rate = min(self.max_rate, self.rate + self.increase)
+            METRICS.set("permit_host_rate", round(self.rate, 4), host=self.host)
+            self._maybe_log()
+
+    def _maybe_log(self):
+        now = time.monotonic()
+        if now - self._last_log < self.log_every: return
+        self._last_log = now
+        lat = sorted(l for _, l in self._recent if l is not None)
+        bad = sum(1 for k, _ in self._recent if k in (ERROR, TIMEOUT))
+        empty = sum(1 for k, _ in self._recent if k == ALERT)
+        p50 = f"{lat[len(lat) // 2]:.2f}s" if lat else "-"
+        logger.info(f"🚦 [{self.host}] 目前速率 {self.rate:.2f} 次/秒 | 延遲中位數 {p50} | "
+                    f"近 {len(self._recent)} 次: 空號 {empty} / 錯誤 {bad}")
+
+
+def classify_error(exc):
+    """requests 的 ReadTimeout / ConnectTimeout、Selenium 的 TimeoutException 都算逾時"""
+    return TIMEOUT if "Timeout" in type(exc).__name__ else ERROR
+
+
+def get_limiter(host, **kwargs):
+    """同一主機全行程共用一個限速器；第一次建立時的參數生效"""
+    with _limiters_lock:
+        if host not in _limiters:
+            _limiters[host] = AdaptiveRateLimiter(host, **kwargs)
+        return _limiters[host]
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""♻️ 重新解析：拿語料庫 (CAPTURE_DIR) 存下的詳情頁原文重跑解析，重建 CSV / 資料庫，完全不連網。
+
+改了欄位規格或解析邏輯 (例：某個欄位一直是空的) 之後不用重爬，城市腳本帶 reparse 執行即可：
+    python kaohsiung_v14_data_safe.py reparse [--workers 8] [--year 114 --year 113]
+
+- 多行程平行 (process pool)：解析是純 CPU 工作，執行緒會卡在 GIL；每個行程自己讀檔，只回傳紀錄
+- 同一張執照存過好幾個版本 (網站內容改過) 時，取最後擷取的那頁；沒解析出執照號碼的佔位紀錄每頁各留一筆
+- 每年寫一份新的 CSV (檔名帶 REPARSE)，資料庫 upsert 蓋掉舊值；permit_merge.py 合併時分數相同新檔優先
+"""
+import csv
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from page_corpus import list_pages, read_page
+from permit_merge import normalize_license
+
+logger = logging.getLogger(__name__)
+
+_adapter = None  # worker 行程裡的城市外掛 (initializer 設定，一個行程只傳一次)
+
+
+def _init_worker(adapter):
+    global _adapter
+    _adapter = adapter
+
+
+def _parse_chunk(chunk):
+    """worker 行程：一批 (城市, 年份, 路徑) → ([(年份, 擷取時間, 頁面 id, 紀錄)], 失敗頁數)"""
+    rows, bad = [], 0
+    for city, year, path in chunk:
+        try:
+            page = read_page(path, city, year)
+            record = _adapter.parse_detail(page["text"], page["search_num"], year)
+        except Exception:
+            bad += 1
+            continue
+        if record: rows.append((year, page["captured_at"], page["id"], record))
+    return rows, bad
+
+
+def latest_per_license(rows):
+    """{年份: [紀錄]}，同一張執照留最後擷取的版本，依搜尋編號排序"""
+    best = {}
+    for year, captured_at, page_id, record in rows:
+        license_no = normalize_license(record.get("執照號碼"))
+        key = (year, license_no or "#" + page_id)
+        if key not in best or captured_at >= best[key][0]: best[key] = (captured_at, record)
+    by_year = {}
+    for (year, _), (_, record) in best.items():
+        by_year.setdefault(year, []).append(record)
+    for records in by_year.values():
+        records.sort(key=lambda r: (str(r.get("搜尋編號", "")), str(r.get("執照號碼", ""))))
+    return by_year
+
+
+def reparse_corpus(adapter, corpus_dir, years=None, workers=None, chunk_size=500, min_pages_per_worker=2000):
+    """整個語料庫 (或指定年份) 重跑 adapter.parse_detail，回傳 {年份: [紀錄]}"""
+    pages = [p for y in (years or [None]) for p in list_pages(corpus_dir, adapter.city, y)]
+    if not pages:
+        logger.warning(f"⚠️ [{adapter.city}] 語料庫沒有資料: {corpus_dir}")
+        return {}
+    chunks = [pages[i:i + chunk_size] for i in range(0, len(pages), chunk_size)]
+    # 每個行程至少分到 min_pages_per_worker 頁，不然開行程 (spawn 要重新 import 城市腳本) 比解析本身還久
+    workers = max(1, min(workers or os.cpu_count() or 1, len(chunks), len(pages) // min_pages_per_worker + 1))
+    t0 = time.monotonic()
+    if workers == 1:
+        _init_worker(adapter)
+        results = list(map(_parse_chunk, chunks))
+    else:
+        # spawn：macOS 預設，Linux 上也不用擔心 fork 到執行緒 / 連線的狀態
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(adapter,)) as pool:
+            results = list(pool.map(_parse_chunk, chunks))
+    rows = [row for chunk_rows, _ in results for row in chunk_rows]
+    bad = sum(b for _, b in results)
+    by_year = latest_per_license(rows)
+    elapsed = time.monotonic() - t0
+    logger.info(f"♻️ [{adapter.city}] 重新解析 {len(pages)} 頁 → {sum(map(len, by_year.values()))} 筆"
+                f" | {workers} 個行程 | {elapsed:.1f}s ({len(pages) / max(elapsed, 1e-9):,.0f} 頁/s)"
+                + (f" | 解析失敗 {bad} 頁" if bad else ""))
+    return by_year
+
+
+def write_records_csv(path, columns, records):
+    """一次寫完整份 (utf-8-sig，跟爬蟲輸出一樣 Excel 直接開不亂碼)"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(records)
+    os.replace(tmp, path)
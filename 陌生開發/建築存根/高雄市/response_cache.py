@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""📦 回應快取：查詢結果 / 詳情頁文字壓縮存在本機 SQLite，重試、重跑不再打網站。
+
+- 鍵：查詢 = (城市, 年份, 號碼) → 詳情連結清單；詳情 = 連結網址 (去掉 ;jsessionid) → innerText
+- 只快取「有資料」的查詢：空號交給斷點紀錄 (增量模式還要重查前沿附近的空號，不能被快取擋住)
+- TTL：超過 ttl 秒的項目視為過期 (讀到時順便刪掉)
+- 容量：總壓縮大小超過 max_bytes 就從最久沒讀的開始刪 (LRU)，刪到九成；檔案用 incremental_vacuum 縮回來
+- 直連與瀏覽器共用同一份 (網址一樣就是同一頁)，多個行程可開同一個檔 (WAL)
+
+    cache = get_cache("response_cache.sqlite", ttl=7 * 86400, max_bytes=512 * 2**20)
+    cache.put_search("高雄市", "114", 12, [href, ...]); cache.get_search("高雄市", "114", 12)
+"""
+import atexit
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+from crawl_metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    key TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pages_accessed ON pages (accessed_at);
+"""
+
+_JSESSION_RE = re.compile(r";jsessionid=[^?#]*", re.I)
+# 讀取時間只在差超過這麼久才回寫，熱門項目不用每次讀都寫一次
+_TOUCH_SECONDS = 60.0
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def search_key(city, year, number):
+    return f"search:{city}:{year}:{int(number)}"
+
+
+def detail_key(url):
+    return "detail:" + _JSESSION_RE.sub("", url or "")
+
+
+class ResponseCache:
+    def __init__(self, path, ttl=7 * 86400, max_bytes=512 * 2**20):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        # auto_vacuum 要在建表前設定才有效 (舊檔維持原樣)
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        with self._lock:
+            expired = self._conn.execute("DELETE FROM pages WHERE stored_at < ?", (time.time() - ttl,)).rowcount
+            self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+            self._conn.commit()
+        if expired: logger.info(f"📦 快取清掉 {expired} 筆過期項目")
+
+    # ---------- 原始 get / put ----------
+    def get(self, key):
+        """沒有 / 過期回傳 None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT body, stored_at, accessed_at FROM pages WHERE key = ?", (key,)).fetchone()
+            if row and row[1] < now - self.ttl:
+                self._conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            elif row and now - row[2] > _TOUCH_SECONDS:
+                self._conn.execute("UPDATE pages SET accessed_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+        METRICS.inc("permit_cache_total", result="hit" if row else "miss")
+        return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+    def delete(self, key):
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM pages WHERE key = ?", (key,)).fetchone()
+            if not old: return
+            self._conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+            self._conn.commit()
+            self._bytes -= old[0]
+
+    def put(self, key, text):
+        body = zlib.compress(text.encode("utf-8"), 6)
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM pages WHERE key = ?", (key,)).fetchone()
+            self._conn.execute("INSERT OR REPLACE INTO pages (key, body, size, stored_at, accessed_at)"
+                               " VALUES (?, ?, ?, ?, ?)", (key, body, len(body), now, now))
+            self._conn.commit()
+            self._bytes += len(body) - (old[0] if old else 0)
+            if self._bytes > self.max_bytes: self._evict()
+
+    def _evict(self):
+        """LRU：從最久沒讀的刪到 max_bytes 的九成 (呼叫端持有 _lock)"""
+        # 別的行程也在寫同一個檔，先重算實際大小
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        target = self.max_bytes * 0.9
+        if self._bytes <= target: return
+        victims, freed = [], 0
+        for key, size in self._conn.execute("SELECT key, size FROM pages ORDER BY accessed_at"):
+            if self._bytes - freed <= target: break
+            victims.append((key,))
+            freed += size
+        self._conn.executemany("DELETE FROM pages WHERE key = ?", victims)
+        self._conn.commit()
+        self._conn.execute("PRAGMA incremental_vacuum").fetchall()
+        self._bytes -= freed
+        METRICS.inc("permit_cache_evictions_total", len(victims))
+        logger.info(f"📦 快取超過上限，淘汰 {len(victims)} 筆 ({freed / 2**20:.1f} MB)")
+
+    # ---------- 查詢 / 詳情 ----------
+    def get_search(self, city, year, number):
+        """詳情連結清單；沒快取回傳 None"""
+        body = self.get(search_key(city, year, number))
+        return json.loads(body) if body is not None else None
+
+    def put_search(self, city, year, number, hrefs):
+        if hrefs: self.put(search_key(city, year, number), json.dumps(list(hrefs), ensure_ascii=False))
+
+    def get_detail(self, url):
+        return self.get(detail_key(url))
+
+    def put_detail(self, url, text):
+        if text: self.put(detail_key(url), text)
+
+    def drop_detail(self, url):
+        """解析不了的詳情頁 (錯誤頁、載到一半) 不能留在快取，不然重試一直讀到同一頁"""
+        self.delete(detail_key(url))
+
+    def stats(self):
+        with self._lock:
+            n, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+        return {"entries": n, "bytes": size}
+
+    def close(self):
+        with self._lock:
+            try:
+                self._conn.commit()
+                self._conn.close()
+            except sqlite3.ProgrammingError: pass
+
+
+def get_cache(path, **kwargs):
+    """同一個快取檔在行程內只開一條連線；第一次建立時的參數生效"""
+    path = os.path.abspath(path)
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = ResponseCache(path, **kwargs)
+            s = _caches[path].stats()
+            logger.info(f"📦 回應快取就緒: {path} ({s['entries']} 筆, {s['bytes'] / 2**20:.1f} MB)")
+        return _caches[path]
+
+
+def close_all_caches():
+    with _caches_lock:
+        caches = list(_caches.values())
+        _caches.clear()
+    for cache in caches:
+        cache.close()
+
+
+atexit.register(close_all_caches)
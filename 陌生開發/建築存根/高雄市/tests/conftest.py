@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""測試直接 import 上層目錄的模組 (跟城市腳本一樣是平放的，不是套件)"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(request, monkeypatch):
+    """假的 time.time：測試裡 clock.now += 秒數 就等於時間過去 (TTL、租約到期不用真的等)
+
+    起始時間可用 @pytest.mark.parametrize("clock", [秒數], indirect=True) 指定。
+    """
+    c = Clock(getattr(request, "param", 1_000_000.0))
+    monkeypatch.setattr(time, "time", c)
+    return c
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""💾 斷點紀錄：最後一行寫到一半 (崩潰) 時重新載入"""
+from crawl_checkpoint import CrawlCheckpoint, EMPTY, FAILED, FOUND
+
+
+def test_last_status_wins(tmp_path):
+    path = str(tmp_path / "cp.jsonl")
+    cp = CrawlCheckpoint(path)
+    cp.mark(1, FAILED)
+    cp.mark(1, FOUND)
+    cp.mark(2, EMPTY)
+    reloaded = CrawlCheckpoint(path)
+    assert (reloaded.status(1), reloaded.status(2)) == (FOUND, EMPTY)
+    assert not reloaded.should_fetch(1) and reloaded.should_fetch(3)
+
+
+def test_truncated_last_line_is_skipped_and_terminated(tmp_path):
+    path = str(tmp_path / "cp.jsonl")
+    cp = CrawlCheckpoint(path)
+    cp.mark(1, FOUND)
+    cp.mark(2, EMPTY)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"n": 3, "s": "fou')  # 崩潰時只寫了半行
+    reloaded = CrawlCheckpoint(path)
+    assert reloaded.counts() == {FOUND: 1, EMPTY: 1, FAILED: 0}
+    assert reloaded.should_fetch(3)
+    # 半行後面已補上換行：下一筆自成一行，再重開還讀得到
+    reloaded.mark(3, FOUND)
+    again = CrawlCheckpoint(path)
+    assert again.found_numbers() == [1, 3]
+    assert again.status(2) == EMPTY
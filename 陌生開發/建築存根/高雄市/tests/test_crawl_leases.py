@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""📮 分片租約佇列：claim / renew / 過期接手 / 停損略過"""
+import pytest
+
+from crawl_leases import LeaseQueue, split_range, DONE, PENDING, SKIPPED
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    return LeaseQueue(str(tmp_path / "leases.sqlite"), max_attempts=3)
+
+
+def statuses(queue):
+    return {(city, year): counts for city, year, counts, _ in queue.status()}
+
+
+def test_split_range():
+    assert split_range(1, 250, 100) == [(1, 100), (101, 200), (201, 250)]
+    assert split_range(5, 5, 100) == [(5, 5)]
+
+
+def test_plan_is_idempotent_per_run(queue):
+    assert queue.plan("高雄市", "114", 1, 250, shard_size=100) == 3
+    assert queue.plan("高雄市", "114", 1, 250, shard_size=100) == 0
+    assert queue.plan("高雄市", "114", 1, 250, shard_size=100, run="DELTA_20261017") == 3
+
+
+def test_claim_in_order_until_empty(queue):
+    queue.plan("高雄市", "114", 1, 200, shard_size=100)
+    a = queue.claim("w1", ttl=60)
+    b = queue.claim("w2", ttl=60)
+    assert (a.lo, a.hi, a.owner, a.attempts) == (1, 100, "w1", 1)
+    assert (b.lo, b.hi, b.owner) == (101, 200, "w2")
+    assert queue.claim("w3", ttl=60) is None
+    assert queue.active() == 2
+
+
+def test_claim_filters_by_city(queue):
+    queue.plan("高雄市", "114", 1, 100)
+    queue.plan("桃園市", "114", 1, 100)
+    assert queue.claim("w1", ttl=60, city="桃園市").city == "桃園市"
+    assert queue.claim("w2", ttl=60, city="桃園市") is None
+
+
+def test_expired_lease_is_reclaimed(queue, clock):
+    queue.plan("高雄市", "114", 1, 100)
+    dead = queue.claim("w1", ttl=60)
+    assert queue.claim("w2", ttl=60) is None
+    clock.now += 61
+    assert statuses(queue)[("高雄市", "114")] == {"expired": 1}
+    taken = queue.claim("w2", ttl=60)
+    assert (taken.id, taken.owner, taken.attempts) == (dead.id, "w2", 2)
+    # 原持有者醒來：續約、完成都不能蓋掉新持有者
+    assert not queue.renew(dead, ttl=60)
+    assert not queue.complete(dead, found=5)
+    assert queue.complete(taken, found=7)
+    assert statuses(queue)[("高雄市", "114")] == {DONE: 1}
+
+
+def test_renew_keeps_lease_alive(queue, clock):
+    queue.plan("高雄市", "114", 1, 100)
+    lease = queue.claim("w1", ttl=60)
+    clock.now += 50
+    assert queue.renew(lease, ttl=60)
+    clock.now += 50
+    assert queue.claim("w2", ttl=60) is None
+
+
+def test_pending_leases_before_expired(queue, clock):
+    queue.plan("高雄市", "114", 1, 200, shard_size=100)
+    queue.claim("w1", ttl=60)
+    clock.now += 61
+    # 還有沒人拿過的就先發新的，過期的晚點再接手
+    assert queue.claim("w2", ttl=60).lo == 101
+    assert queue.claim("w3", ttl=60).lo == 1
+
+
+def test_release_returns_lease_immediately(queue):
+    queue.plan("高雄市", "114", 1, 100)
+    lease = queue.claim("w1", ttl=60)
+    assert queue.release(lease)
+    again = queue.claim("w2", ttl=60)
+    assert again.id == lease.id and again.attempts == 2
+
+
+def test_stuck_after_max_attempts(queue, clock):
+    queue.plan("高雄市", "114", 1, 100)
+    for owner in ("w1", "w2", "w3"):
+        assert queue.claim(owner, ttl=60) is not None
+        clock.now += 61
+    assert queue.claim("w4", ttl=60) is None
+    assert statuses(queue)[("高雄市", "114")] == {"stuck": 1}
+    assert queue.active() == 0
+
+
+def test_skip_after_stop_loss(queue):
+    queue.plan("高雄市", "114", 1, 400, shard_size=100, stop_loss=20)
+    queue.plan("高雄市", "113", 1, 400, shard_size=100)
+    first = queue.claim("w1", ttl=60, city="高雄市")
+    second = queue.claim("w2", ttl=60, city="高雄市")
+    assert first.stop_loss == 20
+    # 第二張停損：之後還沒人拿的 114 年租約略過，已被拿走的與別的年份不動
+    assert queue.skip_after(second) == 2
+    counts = statuses(queue)
+    assert counts[("高雄市", "114")] == {"leased": 2, SKIPPED: 2}
+    assert counts[("高雄市", "113")] == {PENDING: 4}
+
+
+def test_status_sums_found(queue):
+    queue.plan("高雄市", "114", 1, 200, shard_size=100)
+    queue.complete(queue.claim("w1", ttl=60), found=30)
+    queue.complete(queue.claim("w1", ttl=60), found=12)
+    assert [(c, y, f) for c, y, _, f in queue.status()] == [("高雄市", "114", 42)]
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""📝 批次 CSV：after_commit 只在資料真的寫進檔案後才觸發 (斷點不能跑在資料前面)"""
+import csv
+
+import pytest
+
+from csv_batch_writer import BatchedCsvWriter
+
+COLUMNS = ["搜尋編號", "執照號碼"]
+
+
+@pytest.fixture
+def writer(tmp_path):
+    # 筆數、時間門檻都拉高：只有明確 flush 才會落地
+    w = BatchedCsvWriter(str(tmp_path / "out.csv"), COLUMNS, max_rows=100, max_seconds=3600, durability="flush")
+    yield w
+    w.close()
+
+
+def rows_on_disk(writer):
+    with open(writer.path, encoding="utf-8-sig", newline="") as f:
+        return [r["搜尋編號"] for r in csv.DictReader(f)]
+
+
+def test_after_commit_waits_for_flush(writer):
+    seen = []
+    writer.write_row({"搜尋編號": "00001", "執照號碼": "A"})
+    writer.write_row({"搜尋編號": "00002", "執照號碼": "B"})
+    writer.after_commit(lambda: seen.append(rows_on_disk(writer)))
+    assert seen == []
+    assert rows_on_disk(writer) == []
+    writer.flush()
+    # 回呼執行時兩筆都已經在檔案裡
+    assert seen == [["00001", "00002"]]
+
+
+def test_after_commit_runs_at_once_when_nothing_pending(writer):
+    seen = []
+    writer.after_commit(lambda: seen.append(True))
+    assert seen == [True]
+
+
+def test_failed_write_keeps_callback_queued(writer, monkeypatch):
+    seen = []
+    writer.write_row({"搜尋編號": "00001", "執照號碼": "A"})
+    writer.after_commit(lambda: seen.append(rows_on_disk(writer)))
+    def broken(rows): raise OSError("磁碟滿了")
+    monkeypatch.setattr(writer._writer, "writerows", broken)
+    writer.flush()
+    assert seen == []
+    monkeypatch.undo()
+    writer.flush()
+    assert seen == [["00001"]]
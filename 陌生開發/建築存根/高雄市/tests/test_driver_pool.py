@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""🧰 瀏覽器池：名額計算 (換台失敗、重複歸還)"""
+import pytest
+
+import driver_pool
+from driver_pool import DriverPool
+
+
+class FakeDriver:
+    def __init__(self):
+        self.quit_called = False
+
+    def quit(self):
+        self.quit_called = True
+
+    def execute_script(self, script):
+        return 1
+
+
+@pytest.fixture
+def launches(monkeypatch):
+    """launch_driver 換成假的；把 launches.fail 設成 True 就模擬 Chrome 開不起來"""
+    state = type("Launches", (), {"fail": False, "count": 0})()
+    def fake_launch(options_factory=None, on_launch=None):
+        if state.fail: raise RuntimeError("chrome 開不起來")
+        state.count += 1
+        return FakeDriver()
+    monkeypatch.setattr(driver_pool, "launch_driver", fake_launch)
+    return state
+
+
+def test_acquire_release_reuses(launches):
+    pool = DriverPool(size=2, max_rss_mb=0)
+    d = pool.acquire()
+    pool.release(d)
+    assert pool.acquire() is d
+    assert launches.count == 1
+
+
+def test_check_returns_none_when_relaunch_fails(launches):
+    pool = DriverPool(size=1, max_pages=1, max_rss_mb=0)
+    old = pool.acquire()
+    launches.fail = True
+    assert pool.check(old) is None
+    assert old.quit_called
+    assert pool._launched == 0
+    # 名額已釋出：Chrome 恢復後可以再借到新的一台
+    launches.fail = False
+    new = pool.acquire(timeout=1)
+    assert new is not old and pool._launched == 1
+
+
+def test_releasing_a_discarded_driver_frees_slot_once(launches):
+    pool = DriverPool(size=2, max_pages=1, max_rss_mb=0)
+    old = pool.acquire()
+    replacement = pool.check(old)
+    assert replacement is not old and pool._launched == 1
+    # 呼叫端拿舊的去歸還 (未登記)：關掉就好，不能再扣一次名額
+    pool.release(old)
+    pool.release(replacement, broken=True)
+    assert pool._launched == 0
+
+
+def test_close_all(launches):
+    pool = DriverPool(size=3, max_rss_mb=0)
+    drivers = [pool.acquire() for _ in range(3)]
+    for d in drivers: pool.release(d)
+    pool.close_all()
+    assert pool._launched == 0
+    assert all(d.quit_called for d in drivers)
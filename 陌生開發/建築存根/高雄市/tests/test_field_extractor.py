@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""🧩 欄位擷取：FieldExtractor 與舊版 split 寫法逐欄位對照 (隨機產生的詳情頁文字)"""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "成功的程式碼"))
+
+import kaohsiung_v14_data_safe as kaohsiung
+import ty_scraper_114_110_all_at_once as taoyuan
+
+
+def extract_value(text_source, start_keywords, end_keywords=None):
+    """舊版單欄位擷取 (改寫前城市腳本裡的 extract_value_from_text，原樣保留作為對照)"""
+    for key in start_keywords:
+        if key in text_source:
+            try:
+                temp = text_source.split(key, 1)[1].strip()
+                if temp.startswith(":") or temp.startswith("："): temp = temp[1:].strip()
+                if end_keywords:
+                    for end_key in end_keywords:
+                        if end_key in temp:
+                            temp = temp.split(end_key, 1)[0].strip()
+                            break
+                lines = temp.split('\n')
+                if lines: return lines[0].strip()
+            except: continue
+    return ""
+
+
+def legacy_kaohsiung(full_text):
+    usage_data = ""
+    if "使用類組" in full_text:
+        usage_data = full_text.split("使用類組", 1)[1].split("備註", 1)[0].strip()[:100]
+    return {
+        "姓名": extract_value(full_text, ["姓名"], ["事務所", "電話"]),
+        "起造人": extract_value(full_text, ["起造人"], ["設計人"]),
+        "建築地點": extract_value(full_text, ["建築地點", "地號"], ["使用分區", "基地面積"]),
+        "使用分區": extract_value(full_text, ["使用分區"], ["基地面積", "建物概要"]),
+        "層棟戶數": extract_value(full_text, ["層棟戶數"], ["設計建蔽率", "法定空地"]),
+        "基地面積(合計)": extract_value(full_text, ["合計", "基地面積"], ["㎡", "m2", "騎樓"]),
+        "法定空地面積": extract_value(full_text, ["法定空地面積", "法定空地"], ["㎡", "m2"]),
+        "總樓地板面積": extract_value(full_text, ["總樓地板面積", "樓地板面積"], ["㎡", "m2"]),
+        "發照日期": extract_value(full_text, ["發照日期"], ["注意事項"]),
+        "使用類組": usage_data,
+    }
+
+
+def legacy_taoyuan_usage(full_text):
+    start_key = "使用類組"
+    end_key = "備註"
+    backup_end_keys = ["注意事項", "起造人", "設計人", "說明", "發照日期"]
+    if start_key not in full_text: return ""
+    content_after_start = full_text.split(start_key, 1)[1]
+    if content_after_start.strip().startswith(":") or content_after_start.strip().startswith("："):
+        content_after_start = content_after_start.strip()[1:]
+    if end_key in content_after_start:
+        return content_after_start.split(end_key, 1)[0].strip()
+    for k in backup_end_keys:
+        if k in content_after_start:
+            return content_after_start.split(k, 1)[0].strip()
+    return content_after_start[:100].strip()
+
+
+def legacy_taoyuan(full_text):
+    site_area_total = extract_value(full_text, ["合計", "基地面積"], ["㎡", "m2", "騎樓地"])
+    if site_area_total and "㎡" not in site_area_total: site_area_total += " ㎡"
+    build_area_other = ""
+    if "建築面積" in full_text:
+        text_after_build = full_text.split("建築面積", 1)[1]
+        build_area_other = extract_value(text_after_build, ["其他"], ["㎡", "m2"])
+        if build_area_other: build_area_other += " ㎡"
+    legal_open = extract_value(full_text, ["法定空地面積", "法定空地"], ["㎡", "m2"])
+    if legal_open: legal_open += " ㎡"
+    floor_area = extract_value(full_text, ["總樓地板面積", "樓地板面積"], ["㎡", "m2"])
+    if floor_area: floor_area += " ㎡"
+    return {
+        "姓名": extract_value(full_text, ["姓名"], ["事務所", "電話"]),
+        "起造人": extract_value(full_text, ["起造人"], ["設計人"]),
+        "建築地點": extract_value(full_text, ["地址", "建築地點", "地號", "基地坐落"], ["使用分區", "基地面積"]),
+        "使用分區": extract_value(full_text, ["使用分區"], ["基地面積", "建物概要"]),
+        "層棟戶數": extract_value(full_text, ["層棟戶數"], ["設計建蔽率", "法定空地"]),
+        "基地面積(合計)": site_area_total,
+        "建築面積(其他)": build_area_other,
+        "法定空地面積": legal_open,
+        "總樓地板面積": floor_area,
+        "發照日期": extract_value(full_text, ["發照日期"], ["注意事項", "供公眾"]),
+        "使用類組": legacy_taoyuan_usage(full_text),
+    }
+
+
+# 詳情頁的段落 (標籤, 可能的值)；產生時每段隨機出現/缺席、冒號與空白隨機
+SECTIONS = [
+    ("起造人", ["王大明", "宏國建設股份有限公司"]),
+    ("姓名", ["王大明", "陳小華 (代表人)"]),
+    ("設計人", ["林建築師事務所"]),
+    ("電話", ["07-1234567"]),
+    ("建築地點", ["高雄市鳳山區文山段 123 地號", "高雄市苓雅區四維三路 2 號"]),
+    ("地址", ["桃園市中壢區中正路 100 號"]),
+    ("基地坐落", ["桃園市龜山區大同段 45 地號"]),
+    ("使用分區", ["住宅區", "第二種商業區"]),
+    ("基地面積", ["騎樓地 12.5 ㎡ 合計 345.67 ㎡", "合計 1,234.5 m2", "88.8"]),
+    ("建物概要", ["RC 造"]),
+    ("層棟戶數", ["地上 5 層 地下 1 層 1 棟 10 戶", "地上 12 層 1 棟 48 戶"]),
+    ("設計建蔽率", ["59.9 %"]),
+    ("建築面積", ["騎樓 10 ㎡ 其他 150.25 ㎡", "其他：88 m2", "120 ㎡"]),
+    ("法定空地面積", ["50.1 ㎡", "33 m2"]),
+    ("總樓地板面積", ["1,500.75 ㎡", "900 m2"]),
+    ("使用類組", ["H-2 住宅\nG-3 事務所", "B-2 商場百貨" * 12, "D-1 室內運動場所"]),
+    ("備註", ["無"]),
+    ("發照日期", ["114/03/05", "1140305"]),
+    ("注意事項", ["請依核准圖說施工"]),
+    ("供公眾使用", ["否"]),
+    ("說明", ["其他：依法辦理"]),
+]
+
+
+def detail_text(seed):
+    rng = random.Random(seed)
+    parts = ["建造執照", f"(114)高市建字第{rng.randint(1, 9999):05d}號"]
+    sections = SECTIONS[:]
+    if rng.random() < 0.3: rng.shuffle(sections)
+    for label, values in sections:
+        if rng.random() < 0.2: continue
+        colon = rng.choice(["", ":", "：", " : ", "\n："])
+        gap = rng.choice([" ", "\n", "\t", "  \n "])
+        parts.append(f"{label}{colon}{gap}{rng.choice(values)}")
+    return rng.choice(["\n", " ", "\n\n"]).join(parts)
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_matches_legacy_on_generated_pages(seed):
+    text = detail_text(seed)
+    assert kaohsiung.DETAIL_FIELDS.extract(text) == legacy_kaohsiung(text)
+    assert taoyuan.DETAIL_FIELDS.extract(text) == legacy_taoyuan(text)
+
+
+def test_other_area_only_after_building_area():
+    # 「其他」先出現在別的欄位，建築面積底下的才算
+    text = "用途：其他\n建築面積\n騎樓 10 ㎡\n其他：150.25 ㎡\n法定空地面積 50 ㎡"
+    assert taoyuan.DETAIL_FIELDS.extract_field(text, "建築面積(其他)") == "150.25 ㎡"
+    assert taoyuan.DETAIL_FIELDS.extract(text) == legacy_taoyuan(text)
+    # 沒有建築面積：前面的「其他」不能被誤抓
+    text = "用途：其他 88 ㎡\n法定空地面積 50 ㎡"
+    assert taoyuan.DETAIL_FIELDS.extract_field(text, "建築面積(其他)") == ""
+    assert taoyuan.DETAIL_FIELDS.extract(text) == legacy_taoyuan(text)
+
+
+def test_missing_field_is_empty():
+    text = "建造執照\n起造人：王大明\n設計人：林建築師\n發照日期：114/03/05"
+    k, t = kaohsiung.DETAIL_FIELDS.extract(text), taoyuan.DETAIL_FIELDS.extract(text)
+    assert k["使用類組"] == t["使用類組"] == ""
+    assert k["法定空地面積"] == t["法定空地面積"] == ""
+    assert k["起造人"] == "王大明"
+    assert k == legacy_kaohsiung(text)
+    assert t == legacy_taoyuan(text)
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""🔁 增量模式：dense_frontier / plan_incremental_range"""
+from crawl_checkpoint import CrawlCheckpoint, FOUND, EMPTY, FAILED
+from range_discovery import dense_frontier, plan_incremental_range
+
+
+def checkpoint_with(tmp_path, found=(), empty=(), failed=()):
+    cp = CrawlCheckpoint(str(tmp_path / "checkpoint.jsonl"))
+    for status, numbers in ((FOUND, found), (EMPTY, empty), (FAILED, failed)):
+        for n in numbers: cp.mark(n, status)
+    return cp
+
+
+def test_frontier_empty_and_single():
+    assert dense_frontier([], 50) is None
+    assert dense_frontier([7], 50) == 7
+
+
+def test_frontier_is_highest_number_with_a_neighbour():
+    assert dense_frontier(list(range(1, 101)), 50) == 100
+
+
+def test_frontier_ignores_isolated_tail_sample():
+    # 尾段抽樣抽到的 900 號前 50 號內沒有鄰居，不能當前沿 (否則 101~899 整段被跳過)
+    assert dense_frontier(list(range(1, 101)) + [900], 50) == 100
+
+
+def test_frontier_neighbour_exactly_at_window():
+    assert dense_frontier([10, 60], 50) == 60
+    assert dense_frontier([10, 61], 50) == 10
+
+
+def test_frontier_across_gaps_within_window():
+    found = [n for n in range(1, 301) if n % 10]  # 每 10 號空一號
+    assert dense_frontier(found, 5) == 299
+
+
+def test_no_history_starts_from_start(tmp_path):
+    cp = checkpoint_with(tmp_path)
+    assert plan_incremental_range(cp, 1, 3000, recheck_window=50) == (1, 3000)
+
+
+def test_resume_from_frontier_and_reopen_empties(tmp_path):
+    cp = checkpoint_with(tmp_path, found=range(1, 101), empty=list(range(30, 40)) + list(range(101, 121)))
+    lo, hi = plan_incremental_range(cp, 1, 3000, recheck_window=50)
+    assert (lo, hi) == (51, 3000)
+    # 前沿之後、前沿前 recheck_window 號內的空號都要重查；更早的空號與有資料的號碼不動
+    assert all(cp.should_fetch(n) for n in range(101, 121))
+    assert not any(cp.should_fetch(n) for n in range(30, 40))
+    assert not any(cp.should_fetch(n) for n in range(51, 101))
+
+
+def test_reopen_is_memory_only(tmp_path):
+    cp = checkpoint_with(tmp_path, found=range(1, 101), empty=range(101, 111))
+    plan_incremental_range(cp, 1, 3000, recheck_window=50)
+    assert cp.should_fetch(105)
+    cp.reload()
+    assert cp.status(105) == EMPTY
+
+
+def test_frontier_near_start_is_clamped(tmp_path):
+    cp = checkpoint_with(tmp_path, found=[1, 2, 3])
+    assert plan_incremental_range(cp, 1, 3000, recheck_window=50) == (1, 3000)
+
+
+def test_isolated_sample_does_not_move_frontier(tmp_path):
+    cp = checkpoint_with(tmp_path, found=list(range(1, 101)) + [900], empty=range(101, 200))
+    lo, _ = plan_incremental_range(cp, 1, 3000, recheck_window=50)
+    assert lo == 51
+    assert cp.should_fetch(150)
+    assert not cp.should_fetch(900)
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""🕷️ 爬蟲主流程：一號多筆只存到部分詳情頁時，整號記 FAILED 重查"""
+import pytest
+
+from crawl_checkpoint import CrawlCheckpoint, FAILED
+from csv_batch_writer import close_all_writers
+from permit_crawler import CityAdapter, CrawlSettings, PermitCrawler
+
+COLUMNS = ["搜尋編號", "執照號碼", "行政區"]
+
+
+class FakeEngine:
+    """每號都查到兩筆；詳情頁文字就是連結本身"""
+
+    def __init__(self, site_root=None):
+        self.site_root = site_root
+
+    def search(self, target_year, num_str):
+        return [f"{self.site_root}/detail?no={num_str}&seq={seq}" for seq in (1, 2)]
+
+    def fetch_detail(self, href):
+        return None, f"執照 {href}"
+
+    def close(self):
+        pass
+
+
+class FakeAdapter(CityAdapter):
+    city = "測試市"
+    http_engine_class = FakeEngine
+
+    def parse_detail(self, full_text, search_num, year):
+        # 第二頁「不像執照頁」
+        if full_text.endswith("seq=2"): return None
+        return {"搜尋編號": search_num, "執照號碼": f"({year})測字第{search_num}號", "行政區": ""}
+
+
+@pytest.fixture
+def crawler(tmp_path):
+    settings = CrawlSettings(str(tmp_path), COLUMNS, engine="http", max_retries=1, detail_concurrency=1,
+                             host_rate_limit=1000, host_initial_rate=1000)
+    c = PermitCrawler(FakeAdapter(f"http://{tmp_path.name}.test"), settings, "114", 1, 10, "測試市_114.xlsx")
+    yield c
+    c.close()
+    close_all_writers()
+
+
+def test_partial_detail_pages_mark_number_failed(crawler):
+    assert crawler.process_number(12) is False
+    crawler.csv_writer.flush()
+    assert crawler.checkpoint.status(12) == FAILED
+    assert crawler.checkpoint.should_fetch(12)
+    # 重開紀錄檔也一樣：這號沒被當成有資料
+    reloaded = CrawlCheckpoint(crawler.checkpoint.path)
+    assert reloaded.status(12) == FAILED
+    assert reloaded.found_numbers() == []
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""🚀 直連引擎：查詢回應的判讀 (空號回 []、看不懂的頁面丟錯讓 Selenium 接手)"""
+from types import SimpleNamespace
+
+import pytest
+
+from mock_permit_server import KCG_QUERY_PAGE, TYCG_QUERY_PAGE, render_alert, render_result_list
+from permit_http import HttpEngineError, KaohsiungHttpEngine, TaoyuanHttpEngine
+
+KCG_FORM = KCG_QUERY_PAGE.format(token="T0KEN")
+TYCG_FORM = TYCG_QUERY_PAGE.format(code="1234", token="T0KEN")
+
+# SPA 外殼：script 裡自己就寫著 alert('查無資料') 的樣板 (結果要靠前端 JS 填)
+KCG_SHELL = KCG_FORM.replace("<script>", "<script>\n  function notFound() { alert('查無資料'); }")
+TYCG_SHELL = TYCG_FORM.replace("</form>", "</form><script>function notFound() { alert('查無資料'); }</script>")
+
+# 維護公告：有 <table>、有 alert，但都不是查詢結果
+MAINTENANCE = """<html><head><meta charset="utf-8"></head><body>
+<table class="layout"><tr><td>系統維護中，請稍後再試 (查無服務)</td></tr></table>
+<script>alert('系統維護中');</script></body></html>"""
+
+EMPTY_KCG_TABLE = render_result_list([], "licstable")
+EMPTY_TYCG_TABLE = render_result_list([], "list")
+
+
+class FakeSession:
+    """GET 回查詢頁，POST 回指定的查詢結果"""
+
+    def __init__(self, form_html, result_html):
+        self.form_html = form_html
+        self.result_html = result_html
+
+    def request(self, method, url, **kw):
+        body = self.form_html if method == "GET" else self.result_html
+        return SimpleNamespace(status_code=200, text=body, url=url, encoding="utf-8")
+
+    def close(self):
+        pass
+
+
+def kaohsiung(result_html):
+    return KaohsiungHttpEngine(session=FakeSession(KCG_FORM, result_html), site_root="http://mock")
+
+
+def taoyuan(result_html):
+    return TaoyuanHttpEngine(session=FakeSession(TYCG_FORM, result_html), site_root="http://mock")
+
+
+def test_result_links():
+    html = render_result_list([("/bupic/pages/detail?no=00012", "(114)高市建字第00012號")], "licstable")
+    assert kaohsiung(html).search("114", "00012") == ["http://mock/bupic/pages/detail?no=00012"]
+    html = render_result_list([("/bupic/detailAction.do?no=00012", "(114)桃市建字第00012號")], "list")
+    assert taoyuan(html).search("114", "00012") == ["http://mock/bupic/detailAction.do?no=00012"]
+
+
+@pytest.mark.parametrize("engine, html", [
+    (kaohsiung, render_alert("查無資料")),
+    (kaohsiung, EMPTY_KCG_TABLE),
+    (taoyuan, render_alert("查無資料")),
+    (taoyuan, EMPTY_TYCG_TABLE),
+], ids=["kcg-alert", "kcg-empty-table", "tycg-alert", "tycg-empty-table"])
+def test_empty_number(engine, html):
+    assert engine(html).search("114", "00012") == []
+
+
+@pytest.mark.parametrize("engine, html", [
+    (kaohsiung, KCG_SHELL),
+    (kaohsiung, KCG_FORM),
+    (kaohsiung, MAINTENANCE),
+    (kaohsiung, render_alert("驗證碼錯誤")),
+    (taoyuan, TYCG_SHELL),
+    (taoyuan, TYCG_FORM),
+    (taoyuan, MAINTENANCE),
+    (taoyuan, render_alert("驗證碼錯誤")),
+], ids=["kcg-spa-shell", "kcg-back-to-form", "kcg-maintenance", "kcg-other-alert",
+        "tycg-spa-shell", "tycg-back-to-form", "tycg-maintenance", "tycg-other-alert"])
+def test_unreadable_page_raises(engine, html):
+    with pytest.raises(HttpEngineError):
+        engine(html).search("114", "00012")
+
+
+def test_kaohsiung_reprimes_after_unreadable_page():
+    engine = kaohsiung(KCG_SHELL)
+    with pytest.raises(HttpEngineError, match="尚未填入結果的查詢頁"):
+        engine.search("114", "00012")
+    assert not engine._primed
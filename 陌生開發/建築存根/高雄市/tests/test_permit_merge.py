@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""🧹 去重合併：permit_merge 的鍵、評分與佔位列處理"""
+import csv
+import os
+
+from field_extractor import placeholder_license
+from permit_merge import canonical_license, normalize_license, merge, write_merged, find_csvs
+from permit_store import FIELD_COLUMNS, PermitStore
+
+COLUMNS = [name for name, _ in FIELD_COLUMNS]
+
+
+def row(search_num, license_no, **fields):
+    rec = dict.fromkeys(COLUMNS, "")
+    rec.update({"搜尋編號": search_num, "執照號碼": license_no}, **fields)
+    return rec
+
+
+def write_csv(path, records, mtime=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(records)
+    if mtime is not None: os.utime(path, (mtime, mtime))
+    return path
+
+
+def merged(tmp_path, city="高雄市"):
+    return list(merge([(city, p) for p in find_csvs(str(tmp_path))]))
+
+
+def test_normalize_license_variants():
+    assert normalize_license("（114）高市建字第 00012 號") == "(114)高市建字第12號"
+    assert normalize_license("(114)高市建字第12號") == "(114)高市建字第12號"
+    assert normalize_license("[需人工確認] 00012") == ""
+    assert normalize_license("") == ""
+    # 輸出保留爬蟲寫的流水號
+    assert canonical_license("（114）高市建字第 00012 號") == "(114)高市建字第00012號"
+
+
+def test_same_license_in_different_formats_collapses(tmp_path):
+    write_csv(str(tmp_path / "114" / "a.csv"), [row("00012", "（114）高市建字第 00012 號", 起造人="王")], mtime=1000)
+    write_csv(str(tmp_path / "114" / "b.csv"), [row("00012", "(114)高市建字第12號", 起造人="王")], mtime=2000)
+    out = merged(tmp_path)
+    assert len(out) == 1
+    assert out[0]["年份"] == "114"
+
+
+def test_most_complete_row_wins_over_newer(tmp_path):
+    write_csv(str(tmp_path / "114" / "old.csv"), [row("00012", "(114)高市建字第00012號", 起造人="王", 行政區="鳳山區")],
+              mtime=1000)
+    write_csv(str(tmp_path / "114" / "new.csv"), [row("00012", "(114)高市建字第00012號", 起造人="王")], mtime=2000)
+    out = merged(tmp_path)
+    assert [r["行政區"] for r in out] == ["鳳山區"]
+
+
+def test_tie_goes_to_newer_file(tmp_path):
+    write_csv(str(tmp_path / "114" / "old.csv"), [row("00012", "(114)高市建字第00012號", 起造人="舊")], mtime=1000)
+    write_csv(str(tmp_path / "114" / "new.csv"), [row("00012", "(114)高市建字第00012號", 起造人="新")], mtime=2000)
+    assert [r["起造人"] for r in merged(tmp_path)] == ["新"]
+
+
+def test_same_license_different_cities_kept(tmp_path):
+    path = write_csv(str(tmp_path / "114" / "a.csv"), [row("00012", "(114)建字第00012號")])
+    out = list(merge([("高雄市", path), ("桃園市", path)]))
+    assert sorted(r["城市"] for r in out) == ["桃園市", "高雄市"]
+
+
+def test_placeholder_dropped_once_search_number_resolves(tmp_path):
+    write_csv(str(tmp_path / "114" / "a.csv"), [row("00012", placeholder_license("00012", "頁面"))], mtime=1000)
+    write_csv(str(tmp_path / "114" / "b.csv"), [row("00012", "(114)高市建字第00012號")], mtime=2000)
+    assert [r["執照號碼"] for r in merged(tmp_path)] == ["(114)高市建字第00012號"]
+
+
+def test_distinct_placeholder_pages_are_kept(tmp_path):
+    a, b = placeholder_license("00012", "頁面 A"), placeholder_license("00012", "頁面 B")
+    assert a != b
+    # 同一頁重抓兩次只留一筆，不同頁各留一筆
+    write_csv(str(tmp_path / "114" / "a.csv"), [row("00012", a), row("00012", b), row("00012", a)])
+    assert sorted(r["執照號碼"] for r in merged(tmp_path)) == sorted([a, b])
+
+
+def test_year_from_license_when_folder_is_not_a_year(tmp_path):
+    write_csv(str(tmp_path / "misc" / "a.csv"), [row("00012", "(113)高市建字第00012號")])
+    assert [r["年份"] for r in merged(tmp_path)] == ["113"]
+
+
+def test_unreadable_csv_is_skipped(tmp_path):
+    write_csv(str(tmp_path / "114" / "good.csv"), [row("00012", "(114)高市建字第00012號")])
+    (tmp_path / "114" / "bad.csv").write_bytes(b"\xff\xfe\x00bad")
+    assert len(merged(tmp_path)) == 1
+
+
+def test_write_merged_to_csv_and_store(tmp_path):
+    write_csv(str(tmp_path / "in" / "114" / "a.csv"),
+              [row("00012", "(114)高市建字第00012號"), row("00012", "（114）高市建字第 00012 號"),
+               row("00013", "(114)高市建字第00013號")])
+    out_path = str(tmp_path / "merged.csv")
+    store = PermitStore(str(tmp_path / "permits.sqlite"))
+    try:
+        n = write_merged(merge([("高雄市", p) for p in find_csvs(str(tmp_path / "in"))]), out_path, store)
+        assert n == 2
+        with open(out_path, encoding="utf-8-sig", newline="") as f:
+            assert len(list(csv.DictReader(f))) == 2
+        assert len(list(store.iter_records(city="高雄市", year="114"))) == 2
+    finally:
+        store.close()
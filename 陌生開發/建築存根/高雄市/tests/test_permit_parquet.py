@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""📦 Parquet 數值欄：面積、層棟戶數、民國日期的文字解析"""
+from datetime import date
+
+import pytest
+
+from permit_parquet import parse_area, parse_floors_units, parse_roc_date
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1,234.56 ㎡", 1234.56),
+    ("345.67㎡", 345.67),
+    ("88 m2", 88.0),
+    ("合計：12,000 平方公尺", 12000.0),
+    ("150", 150.0),
+    ("", None),
+    (None, None),
+    ("詳見圖說", None),
+])
+def test_parse_area(text, expected):
+    assert parse_area(text) == expected
+
+
+@pytest.mark.parametrize("text, above, below, buildings, units", [
+    ("地上7層地下3層", 7, 3, None, None),
+    ("地上7層 地下3層 1棟 14戶", 7, 3, 1, 14),
+    ("地上 12 層 地下 2 層 2 幢 96 戶", 12, 2, 2, 96),
+    ("地下2層", None, 2, None, None),        # 只有地下層，不能當成地上層數
+    ("5層 1棟 10戶", 5, None, 1, 10),
+    ("地上層數：15 地下層數：4 棟數：3 戶數：120", 15, 4, 3, 120),
+    ("", None, None, None, None),
+])
+def test_parse_floors_units(text, above, below, buildings, units):
+    assert parse_floors_units(text) == {"floors_above": above, "floors_below": below,
+                                        "buildings": buildings, "units": units}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("114/10/12", date(2025, 10, 12)),
+    ("114年10月12日", date(2025, 10, 12)),
+    ("114.1.5", date(2025, 1, 5)),
+    ("99-03-01", date(2010, 3, 1)),
+    ("1141012", date(2025, 10, 12)),
+    ("發照日期：1100301", date(2021, 3, 1)),
+    ("114/13/01", None),      # 月份不合法
+    ("114/02/30", None),      # 日期不存在
+    ("11410120", None),       # 位數不對
+    ("尚未發照", None),
+    ("", None),
+    (None, None),
+])
+def test_parse_roc_date(text, expected):
+    assert parse_roc_date(text) == expected
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""🧭 號碼上限探測：find_ceiling / plan_year_range"""
+import pytest
+
+from range_discovery import find_ceiling, plan_year_range
+
+
+def site(numbers):
+    """模擬查詢站：numbers 裡的號碼有資料；記下查過哪些號碼"""
+    numbers = set(numbers)
+    def probe(n):
+        probe.calls.append(n)
+        return n in numbers
+    probe.calls = []
+    return probe
+
+
+def test_contiguous_ceiling_is_exact():
+    assert find_ceiling(site(range(1, 301)), 1, 3000) == 300
+
+
+def test_ceiling_with_single_gaps_smaller_than_window():
+    # 每 3 號空一號：每個探測窗 (5 號) 裡都還有資料，不能被單一空號騙到
+    numbers = [n for n in range(1, 301) if n % 3]
+    assert find_ceiling(site(numbers), 1, 3000) == 300
+
+
+def test_ceiling_zero_when_nothing_issued():
+    assert find_ceiling(site([]), 1, 3000) is None
+    assert plan_year_range(site([]), 1, 3000, sample_step=25) == (1, 0)
+
+
+def test_ceiling_at_max():
+    probe = site(range(1, 3001))
+    assert find_ceiling(probe, 1, 3000) == 3000
+    assert max(probe.calls) <= 3000
+    assert plan_year_range(site(range(1, 3001)), 1, 3000) == (1, 3000)
+
+
+def test_ceiling_just_below_max_with_truncated_window():
+    # 最後一個探測窗超出 hi，只看到 hi 為止
+    assert find_ceiling(site(range(1, 2999)), 1, 3000, window=5) >= 2998
+
+
+def test_known_skips_front_probe():
+    probe = site(range(1, 501))
+    # 估計值最多往後多算不到一個探測窗
+    assert 500 <= find_ceiling(probe, 1, 3000, known=400, window=5) < 505
+    assert min(probe.calls) >= 400
+
+
+def test_probe_window_landing_in_gap_is_recovered_by_tail_sampling():
+    # 指數探測 1 → 65 → 193，193 正好落在 180~220 的空號區：
+    # 上限先被估在 180 附近，尾段抽樣抽到 221 之後的資料要把密集區一路延伸到 400 以後
+    numbers = list(range(1, 180)) + list(range(221, 401))
+    assert find_ceiling(site(numbers), 1, 3000) < 221
+    start, dense_end = plan_year_range(site(numbers), 1, 3000, window=5, first_step=64, margin=50, sample_step=25)
+    assert start == 1
+    assert 400 <= dense_end <= 400 + 50 + 5
+
+
+def test_tail_sampling_extends_past_the_margin():
+    # 抽到的號碼後面還有一大段：不能只延伸到「抽到的號碼 + margin」
+    numbers = list(range(1, 101)) + list(range(200, 1001))
+    _, dense_end = plan_year_range(site(numbers), 1, 3000, margin=50, sample_step=25)
+    assert dense_end >= 1000
+
+
+def test_plan_stays_inside_bounds():
+    start, dense_end = plan_year_range(site(range(1, 2990)), 1, 3000, margin=50)
+    assert (start, dense_end) == (1, 3000)
+
+
+@pytest.mark.parametrize("failing", [{65}, {65, 66, 67, 68, 69}])
+def test_probe_errors_count_as_empty(failing):
+    numbers = set(range(1, 301))
+    def probe(n):
+        if n in failing: raise TimeoutError("timeout")
+        return n in numbers
+    start, dense_end = plan_year_range(probe, 1, 3000, margin=50)
+    assert start == 1 and dense_end >= 300
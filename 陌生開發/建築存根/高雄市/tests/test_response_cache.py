@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""📦 回應快取：TTL 過期、LRU 容量上限"""
+import random
+import zlib
+
+import pytest
+
+from response_cache import ResponseCache, detail_key
+
+
+@pytest.fixture
+def open_cache(tmp_path, clock):
+    caches = []
+    def make(**kwargs):
+        caches.append(ResponseCache(str(tmp_path / "cache.sqlite"), **kwargs))
+        return caches[-1]
+    yield make
+    for cache in caches: cache.close()
+
+
+def page(seed, size=4000):
+    """隨機字元的假頁面：壓縮後每頁還有好幾 KB，幾頁就能撐到容量上限"""
+    rng = random.Random(seed)
+    return "".join(rng.choice("建照執照號碼起造人地點面積0123456789") for _ in range(size))
+
+
+def stored_size(text):
+    return len(zlib.compress(text.encode("utf-8"), 6))
+
+
+def test_roundtrip_and_miss(open_cache):
+    cache = open_cache()
+    assert cache.get("nope") is None
+    cache.put("k", "高雄市")
+    assert cache.get("k") == "高雄市"
+
+
+def test_search_and_detail_helpers(open_cache):
+    cache = open_cache()
+    cache.put_search("高雄市", "114", 12, ["/a", "/b"])
+    assert cache.get_search("高雄市", "114", "00012") == ["/a", "/b"]
+    # 空號不快取
+    cache.put_search("高雄市", "114", 13, [])
+    assert cache.get_search("高雄市", "114", 13) is None
+    # jsessionid 不算在網址裡
+    cache.put_detail("https://x/detail.do;jsessionid=ABC?no=1", "內容")
+    assert cache.get_detail("https://x/detail.do;jsessionid=XYZ?no=1") == "內容"
+    assert detail_key("https://x/d;jsessionid=A?n=1") == "detail:https://x/d?n=1"
+    cache.drop_detail("https://x/detail.do?no=1")
+    assert cache.get_detail("https://x/detail.do?no=1") is None
+
+
+def test_ttl_expiry_on_read(open_cache, clock):
+    cache = open_cache(ttl=100)
+    cache.put("k", "v")
+    clock.now += 99
+    assert cache.get("k") == "v"
+    clock.now += 2
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_ttl_counts_from_store_not_last_read(open_cache, clock):
+    cache = open_cache(ttl=100)
+    cache.put("k", "v")
+    for _ in range(3):
+        clock.now += 70
+        cache.get("k")
+    assert cache.get("k") is None
+
+
+def test_expired_entries_purged_on_open(open_cache, clock):
+    cache = open_cache(ttl=100)
+    cache.put("old", "v")
+    clock.now += 50
+    cache.put("new", "v")
+    cache.close()
+    clock.now += 60
+    reopened = open_cache(ttl=100)
+    assert reopened.stats()["entries"] == 1
+    assert reopened.get("new") == "v"
+
+
+def test_lru_evicts_least_recently_read(open_cache, clock):
+    texts = {k: page(k) for k in "abcd"}
+    size = max(map(stored_size, texts.values()))
+    cache = open_cache(max_bytes=int(size * 3.5))
+    for k in "abc":
+        cache.put(k, texts[k])
+        clock.now += 1
+    # 讀過 a (超過回寫間隔才會更新讀取時間)，b 變成最久沒讀的
+    clock.now += 120
+    assert cache.get("a") == texts["a"]
+    clock.now += 1
+    cache.put("d", texts["d"])
+    assert cache.get("b") is None
+    assert cache.get("a") == texts["a"]
+    assert cache.get("d") == texts["d"]
+
+
+def test_eviction_keeps_total_under_cap(open_cache, clock):
+    size = stored_size(page(0))
+    cap = size * 5
+    cache = open_cache(max_bytes=cap)
+    for i in range(20):
+        cache.put(f"k{i}", page(i))
+        clock.now += 1
+        assert cache.stats()["bytes"] <= cap
+    # 刪到九成：最新的幾筆一定還在
+    assert cache.get("k19") is not None
+    assert cache.get("k0") is None
+
+
+def test_replacing_a_key_does_not_double_count(open_cache):
+    text = page(1)
+    cache = open_cache(max_bytes=stored_size(text) * 2)
+    for _ in range(5):
+        cache.put("same", text)
+    assert cache.stats() == {"entries": 1, "bytes": stored_size(text)}
+    assert cache.get("same") == text
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""📗 串流 Excel：匯出後用 openpyxl 讀回來，內容與 CSV 一致、不留暫存檔"""
+import csv
+import os
+
+from openpyxl import load_workbook
+
+from xlsx_export import StreamingXlsxWriter, build_workbook, csv_to_xlsx
+
+COLUMNS = ["搜尋編號", "執照號碼", "行政區"]
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        writer.writerows(rows)
+    return str(path)
+
+
+def sheet_rows(ws):
+    return [list(r) for r in ws.iter_rows(values_only=True)]
+
+
+def test_csv_to_xlsx_roundtrip(tmp_path):
+    rows = [["00001", "(114)高市建字第00001號", "鳳山區"], ["00002", "(114)高市建字第00002號", "苓雅區"]]
+    out = str(tmp_path / "高雄市_114.xlsx")
+    assert csv_to_xlsx(write_csv(tmp_path / "a.csv", rows), out, sheet_name="114") == 2
+    wb = load_workbook(out, read_only=True)
+    assert wb.sheetnames == ["114"]
+    assert sheet_rows(wb["114"]) == [COLUMNS] + rows
+    wb.close()
+    assert sorted(os.listdir(tmp_path)) == ["a.csv", "高雄市_114.xlsx"]
+
+
+def test_build_workbook_combined_sheet(tmp_path):
+    a = write_csv(tmp_path / "114.csv", [["00001", "A", "鳳山區"]])
+    b = write_csv(tmp_path / "113.csv", [["00007", "B", "苓雅區"], ["00008", "C", ""]])
+    out = str(tmp_path / "all.xlsx")
+    counts = build_workbook(out, {"114": a, "113": b, "112": str(tmp_path / "missing.csv")})
+    assert counts == {"全部": 3, "114": 1, "113": 2}
+    wb = load_workbook(out, read_only=True)
+    assert wb.sheetnames == ["全部", "114", "113"]
+    combined = sheet_rows(wb["全部"])
+    assert combined[0] == ["年份"] + COLUMNS
+    assert [r[0] for r in combined[1:]] == ["114", "113", "113"]
+    wb.close()
+
+
+def test_temp_file_keeps_xlsx_extension(tmp_path, monkeypatch):
+    saved = []
+    writer = StreamingXlsxWriter(str(tmp_path / "out.xlsx"))
+    writer.add_sheet("114", COLUMNS)
+    real_save = writer._wb.save
+    monkeypatch.setattr(writer._wb, "save", lambda path: (saved.append(path), real_save(path)))
+    writer.close()
+    assert saved == [str(tmp_path / "out.tmp.xlsx")]
+    assert os.listdir(tmp_path) == ["out.xlsx"]
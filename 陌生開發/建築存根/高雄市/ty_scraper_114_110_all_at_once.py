@@ -1,23 +1,22 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import time
 import os
 import logging
-import pandas as pd
-import random
 import re
-import threading
-import csv
-from datetime import datetime
+import sys
 
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
+
+from permit_http import TaoyuanHttpEngine
+from permit_crawler import CityAdapter, CrawlSettings, PermitCrawler, run_city, city_main
+from driver_pool import DriverPool
+from page_waits import wait_first, alert_present, element_present, js_truthy, all_of
+from crawl_metrics import timed
+from crawl_checkpoint import FOUND, EMPTY, FAILED
+from field_extractor import FieldExtractor, FieldSpec, license_pattern, placeholder_license
+from address_resolver import AddressResolver, county_aliases
 
 # 設定 Log
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
@@ -25,7 +24,10 @@ logger = logging.getLogger(__name__)
 
 # ==========================================
 # ✅ 設定存檔路徑
-BASE_PATH = r'/Users/wangliwen/Desktop/ JLL/陌生開發/建築存根/桃園市'
+BASE_PATH = os.environ.get("TYCG_OUTPUT_DIR", r'/Users/wangliwen/Desktop/ JLL/陌生開發/建築存根/桃園市')
+
+# 🌐 查詢站 (壓力測試時可用環境變數指向 mock_permit_server.py)
+SITE_ROOT = os.environ.get("TYCG_SITE_ROOT", "https://building.tycg.gov.tw").rstrip("/")
 
 # 🎯 設定年份組 (一次全開！)
 # 將所有年份放在同一個列表中，程式會同時啟動 5 個視窗
@@ -40,327 +42,218 @@ END_NUM = 3000
 # 🛑 停損設定 (維持嚴格標準)
 MAX_SAME_NUM_RETRIES = 3       # 單號重試 3 次
 MAX_CONSECUTIVE_YEAR_FAILS = 5 # 連續 5 號空就停
+
+# 🧭 上限探測: 先用指數 / 二分探測估出每年發到幾號，只密集掃描 [START_NUM, 上限 + 邊界]，尾段抽樣
+# (開啟時密集區不再用連續空號停損，中段空號區不會提早結束)
+RANGE_DISCOVERY = True
+DISCOVERY_WINDOW = 5       # 每個探測點看幾個連號
+DISCOVERY_MARGIN = 50      # 上限之後多掃幾號
+DISCOVERY_SAMPLE_STEP = 25 # 尾段每隔幾號抽查一次
+
+# 🔁 執行模式: "full" = 整年掃描；"incremental" = 每日增量，只從上次最高有資料的號碼 (前沿) 往後查，
+#    並重查前沿前 RECHECK_WINDOW 號內的空號 (晚上架的執照)。可用環境變數 TYCG_CRAWL_MODE 切換
+CRAWL_MODE = os.environ.get("TYCG_CRAWL_MODE", "full")
+RECHECK_WINDOW = 50
+INCREMENTAL_YEARS = None   # None = 今年 + 去年 (民國)
+
+# 🧵 排程設定: 全域同時查詢數 / 每秒查詢次數上限 (同一主機，實際速率由 AIMD 依延遲與錯誤自動調整)
+CONCURRENCY = 5
+HOST_RATE_LIMIT = 1.0
+HOST_INITIAL_RATE = 0.4  # 起始速率 (每秒)，之後依回應自動加減速
+
+# 📑 一號多筆時詳情頁同時抓幾個 (直連 = 平行請求，瀏覽器 = 同時開幾個分頁)；1 = 逐筆
+DETAIL_CONCURRENCY = 4
+
+# ⚡ 查詢引擎: "http" = 直連 (不開 Chrome)，失敗才退回瀏覽器；"selenium" = 只用瀏覽器
+ENGINE = "http"
+
+# 🪶 瀏覽器模式: "lean" = 不載圖片 / 字型 / CSS / 統計追蹤、eager 載入；"full" = 完整 Chrome (畫面異常時切回)
+BROWSER_PROFILE = "lean"
+
+# 📝 CSV 批次寫入: 累積幾筆或幾秒寫一次；durability = "fsync" / "flush" / "none"
+CSV_FLUSH_ROWS = 50
+CSV_FLUSH_SECONDS = 5.0
+CSV_DURABILITY = "fsync"
+
+# 🗄️ SQLite 資料庫 (WAL)：依 (城市, 年份, 執照號碼) upsert，CSV 照寫；None = 不寫資料庫
+#    兩個城市想放同一個檔，可用環境變數 PERMIT_DB 指向同一路徑
+SQLITE_PATH = os.environ.get("PERMIT_DB", os.path.join(BASE_PATH, "permits.sqlite"))
+
+# 📗 全部批次跑完後，把本次各年份 CSV 串流合併成一個活頁簿 (「全部」+ 每年一張工作表)
+CONSOLIDATED_XLSX = True
+
+# 📦 回應快取: 查詢結果 / 詳情頁文字壓縮存本機，重試、重跑時已抓過的頁面不再連網；None = 不快取
+#    超過 CACHE_TTL_DAYS 天視為過期，總大小超過 CACHE_MAX_MB 從最久沒用的開始刪
+RESPONSE_CACHE = os.path.join(BASE_PATH, "response_cache.sqlite")
+CACHE_TTL_DAYS = 7
+CACHE_MAX_MB = 512
+
+# 📚 原始頁面存檔: 每個詳情頁的 innerText 存一份 (內容相同只存一份)；改了解析邏輯後執行
+#    `python 本腳本.py reparse` 從這裡重建 CSV / 資料庫，不用重爬 (parser_bench.py 也讀這裡)；None = 不存
+#    CAPTURE_HTML = True 另存原始 HTML (比對直連 / 瀏覽器文字差異時用，佔空間)
+CAPTURE_DIR = os.path.join(BASE_PATH, "raw_pages")
+CAPTURE_HTML = False
+
+# 📊 指標端點: http://127.0.0.1:9109/metrics (Prometheus 格式)，結束時另印摘要；None = 不開端點
+METRICS_PORT = 9109
 # ==========================================
 
-class TyScraperStrict114:
-    def __init__(self, target_year, start_num, end_num, output_filename):
-        self.url = "https://building.tycg.gov.tw/bupic/preLoginFormAction.do"
-        self.target_year = target_year
-        self.start_num = start_num
-        self.end_num = end_num
-        self.output_filename = output_filename
-        self.csv_filename = output_filename.replace(".xlsx", ".csv")
-        self.driver = None
-        self.results = []
-        
-        self.target_folder = os.path.join(BASE_PATH, self.target_year)
-        if not os.path.exists(self.target_folder):
-            try:
-                os.makedirs(self.target_folder)
-                logger.info(f"📁 [{self.target_year}] 資料夾準備就緒")
-            except: pass
-
-        self.init_csv()
-
-    def init_csv(self):
-        csv_path = os.path.join(self.target_folder, self.csv_filename)
-        if not os.path.exists(csv_path):
-            columns = [
-                "搜尋編號", "執照號碼", "起造人", "行政區", "建築地點", 
-                "使用分區", "層棟戶數", "基地面積(合計)", "建築面積(其他)", 
-                "法定空地面積", "總樓地板面積", "發照日期", "使用類組"
-            ]
-            try:
-                with open(csv_path, mode='w', newline='', encoding='utf-8-sig') as f:
-                    writer = csv.DictWriter(f, fieldnames=columns)
-                    writer.writeheader()
-            except Exception as e:
-                logger.error(f"⚠️ CSV 初始化失敗: {e}")
-
-    def save_row_to_csv(self, record):
-        csv_path = os.path.join(self.target_folder, self.csv_filename)
-        try:
-            with open(csv_path, mode='a', newline='', encoding='utf-8-sig') as f:
-                writer = csv.DictWriter(f, fieldnames=record.keys())
-                writer.writerow(record)
-        except Exception as e:
-            logger.error(f"⚠️ 單筆寫入失敗: {e}")
-
-    def init_driver(self):
-        options = Options()
-        options.add_argument('--headless=new') 
-        options.add_argument('--disable-gpu')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--window-size=1920,1080')
-        options.add_argument("user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-        self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-
-    def close_driver(self):
-        if self.driver:
-            try: self.driver.quit()
-            except: pass
-            self.driver = None
-
-    def solve_captcha_direct(self):
-        try:
-            return self.driver.find_element(By.ID, "checkCode").text.strip() or \
-                   self.driver.execute_script("return document.getElementById('checkCode').innerText")
-        except: return ""
+CSV_COLUMNS = [
+    "搜尋編號", "執照號碼", "起造人", "行政區", "建築地點", 
+    "使用分區", "層棟戶數", "基地面積(合計)", "建築面積(其他)", 
+    "法定空地面積", "總樓地板面積", "發照日期", "使用類組"
+]
 
-    def get_full_text_safe(self):
-        try: return self.driver.execute_script("var text = document.body.innerText; return text;")
-        except: return ""
+# 🚗 瀏覽器池 (只在 Selenium 路徑用到時才真的開 Chrome)
+DRIVER_POOL = DriverPool(size=CONCURRENCY, profile=BROWSER_PROFILE)
+
+# 📍 桃園市 13 行政區
+TAOYUAN_DISTRICTS = [
+    "桃園區", "中壢區", "平鎮區", "八德區", "楊梅區", "蘆竹區", "大溪區",
+    "龍潭區", "龜山區", "大園區", "觀音區", "新屋區", "復興區"
+]
 
-    def extract_value_from_text(self, text_source, start_keywords, end_keywords=None):
-        for key in start_keywords:
-            if key in text_source:
-                try:
-                    temp = text_source.split(key, 1)[1].strip()
-                    if temp.startswith(":") or temp.startswith("："): temp = temp[1:].strip()
-                    if end_keywords:
-                        for end_key in end_keywords:
-                            if end_key in temp:
-                                temp = temp.split(end_key, 1)[0].strip()
-                                break
-                    lines = temp.split('\n')
-                    if lines: return lines[0].strip()
-                except: continue
-        return ""
-
-    def extract_usage_between_keywords(self, full_text):
-        start_key = "使用類組"
-        end_key = "備註" 
-        backup_end_keys = ["注意事項", "起造人", "設計人", "說明", "發照日期"]
-        if start_key not in full_text: return ""
+# 🧩 詳情頁欄位規格 (編譯一次，一頁一次抽完)
+DETAIL_FIELDS = FieldExtractor([
+    FieldSpec("姓名", ["姓名"], ["事務所", "電話"]),
+    FieldSpec("起造人", ["起造人"], ["設計人"]),
+    FieldSpec("建築地點", ["地址", "建築地點", "地號", "基地坐落"], ["使用分區", "基地面積"]),
+    FieldSpec("使用分區", ["使用分區"], ["基地面積", "建物概要"]),
+    FieldSpec("層棟戶數", ["層棟戶數"], ["設計建蔽率", "法定空地"]),
+    FieldSpec("基地面積(合計)", ["合計", "基地面積"], ["㎡", "m2", "騎樓地"], unit="㎡"),
+    FieldSpec("建築面積(其他)", ["其他"], ["㎡", "m2"], unit="㎡", after="建築面積"),
+    FieldSpec("法定空地面積", ["法定空地面積", "法定空地"], ["㎡", "m2"], unit="㎡"),
+    FieldSpec("總樓地板面積", ["總樓地板面積", "樓地板面積"], ["㎡", "m2"], unit="㎡"),
+    FieldSpec("發照日期", ["發照日期"], ["注意事項", "供公眾"]),
+    FieldSpec("使用類組", ["使用類組"], ["備註", "注意事項", "起造人", "設計人", "說明", "發照日期"], block=True, max_len=100),
+])
+LICENSE_FALLBACK_RE = re.compile(r"(桃市.*?執照.*?號)")
+
+# 📍 地址解析 (行政區與舊名一次掃完)：2014 升格前的鄉鎮市舊名 (中壢市、龜山鄉…) 對到現在的區；
+#    「桃園市」同時是市名，不當成桃園區的舊名
+ADDRESS_RESOLVER = AddressResolver(
+    TAOYUAN_DISTRICTS,
+    aliases={alias: d for alias, d in county_aliases(TAOYUAN_DISTRICTS).items() if alias != "桃園市"},
+)
+
+def parse_detail_text(full_text, search_num, target_year):
+    """詳情頁 innerText → 一筆紀錄；不像執照頁面時回傳 None (不碰瀏覽器 / 檔案，可離線重跑)"""
+    license_no = ""
+    match = license_pattern(target_year).search(full_text)
+    if match: license_no = match.group(1)
+    else:
+        match = LICENSE_FALLBACK_RE.search(full_text)
+        license_no = match.group(1) if match else ""
+
+    if not license_no and ("執照" not in full_text): return None
+    if not license_no: license_no = placeholder_license(search_num, full_text)
+
+    v = DETAIL_FIELDS.extract(full_text)
+    builder = v["姓名"] or v["起造人"]
+
+    raw_location = v["建築地點"]
+    district = ADDRESS_RESOLVER.resolve(raw_location).district
+    clean_location = raw_location.strip()
+
+    return {
+        "搜尋編號": search_num,
+        "執照號碼": license_no,
+        "起造人": builder,
+        "行政區": district,
+        "建築地點": clean_location,
+        "使用分區": v["使用分區"],
+        "層棟戶數": v["層棟戶數"],
+        "基地面積(合計)": v["基地面積(合計)"],
+        "建築面積(其他)": v["建築面積(其他)"],
+        "法定空地面積": v["法定空地面積"],
+        "總樓地板面積": v["總樓地板面積"],
+        "發照日期": v["發照日期"],
+        "使用類組": v["使用類組"]
+    }
+
+class TaoyuanAdapter(CityAdapter):
+    """🔌 桃園市查詢站：preLoginFormAction.do，驗證碼是頁面上的文字"""
+    city = "桃園市"
+    query_path = "/bupic/preLoginFormAction.do"
+    http_engine_class = TaoyuanHttpEngine
+    result_link_locator = (By.XPATH, "//table//tr/td//a[contains(@href, 'do')]")
+    districts = TAOYUAN_DISTRICTS
+
+    def solve_captcha_direct(self, driver):
         try:
-            content_after_start = full_text.split(start_key, 1)[1]
-            if content_after_start.strip().startswith(":") or content_after_start.strip().startswith("："):
-                content_after_start = content_after_start.strip()[1:]
-            target_content = ""
-            if end_key in content_after_start:
-                target_content = content_after_start.split(end_key, 1)[0]
-            else:
-                found_backup = False
-                for k in backup_end_keys:
-                    if k in content_after_start:
-                        target_content = content_after_start.split(k, 1)[0]
-                        found_backup = True
-                        break
-                if not found_backup:
-                    target_content = content_after_start[:100]
-            return target_content.strip()
+            return driver.find_element(By.ID, "checkCode").text.strip() or \
+                   driver.execute_script("return document.getElementById('checkCode').innerText")
         except: return ""
 
-    def process_detail_page_in_new_tab(self, search_num):
-        try:
-            WebDriverWait(self.driver, 15).until(EC.presence_of_element_located((By.TAG_NAME, "table")))
-            time.sleep(0.5) 
-            full_text = self.get_full_text_safe()
-            
-            license_no = ""
-            regex_pattern = fr"(\(\s*{self.target_year}\s*\).*?號)"
-            match = re.search(regex_pattern, full_text)
-            if match: license_no = match.group(1)
-            else:
-                match = re.search(r"(桃市.*?執照.*?號)", full_text)
-                license_no = match.group(1) if match else ""
-
-            if not license_no and ("執照" not in full_text): return
-            if not license_no: license_no = f"[需人工確認] {search_num}"
-
-            builder = self.extract_value_from_text(full_text, ["姓名"], ["事務所", "電話"]) 
-            if not builder: builder = self.extract_value_from_text(full_text, ["起造人"], ["設計人"])
-
-            raw_location = self.extract_value_from_text(full_text, ["地址", "建築地點", "地號", "基地坐落"], ["使用分區", "基地面積"])
-            district = ""
-            clean_location = raw_location
-            if "區" in raw_location:
-                try:
-                    idx = raw_location.find("區")
-                    start = max(0, idx - 3)
-                    candidate = raw_location[start:idx+1]
-                    if "市" in candidate: district = candidate.split("市")[-1]
-                    else: district = candidate[-3:]
-                    clean_location = raw_location.strip()
-                except: pass
-
-            zoning = self.extract_value_from_text(full_text, ["使用分區"], ["基地面積", "建物概要"])
-            units = self.extract_value_from_text(full_text, ["層棟戶數"], ["設計建蔽率", "法定空地"])
-            
-            site_area_total = self.extract_value_from_text(full_text, ["合計", "基地面積"], ["㎡", "m2", "騎樓地"])
-            if site_area_total and "㎡" not in site_area_total: site_area_total += " ㎡"
-
-            build_area_other = ""
-            if "建築面積" in full_text:
-                try:
-                    text_after_build = full_text.split("建築面積", 1)[1]
-                    build_area_other = self.extract_value_from_text(text_after_build, ["其他"], ["㎡", "m2"])
-                    if build_area_other: build_area_other += " ㎡"
-                except: pass
-
-            legal_open = self.extract_value_from_text(full_text, ["法定空地面積", "法定空地"], ["㎡", "m2"])
-            if legal_open: legal_open += " ㎡"
-            floor_area = self.extract_value_from_text(full_text, ["總樓地板面積", "樓地板面積"], ["㎡", "m2"])
-            if floor_area: floor_area += " ㎡"
-            date = self.extract_value_from_text(full_text, ["發照日期"], ["注意事項", "供公眾"])
-            usage_data = self.extract_usage_between_keywords(full_text)
-
-            record = {
-                "搜尋編號": search_num,
-                "執照號碼": license_no,
-                "起造人": builder,
-                "行政區": district,
-                "建築地點": clean_location,
-                "使用分區": zoning,
-                "層棟戶數": units,
-                "基地面積(合計)": site_area_total,
-                "建築面積(其他)": build_area_other,
-                "法定空地面積": legal_open,
-                "總樓地板面積": floor_area,
-                "發照日期": date,
-                "使用類組": usage_data
-            }
-            
-            self.results.append(record)
-            self.save_row_to_csv(record)
-            logger.info(f"   ✅ [{self.target_year}年] {license_no} | {district} | 地點: {clean_location[:10]}")
-
-        except Exception as e:
-            logger.error(f"   ❌ [{self.target_year}年] 解析失敗: {e}")
-
-    def search_and_process_single_try(self, number_val):
-        num_str = f"{number_val:05d}"
-        try:
-            self.driver.get(self.url)
-            wait = WebDriverWait(self.driver, 10)
-            
-            # 🔥 嚴格使用 .clear()
-            year_input = wait.until(EC.visibility_of_element_located((By.XPATH, "//input[contains(@placeholder, '年度')] | //input[@name='keYear']")))
-            year_input.clear()
-            year_input.send_keys(self.target_year)
-            
-            no_input = self.driver.find_element(By.XPATH, "//input[contains(@placeholder, '號碼')] | //input[@name='keNo']")
-            no_input.clear()
-            no_input.send_keys(num_str)
-
-            code = self.solve_captcha_direct()
-            if code:
-                self.driver.find_element(By.XPATH, "//input[contains(@placeholder, '驗證碼')] | //input[@name='checkCode']").send_keys(code)
-            
-            self.driver.find_element(By.XPATH, "//input[@type='button' and @value='查詢'] | //button[contains(., '查詢')]").click()
-            
-            try:
-                WebDriverWait(self.driver, 2).until(EC.alert_is_present())
-                self.driver.switch_to.alert.accept()
-                return False 
-            except TimeoutException: pass
-
-            try: wait.until(EC.presence_of_element_located((By.TAG_NAME, "table")))
-            except: return False 
-
-            links = self.driver.find_elements(By.XPATH, "//table//tr/td//a[contains(@href, 'do')]")
-            if not links: return False 
-
-            logger.info(f"🔎 [{self.target_year}年][{num_str}] 找到 {len(links)} 筆")
-            self.main_window = self.driver.current_window_handle
-            
-            for i in range(len(links)):
-                links = self.driver.find_elements(By.XPATH, "//table//tr/td//a[contains(@href, 'do')]")
-                if i >= len(links): break
-                href = links[i].get_attribute('href')
-                self.driver.execute_script(f"window.open('{href}', '_blank');")
-                time.sleep(2.0)
-                new_window = [w for w in self.driver.window_handles if w != self.main_window][0]
-                self.driver.switch_to.window(new_window)
-                self.process_detail_page_in_new_tab(num_str)
-                self.driver.close()
-                self.driver.switch_to.window(self.main_window)
-                time.sleep(0.5)
-            
-            return True 
-
-        except Exception as e:
-            if "unexpectedly exited" in str(e) or "disconnected" in str(e):
-                logger.warning(f"🚨 Driver 崩潰，重啟中...")
-                self.close_driver()
-                time.sleep(3)
-                self.init_driver()
-            return False
-
-    def run(self):
-        self.init_driver()
-        logger.info(f"🟢 [{self.target_year}年] 火力全開版啟動 | 範圍: {self.start_num}~{self.end_num}")
-        
-        consecutive_year_fails = 0 
-        counter = 0
-        
-        for i in range(self.start_num, self.end_num + 1):
-            
-            if counter > 0 and counter % 50 == 0:
-                logger.info(f"♻️ [{self.target_year}年] 換氣釋放記憶體...")
-                self.close_driver()
-                time.sleep(2)
-                self.init_driver()
-
-            current_num_found = False
-            for retry in range(1, MAX_SAME_NUM_RETRIES + 1):
-                if self.search_and_process_single_try(i):
-                    current_num_found = True
-                    break 
-                else:
-                    if retry < MAX_SAME_NUM_RETRIES:
-                        time.sleep(1.0) 
-            
-            if current_num_found:
-                consecutive_year_fails = 0 
-            else:
-                consecutive_year_fails += 1
-                logger.warning(f"❌ [{self.target_year}年][{i:05d}] 空號 (累積 {consecutive_year_fails}/{MAX_CONSECUTIVE_YEAR_FAILS})")
-
-            if consecutive_year_fails >= MAX_CONSECUTIVE_YEAR_FAILS:
-                logger.info(f"🛑 [{self.target_year}年] 連續 {MAX_CONSECUTIVE_YEAR_FAILS} 筆空號，判定結束。")
-                break 
-
-            counter += 1
-            time.sleep(random.uniform(2.0, 3.5)) 
-            
-        if self.results:
-            try:
-                output_path = os.path.join(self.target_folder, self.output_filename)
-                pd.DataFrame(self.results).to_excel(output_path, index=False)
-                logger.info(f"💾 [{self.target_year}年] Excel 產出: {output_path}")
-            except: pass
-        else:
-            logger.info(f"⚠️ [{self.target_year}年] 無資料")
-            
-        self.driver.quit()
-
-def run_scraper_thread(year, start, end):
-    filename = f"tycg_permits_{year}_ALL_AT_ONCE_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-    try:
-        bot = TyScraperStrict114(year, start, end, filename)
-        bot.run()
-    except Exception as e:
-        logger.error(f"❌ 線程 [{year}年] 錯誤: {e}")
+    def fill_query_form(self, driver, year, num_str):
+        wait = WebDriverWait(driver, 10)
+
+        # 🔥 嚴格使用 .clear()
+        year_input = wait.until(EC.visibility_of_element_located((By.XPATH, "//input[contains(@placeholder, '年度')] | //input[@name='keYear']")))
+        year_input.clear()
+        year_input.send_keys(year)
+
+        no_input = driver.find_element(By.XPATH, "//input[contains(@placeholder, '號碼')] | //input[@name='keNo']")
+        no_input.clear()
+        no_input.send_keys(num_str)
+
+        with timed("驗證碼"): code = self.solve_captcha_direct(driver)
+        if not code: return False
+        driver.find_element(By.XPATH, "//input[contains(@placeholder, '驗證碼')] | //input[@name='checkCode']").send_keys(code)
+
+        # 查詢頁做記號：記號不見 = 已換頁 (結果頁不用再猜要等多久)
+        driver.execute_script("window.__permitQuery = true;")
+        driver.find_element(By.XPATH, "//input[@type='button' and @value='查詢'] | //button[contains(., '查詢')]").click()
+        return True
+
+    def wait_for_results(self, driver):
+        # alert / 結果頁表格先到者 (成功時不再白等 2 秒 alert)；10 秒都沒有 = 失敗
+        navigated = js_truthy("return !window.__permitQuery && document.readyState != 'loading';")
+        status = wait_first(driver, [
+            (EMPTY, alert_present()),
+            (FOUND, all_of(navigated, element_present((By.TAG_NAME, "table")))),
+        ], timeout=10)
+        if status == EMPTY: driver.switch_to.alert.accept()
+        # 有表格但沒有詳情連結的，open_result_links 會判為 EMPTY
+        return status or FAILED
+
+    def parse_detail(self, full_text, search_num, year):
+        return parse_detail_text(full_text, search_num, year)
+
+ADAPTER = TaoyuanAdapter(SITE_ROOT)
+
+SETTINGS = CrawlSettings(
+    BASE_PATH, CSV_COLUMNS, start_num=START_NUM, end_num=END_NUM, max_consecutive_fails=MAX_CONSECUTIVE_YEAR_FAILS,
+    max_retries=MAX_SAME_NUM_RETRIES, engine=ENGINE, concurrency=CONCURRENCY, host_rate_limit=HOST_RATE_LIMIT,
+    host_initial_rate=HOST_INITIAL_RATE, detail_concurrency=DETAIL_CONCURRENCY,
+    csv_flush_rows=CSV_FLUSH_ROWS, csv_flush_seconds=CSV_FLUSH_SECONDS, csv_durability=CSV_DURABILITY,
+    sqlite_path=SQLITE_PATH, capture_dir=CAPTURE_DIR, capture_html=CAPTURE_HTML,
+    range_discovery=RANGE_DISCOVERY, discovery_window=DISCOVERY_WINDOW, discovery_margin=DISCOVERY_MARGIN,
+    discovery_sample_step=DISCOVERY_SAMPLE_STEP,
+    crawl_mode=CRAWL_MODE, recheck_window=RECHECK_WINDOW, incremental_years=INCREMENTAL_YEARS,
+    metrics_port=METRICS_PORT, browser_profile=BROWSER_PROFILE,
+    cache_path=RESPONSE_CACHE, cache_ttl=CACHE_TTL_DAYS * 86400, cache_max_bytes=CACHE_MAX_MB * 2**20,
+    # 不把整年資料留在記憶體，每年結束後從已落地的 CSV 產出 Excel
+    year_excel=True, consolidated_xlsx=CONSOLIDATED_XLSX,
+)
+
+class TyScraperStrict114(PermitCrawler):
+    """單一年份的桃園市 worker (流程在 permit_crawler.PermitCrawler)"""
+    def __init__(self, target_year, start_num, end_num, output_filename, engine=ENGINE, driver_pool=None):
+        super().__init__(ADAPTER, SETTINGS, target_year, start_num, end_num, output_filename,
+                         engine=engine, driver_pool=driver_pool or DRIVER_POOL)
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # 🧩 分片模式 (多個行程 / 多台主機)：plan 切租約、work 領租約來做、status 看進度
+        # ♻️ reparse：改了解析邏輯後，從 CAPTURE_DIR 存下的原始頁面重建 CSV / 資料庫，不用重爬
+        sys.exit(city_main(ADAPTER, SETTINGS, YEAR_BATCHES, "tycg_permits"))
+
     print(f"🚀 啟動 [114~110年] 五視窗火力全開版")
-    print(f"✨ 執行模式: 5 年份同時執行 (請確保電源已接上)")
+    print(f"✨ 執行模式: 所有年份共用佇列，{CONCURRENCY} 路同時查詢 (請確保電源已接上)")
     print(f"✨ 使用 .clear() 嚴格搜尋 | CSV 即時存檔")
 
-    for batch in YEAR_BATCHES:
-        print(f"\n======== 🎬 開始執行批次：{batch} ========")
-        threads = []
-        for year in batch:
-            t = threading.Thread(target=run_scraper_thread, args=(year, START_NUM, END_NUM))
-            threads.append(t)
-            t.start()
-            time.sleep(5) 
-
-        for t in threads:
-            t.join()
-        
-        print(f"✅ 任務完成！")
+    run_city(ADAPTER, SETTINGS, YEAR_BATCHES, lambda year, tag, stamp: f"tycg_permits_{year}_{tag}_{stamp}.xlsx",
+             driver_pool=DRIVER_POOL)
 
     print("\n🏁 114~110 全數任務完成！")
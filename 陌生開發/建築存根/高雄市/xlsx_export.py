@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""📗 串流寫 Excel：openpyxl write_only 模式，一列一列寫，不用先把整年讀進 DataFrame。
+
+- StreamingXlsxWriter：append(record) 逐筆寫入，close() 時先存成暫存檔再改名，
+  中途失敗不會留下打不開的半個 .xlsx
+- csv_to_xlsx：單一年份 CSV → Excel (取代 pd.read_csv(...).to_excel)
+- build_workbook：多個年份 CSV → 一個活頁簿，「全部」合併表 + 每年一張工作表
+
+.xlsx 是 zip 檔，沒辦法邊爬邊存檔；資料安全仍靠即時落地的 CSV，Excel 隨時可以從 CSV 重建。
+命令列：python xlsx_export.py 輸出.xlsx 114=a.csv 113=b.csv
+"""
+import csv
+import logging
+import os
+import re
+import sys
+
+from openpyxl import Workbook
+
+logger = logging.getLogger(__name__)
+
+_BAD_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+
+def _sheet_title(name):
+    return _BAD_SHEET_CHARS.sub("_", str(name))[:31] or "Sheet"
+
+
+class StreamingXlsxWriter:
+    """write_only 活頁簿：每張工作表第一列是欄名，之後逐筆 append"""
+
+    def __init__(self, path):
+        self.path = path
+        self._wb = Workbook(write_only=True)
+        self._sheets = {}
+        self.rows_written = {}
+
+    def add_sheet(self, name, fieldnames):
+        ws = self._wb.create_sheet(_sheet_title(name))
+        ws.append(list(fieldnames))
+        self._sheets[name] = (ws, list(fieldnames))
+        self.rows_written[name] = 0
+        return name
+
+    def append(self, name, record):
+        ws, fieldnames = self._sheets[name]
+        ws.append([record.get(f, "") for f in fieldnames])
+        self.rows_written[name] += 1
+
+    def close(self):
+        # 暫存檔保留 .xlsx 副檔名 (a.tmp.xlsx)：openpyxl / Excel 都靠副檔名認格式
+        root, ext = os.path.splitext(self.path)
+        tmp = f"{root}.tmp{ext or '.xlsx'}"
+        try:
+            self._wb.save(tmp)
+            os.replace(tmp, self.path)
+        finally:
+            if os.path.exists(tmp): os.remove(tmp)
+
+
+def _iter_csv(path):
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f)
+        yield reader.fieldnames or []
+        yield from reader
+
+
+def csv_to_xlsx(csv_path, xlsx_path, sheet_name="Sheet1"):
+    """單一 CSV → Excel，回傳筆數"""
+    rows = _iter_csv(csv_path)
+    fieldnames = next(rows)
+    writer = StreamingXlsxWriter(xlsx_path)
+    writer.add_sheet(sheet_name, fieldnames)
+    for rec in rows:
+        writer.append(sheet_name, rec)
+    writer.close()
+    return writer.rows_written[sheet_name]
+
+
+def build_workbook(xlsx_path, sheets, combined_sheet="全部", combined_key="年份"):
+    """sheets: {工作表名稱 (通常是年份): CSV 路徑}，依序串流讀入；不存在的 CSV 跳過
+
+    combined_sheet 不為 None 時，第一張工作表是合併表，第一欄是 combined_key。
+    write_only 模式各工作表各自有暫存檔，每個 CSV 只讀一次就同時寫進兩張表。
+    回傳 {工作表名稱: 筆數}。
+    """
+    sources = {}
+    for name, csv_path in sheets.items():
+        if os.path.exists(csv_path): sources[name] = csv_path
+        else: logger.warning(f"⚠️ 找不到 {csv_path}，略過")
+
+    writer = StreamingXlsxWriter(xlsx_path)
+    combined = None
+    if combined_sheet and sources:
+        fieldnames = []
+        for csv_path in sources.values():
+            fieldnames += [f for f in next(_iter_csv(csv_path)) if f not in fieldnames]
+        combined = writer.add_sheet(combined_sheet, [combined_key] + fieldnames)
+
+    for name, csv_path in sources.items():
+        rows = _iter_csv(csv_path)
+        writer.add_sheet(name, next(rows))
+        for rec in rows:
+            writer.append(name, rec)
+            if combined:
+                rec[combined_key] = name
+                writer.append(combined, rec)
+    writer.close()
+    counts = dict(writer.rows_written)
+    logger.info(f"💾 活頁簿產出: {xlsx_path} | " + " | ".join(f"{k}: {v} 筆" for k, v in counts.items()))
+    return counts
+
+
+def main(argv):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    if len(argv) < 2 or not all("=" in a for a in argv[1:]):
+        print("用法: python xlsx_export.py 輸出.xlsx 工作表=檔案.csv [工作表=檔案.csv ...]")
+        return 1
+    build_workbook(argv[0], dict(a.split("=", 1) for a in argv[1:]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,26 +1,29 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import time
 import os
 import logging
-import pandas as pd
-import random
-import threading
 import ssl
 import re
-import csv # 確保匯入 csv 模組
+import sys
 
 # SSL 修正
 ssl._create_default_https_context = ssl._create_unverified_context
 
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, NoAlertPresentException
+from selenium.common.exceptions import TimeoutException
+
+# 共用模組放在上一層 (高雄市/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from permit_http import KaohsiungHttpEngine
+from permit_crawler import CityAdapter, CrawlSettings, PermitCrawler, run_city, city_main
+from driver_pool import DriverPool
+from page_waits import POLL_SECONDS, wait_first, alert_present, element_present, js_truthy, idle_for, after
+from crawl_metrics import timed
+from crawl_checkpoint import FOUND, EMPTY, FAILED
+from field_extractor import FieldExtractor, FieldSpec, license_pattern, placeholder_license
+from address_resolver import AddressResolver, county_aliases
 
 # 設定 Log
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
@@ -28,7 +31,10 @@ logger = logging.getLogger(__name__)
 
 # ==========================================
 # 🎯 設定存檔路徑
-BASE_PATH = r'/Users/wangliwen/Desktop/ JLL/陌生開發/建築存根/高雄市'
+BASE_PATH = os.environ.get("KCG_OUTPUT_DIR", r'/Users/wangliwen/Desktop/ JLL/陌生開發/建築存根/高雄市')
+
+# 🌐 查詢站 (壓力測試時可用環境變數指向 mock_permit_server.py)
+SITE_ROOT = os.environ.get("KCG_SITE_ROOT", "https://buildmis.kcg.gov.tw").rstrip("/")
 
 # 🎯 設定年份
 TARGET_YEARS = ["114", "113", "112", "111", "110"]
@@ -39,8 +45,68 @@ END_NUM = 3000
 
 # 🛑 停損設定
 MAX_CONSECUTIVE_FAILS = 20
+
+# 🧭 上限探測: 先用指數 / 二分探測估出每年發到幾號，只密集掃描 [START_NUM, 上限 + 邊界]，尾段抽樣
+# (開啟時密集區不再用連續空號停損，中段空號區不會提早結束)
+RANGE_DISCOVERY = True
+DISCOVERY_WINDOW = 5       # 每個探測點看幾個連號
+DISCOVERY_MARGIN = 50      # 上限之後多掃幾號
+DISCOVERY_SAMPLE_STEP = 25 # 尾段每隔幾號抽查一次
+
+# 🔁 執行模式: "full" = 整年掃描；"incremental" = 每日增量，只從上次最高有資料的號碼 (前沿) 往後查，
+#    並重查前沿前 RECHECK_WINDOW 號內的空號 (晚上架的執照)。可用環境變數 KCG_CRAWL_MODE 切換
+CRAWL_MODE = os.environ.get("KCG_CRAWL_MODE", "full")
+RECHECK_WINDOW = 50
+INCREMENTAL_YEARS = None   # None = 今年 + 去年 (民國)
+
+# 🧵 排程設定: 全域同時查詢數 / 每秒查詢次數上限 (同一主機，實際速率由 AIMD 依延遲與錯誤自動調整)
+CONCURRENCY = 5
+HOST_RATE_LIMIT = 1.0
+HOST_INITIAL_RATE = 0.4  # 起始速率 (每秒)，之後依回應自動加減速
+
+# 📑 一號多筆時詳情頁同時抓幾個 (直連 = 平行請求，瀏覽器 = 同時開幾個分頁)；1 = 逐筆
+DETAIL_CONCURRENCY = 4
+
+# ⚡ 查詢引擎: "http" = 直連優先，失敗才退回 Selenium；"selenium" = 只用瀏覽器
+ENGINE = "http"
+
+# 🪶 瀏覽器模式: "lean" = 不載圖片 / 字型 / CSS / 統計追蹤、eager 載入；"full" = 完整 Chrome (畫面異常時切回)
+BROWSER_PROFILE = "lean"
+
+# 📝 CSV 批次寫入: 累積幾筆或幾秒寫一次；durability = "fsync" / "flush" / "none"
+CSV_FLUSH_ROWS = 50
+CSV_FLUSH_SECONDS = 5.0
+CSV_DURABILITY = "fsync"
+
+# 🗄️ SQLite 資料庫 (WAL)：依 (城市, 年份, 執照號碼) upsert，CSV 照寫；None = 不寫資料庫
+#    兩個城市想放同一個檔，可用環境變數 PERMIT_DB 指向同一路徑
+SQLITE_PATH = os.environ.get("PERMIT_DB", os.path.join(BASE_PATH, "permits.sqlite"))
+
+# 📦 回應快取: 查詢結果 / 詳情頁文字壓縮存本機，重試、重跑時已抓過的頁面不再連網；None = 不快取
+#    超過 CACHE_TTL_DAYS 天視為過期，總大小超過 CACHE_MAX_MB 從最久沒用的開始刪
+RESPONSE_CACHE = os.path.join(BASE_PATH, "response_cache.sqlite")
+CACHE_TTL_DAYS = 7
+CACHE_MAX_MB = 512
+
+# 📚 原始頁面存檔: 每個詳情頁的 innerText 存一份 (內容相同只存一份)；改了解析邏輯後執行
+#    `python 本腳本.py reparse` 從這裡重建 CSV / 資料庫，不用重爬 (parser_bench.py 也讀這裡)；None = 不存
+#    CAPTURE_HTML = True 另存原始 HTML (比對直連 / 瀏覽器文字差異時用，佔空間)
+CAPTURE_DIR = os.path.join(BASE_PATH, "raw_pages")
+CAPTURE_HTML = False
+
+# 📊 指標端點: http://127.0.0.1:9108/metrics (Prometheus 格式)，結束時另印摘要；None = 不開端點
+METRICS_PORT = 9108
 # ==========================================
 
+CSV_COLUMNS = [
+    "搜尋編號", "執照號碼", "起造人", "行政區", "建築地點", 
+    "使用分區", "層棟戶數", "基地面積(合計)", "建築面積(其他)", 
+    "法定空地面積", "總樓地板面積", "發照日期", "使用類組"
+]
+
+# 🚗 瀏覽器池 (只在 Selenium 路徑用到時才真的開 Chrome)
+DRIVER_POOL = DriverPool(size=CONCURRENCY, profile=BROWSER_PROFILE)
+
 # 📍 高雄市 38 行政區
 KAOHSIUNG_DISTRICTS = [
     "楠梓區", "左營區", "鼓山區", "三民區", "鹽埕區", "前金區", "新興區", "苓雅區", "前鎮區", "旗津區", "小港區", 
@@ -49,72 +115,75 @@ KAOHSIUNG_DISTRICTS = [
     "旗山區", "美濃區", "內門區", "杉林區", "甲仙區", "六龜區", "茂林區", "桃源區", "那瑪夏區"
 ]
 
-class KaohsiungDataSafeScraper:
-    def __init__(self, target_year, start_num, end_num, output_filename):
-        self.url = "https://buildmis.kcg.gov.tw/bupic/pages/querylic"
-        self.target_year = target_year
-        self.start_num = start_num
-        self.end_num = end_num
-        # 🔥 強制將檔名改為 .csv，避免 Excel 開不起來
-        self.output_filename = output_filename.replace(".xlsx", ".csv")
-        self.csv_filename = self.output_filename
-        self.driver = None
-        self.target_folder = os.path.join(BASE_PATH, self.target_year)
-        if not os.path.exists(self.target_folder):
-            try: os.makedirs(self.target_folder)
-            except: pass
-        self.init_csv()
-
-    def init_csv(self):
-        csv_path = os.path.join(self.target_folder, self.csv_filename)
-        # 只有當檔案不存在時才寫入 Header
-        if not os.path.exists(csv_path):
-            columns = [
-                "搜尋編號", "執照號碼", "起造人", "行政區", "建築地點", 
-                "使用分區", "層棟戶數", "基地面積(合計)", "建築面積(其他)", 
-                "法定空地面積", "總樓地板面積", "發照日期", "使用類組"
-            ]
-            try:
-                with open(csv_path, mode='w', newline='', encoding='utf-8-sig') as f:
-                    writer = csv.DictWriter(f, fieldnames=columns)
-                    writer.writeheader()
-                    f.flush() # 強制寫入
-                logger.info(f"📁 [{self.target_year}] CSV 建立成功: {csv_path}")
-            except Exception as e:
-                logger.error(f"❌ CSV 建立失敗: {e}")
-
-    def save_row_to_csv(self, record):
-        """🔥 數據保全核心：寫入後立即 Flush"""
-        csv_path = os.path.join(self.target_folder, self.csv_filename)
-        try:
-            with open(csv_path, mode='a', newline='', encoding='utf-8-sig') as f:
-                writer = csv.DictWriter(f, fieldnames=record.keys())
-                writer.writerow(record)
-                f.flush() # 🔥 關鍵：確保資料寫入硬碟，防止崩潰遺失
-                os.fsync(f.fileno()) # 雙重保險
-        except Exception as e:
-            logger.error(f"❌ 寫入 CSV 失敗: {e}")
-
-    def init_driver(self):
-        options = Options()
-        options.add_argument('--headless=new') 
-        options.add_argument('--disable-gpu')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--window-size=1920,1080')
-        options.add_argument("user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-        self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-
-    def close_driver(self):
-        if self.driver:
-            try: self.driver.quit()
-            except: pass
-            self.driver = None
-
-    def js_click(self, element):
-        self.driver.execute_script("arguments[0].click();", element)
-
-    def get_captcha_vue(self):
+# 🧩 詳情頁欄位規格 (編譯一次，一頁一次抽完)
+DETAIL_FIELDS = FieldExtractor([
+    FieldSpec("姓名", ["姓名"], ["事務所", "電話"]),
+    FieldSpec("起造人", ["起造人"], ["設計人"]),
+    FieldSpec("建築地點", ["建築地點", "地號"], ["使用分區", "基地面積"]),
+    FieldSpec("使用分區", ["使用分區"], ["基地面積", "建物概要"]),
+    FieldSpec("層棟戶數", ["層棟戶數"], ["設計建蔽率", "法定空地"]),
+    FieldSpec("基地面積(合計)", ["合計", "基地面積"], ["㎡", "m2", "騎樓"]),
+    FieldSpec("法定空地面積", ["法定空地面積", "法定空地"], ["㎡", "m2"]),
+    FieldSpec("總樓地板面積", ["總樓地板面積", "樓地板面積"], ["㎡", "m2"]),
+    FieldSpec("發照日期", ["發照日期"], ["注意事項"]),
+    FieldSpec("使用類組", ["使用類組"], ["備註"], block=True, max_len=100, clip_always=True, strip_colon=False),
+])
+LICENSE_FALLBACK_RE = re.compile(r"((高市|高建|府建).*?字.*?號)")
+DISTRICT_FALLBACK_RE = re.compile(r"(.+?[區鄉鎮市])")
+
+# 📍 地址解析 (行政區與舊名一次掃完)：原高雄縣各鄉鎮市舊名 (鳳山市、岡山鎮…) 對到現在的區，
+#    三民鄉 2008 年改名那瑪夏鄉，和市區的三民區分開
+ADDRESS_RESOLVER = AddressResolver(
+    KAOHSIUNG_DISTRICTS,
+    aliases={**county_aliases(KAOHSIUNG_DISTRICTS[KAOHSIUNG_DISTRICTS.index("鳳山區"):]), "三民鄉": "那瑪夏區"},
+    fallback_re=DISTRICT_FALLBACK_RE,
+)
+
+def parse_detail_text(full_text, search_num, target_year):
+    """詳情頁 innerText → 一筆紀錄 (不碰瀏覽器 / 檔案，可離線重跑)"""
+    license_no = ""
+    match = license_pattern(target_year).search(full_text)
+    if match: license_no = match.group(1)
+    else:
+        match = LICENSE_FALLBACK_RE.search(full_text)
+        license_no = match.group(1) if match else ""
+    if not license_no: license_no = placeholder_license(search_num, full_text)
+
+    v = DETAIL_FIELDS.extract(full_text)
+    builder = v["姓名"] or v["起造人"]
+
+    raw_location = v["建築地點"]
+    addr = ADDRESS_RESOLVER.resolve(raw_location)
+    district = addr.district
+    clean_location = raw_location.replace(addr.matched, "").strip() if addr.matched else raw_location
+
+    return {
+        "搜尋編號": search_num,
+        "執照號碼": license_no,
+        "起造人": builder,
+        "行政區": district,
+        "建築地點": clean_location,
+        "使用分區": v["使用分區"],
+        "層棟戶數": v["層棟戶數"],
+        "基地面積(合計)": v["基地面積(合計)"],
+        "建築面積(其他)": "",
+        "法定空地面積": v["法定空地面積"],
+        "總樓地板面積": v["總樓地板面積"],
+        "發照日期": v["發照日期"],
+        "使用類組": v["使用類組"]
+    }
+
+class KaohsiungAdapter(CityAdapter):
+    """🔌 高雄市查詢站：Vue 查詢頁，驗證碼直接從 Vue 實例讀"""
+    city = "高雄市"
+    query_path = "/bupic/pages/querylic"
+    http_engine_class = KaohsiungHttpEngine
+    result_link_locator = (By.CSS_SELECTOR, "table.licstable a")
+    districts = KAOHSIUNG_DISTRICTS
+    # loading_div 出現過、消失後這麼久還沒有 alert / 結果表格，就判定失敗
+    result_idle_seconds = 3.0
+
+    def get_captcha_vue(self, driver):
         try:
             script = """
                 var app = document.querySelector('#wrapper');
@@ -126,229 +195,84 @@ class KaohsiungDataSafeScraper:
                 }
                 return "";
             """
-            code = self.driver.execute_script(script)
+            code = driver.execute_script(script)
             if code: return str(code).replace('"', '').replace("'", "").strip()
         except: pass
         return ""
 
-    def get_full_text_safe(self):
-        try: return self.driver.execute_script("var text = document.body.innerText; return text;")
-        except: return ""
-
-    def extract_value_from_text(self, text_source, start_keywords, end_keywords=None):
-        for key in start_keywords:
-            if key in text_source:
-                try:
-                    temp = text_source.split(key, 1)[1].strip()
-                    if temp.startswith(":") or temp.startswith("："): temp = temp[1:].strip()
-                    if end_keywords:
-                        for end_key in end_keywords:
-                            if end_key in temp:
-                                temp = temp.split(end_key, 1)[0].strip()
-                                break
-                    lines = temp.split('\n')
-                    if lines: return lines[0].strip()
-                except: continue
-        return ""
+    def fill_query_form(self, driver, year, num_str):
+        # 隱藏 footer
+        try: driver.execute_script("document.querySelector('.footer').style.display='none';")
+        except: pass
 
-    def process_detail_page(self, search_num):
-        try:
-            # logger.info(f"   Using process_detail_page for {search_num}...")
-            WebDriverWait(self.driver, 15).until(EC.presence_of_element_located((By.TAG_NAME, "table")))
-            full_text = self.get_full_text_safe()
-            
-            license_no = ""
-            match = re.search(fr"(\(\s*{self.target_year}\s*\).*?號)", full_text)
-            if match: license_no = match.group(1)
-            else:
-                match = re.search(r"((高市|高建|府建).*?字.*?號)", full_text)
-                license_no = match.group(1) if match else ""
-            if not license_no: license_no = f"[需人工確認] {search_num}"
-            
-            builder = self.extract_value_from_text(full_text, ["姓名"], ["事務所", "電話"]) 
-            if not builder: builder = self.extract_value_from_text(full_text, ["起造人"], ["設計人"])
-
-            raw_location = self.extract_value_from_text(full_text, ["建築地點", "地號"], ["使用分區", "基地面積"])
-            district = ""
-            clean_location = raw_location
-            for dist in KAOHSIUNG_DISTRICTS:
-                if dist in raw_location:
-                    district = dist
-                    clean_location = raw_location.replace(dist, "").strip()
-                    break
-            
-            if not district:
-                match_loc = re.search(r"(.+?[區鄉鎮市])", raw_location)
-                if match_loc:
-                    district = match_loc.group(1)
-                    clean_location = raw_location.replace(district, "").strip()
-
-            zoning = self.extract_value_from_text(full_text, ["使用分區"], ["基地面積", "建物概要"])
-            units = self.extract_value_from_text(full_text, ["層棟戶數"], ["設計建蔽率", "法定空地"])
-            site_area = self.extract_value_from_text(full_text, ["合計", "基地面積"], ["㎡", "m2", "騎樓"])
-            legal_open = self.extract_value_from_text(full_text, ["法定空地面積", "法定空地"], ["㎡", "m2"])
-            floor_area = self.extract_value_from_text(full_text, ["總樓地板面積", "樓地板面積"], ["㎡", "m2"])
-            date = self.extract_value_from_text(full_text, ["發照日期"], ["注意事項"])
-            
-            usage_data = ""
-            if "使用類組" in full_text:
-                try: usage_data = full_text.split("使用類組", 1)[1].split("備註", 1)[0].strip()[:100]
-                except: pass
-
-            record = {
-                "搜尋編號": search_num,
-                "執照號碼": license_no,
-                "起造人": builder,
-                "行政區": district,
-                "建築地點": clean_location,
-                "使用分區": zoning,
-                "層棟戶數": units,
-                "基地面積(合計)": site_area,
-                "建築面積(其他)": "",
-                "法定空地面積": legal_open,
-                "總樓地板面積": floor_area,
-                "發照日期": date,
-                "使用類組": usage_data
-            }
-            
-            # 🔥 關鍵：立即存檔
-            self.save_row_to_csv(record)
-            logger.info(f"   ✅ [{self.target_year}年] 已寫入: {license_no} | {district}")
-
-        except Exception as e:
-            logger.error(f"   ❌ [{self.target_year}] 解析失敗: {e}")
-
-    def search_and_process_single_try(self, number_val):
-        num_str = f"{number_val:05d}"
-        
-        try:
-            self.driver.get(self.url)
-            # 隱藏 footer
-            try: self.driver.execute_script("document.querySelector('.footer').style.display='none';")
-            except: pass
-            
-            time.sleep(random.uniform(2.5, 4.5))
-            wait = WebDriverWait(self.driver, 20)
-
-            year_input = wait.until(EC.visibility_of_element_located((By.ID, "license_yy")))
-            year_input.clear()
-            year_input.send_keys(self.target_year)
-
-            no_input = self.driver.find_element(By.ID, "license_no1")
-            no_input.clear()
-            no_input.send_keys(num_str)
-
-            time.sleep(0.5)
-            code_text = self.get_captcha_vue()
-            
-            if code_text:
-                self.driver.find_element(By.ID, "inputCode").send_keys(code_text)
-                time.sleep(0.5)
-            else:
-                logger.warning(f"⚠️ [{num_str}] 驗證碼讀取失敗")
-                return False
-
-            btn = self.driver.find_element(By.ID, "btnLogin")
-            self.js_click(btn)
-            
-            # 智慧等待
-            try: WebDriverWait(self.driver, 2).until(EC.visibility_of_element_located((By.ID, "loading_div")))
-            except: pass
-            
-            try:
-                WebDriverWait(self.driver, 30).until(EC.invisibility_of_element_located((By.ID, "loading_div")))
-            except TimeoutException:
-                self.driver.refresh()
-                return False
-
-            # 檢查 Alert
-            try:
-                if EC.alert_is_present()(self.driver):
-                    alert = self.driver.switch_to.alert
-                    alert.accept()
-                    return False 
-            except NoAlertPresentException: pass
-
-            # 檢查表格
-            try:
-                WebDriverWait(self.driver, 5).until(EC.presence_of_element_located((By.CSS_SELECTOR, "table.licstable a")))
-                links = self.driver.find_elements(By.CSS_SELECTOR, "table.licstable a")
-                
-                if links:
-                    logger.info(f"🔎 [{self.target_year}年][{num_str}] 找到 {len(links)} 筆")
-                    main_window = self.driver.current_window_handle
-                    
-                    for i in range(len(links)):
-                        links = self.driver.find_elements(By.CSS_SELECTOR, "table.licstable a")
-                        if i >= len(links): break
-                        
-                        href = links[i].get_attribute('href')
-                        # 🔥 使用 JS 開新分頁
-                        self.driver.execute_script(f"window.open('{href}', '_blank');")
-                        time.sleep(2.0)
-                        
-                        new_window = [w for w in self.driver.window_handles if w != main_window][0]
-                        self.driver.switch_to.window(new_window)
-                        
-                        # 進入詳情頁
-                        self.process_detail_page(num_str)
-                        
-                        self.driver.close()
-                        self.driver.switch_to.window(main_window)
-                    return True
-            except: pass
-
-        except Exception as e:
-            logger.warning(f"⚠️ [{self.target_year}] 連線異常，冷卻 5 秒... {e}")
-            time.sleep(5)
-            self.close_driver()
-            self.init_driver()
-        
-        return False 
-
-    def run(self):
-        try:
-            self.init_driver()
-            logger.info(f"🟢 [{self.target_year}年] 數據保全版啟動 | 範圍: {self.start_num}~{self.end_num}")
-            
-            consecutive_fails = 0
-            
-            for i in range(self.start_num, self.end_num + 1):
-                success = False
-                for retry in range(2):
-                    if self.search_and_process_single_try(i):
-                        success = True
-                        break
-                    time.sleep(2)
-
-                if success:
-                    consecutive_fails = 0
-                else:
-                    consecutive_fails += 1
-                    if consecutive_fails % 10 == 0:
-                        logger.info(f"   [{self.target_year}年] 連續 {consecutive_fails} 筆無資料...")
-
-                if consecutive_fails >= MAX_CONSECUTIVE_FAILS: 
-                    logger.info(f"🛑 [{self.target_year}年] 連續 {MAX_CONSECUTIVE_FAILS} 筆無資料，結束。")
-                    break
-
-                time.sleep(random.uniform(2.5, 4.0))
-        except Exception as e:
-            logger.error(f"❌ 線程 [{self.target_year}] 崩潰: {e}")
-        finally:
-            self.driver.quit()
+        year_input = WebDriverWait(driver, 20).until(EC.visibility_of_element_located((By.ID, "license_yy")))
+        year_input.clear()
+        year_input.send_keys(year)
+
+        no_input = driver.find_element(By.ID, "license_no1")
+        no_input.clear()
+        no_input.send_keys(num_str)
+
+        # 等 Vue 掛載完、驗證碼產生 (取代固定 sleep)
+        with timed("驗證碼"):
+            try: code_text = WebDriverWait(driver, 10, poll_frequency=POLL_SECONDS).until(self.get_captcha_vue)
+            except TimeoutException: code_text = ""
+        if not code_text: return False
+        driver.find_element(By.ID, "inputCode").send_keys(code_text)
+
+        driver.execute_script("arguments[0].click();", driver.find_element(By.ID, "btnLogin"))
+        return True
+
+    def wait_for_results(self, driver):
+        # alert / 結果表格先到者；loading 結束後遲遲沒有兩者 = 失敗，續爬時會重查
+        # 剛送出時 loading 可能還沒顯示：先等它出現 (請求已送出) 才開始算閒置，否則慢一點的伺服器會被誤判失敗
+        loading_shown = js_truthy("var el = document.getElementById('loading_div'); return !!el && el.offsetParent !== null;")
+        loading_hidden = js_truthy("var el = document.getElementById('loading_div'); return !el || el.offsetParent === null;")
+        status = wait_first(driver, [
+            (EMPTY, alert_present()),
+            (FOUND, element_present(self.result_link_locator)),
+            (FAILED, after(loading_shown, idle_for(loading_hidden, self.result_idle_seconds))),
+        ], timeout=30)
+        if status == EMPTY:
+            driver.switch_to.alert.accept()
+        elif status is None:
+            driver.refresh()
+            return FAILED
+        return status
+
+    def parse_detail(self, full_text, search_num, year):
+        return parse_detail_text(full_text, search_num, year)
+
+ADAPTER = KaohsiungAdapter(SITE_ROOT)
+
+SETTINGS = CrawlSettings(
+    BASE_PATH, CSV_COLUMNS, start_num=START_NUM, end_num=END_NUM, max_consecutive_fails=MAX_CONSECUTIVE_FAILS,
+    max_retries=2, engine=ENGINE, concurrency=CONCURRENCY, host_rate_limit=HOST_RATE_LIMIT,
+    host_initial_rate=HOST_INITIAL_RATE, detail_concurrency=DETAIL_CONCURRENCY,
+    csv_flush_rows=CSV_FLUSH_ROWS, csv_flush_seconds=CSV_FLUSH_SECONDS, csv_durability=CSV_DURABILITY,
+    sqlite_path=SQLITE_PATH, capture_dir=CAPTURE_DIR, capture_html=CAPTURE_HTML,
+    range_discovery=RANGE_DISCOVERY, discovery_window=DISCOVERY_WINDOW, discovery_margin=DISCOVERY_MARGIN,
+    discovery_sample_step=DISCOVERY_SAMPLE_STEP,
+    crawl_mode=CRAWL_MODE, recheck_window=RECHECK_WINDOW, incremental_years=INCREMENTAL_YEARS,
+    metrics_port=METRICS_PORT, browser_profile=BROWSER_PROFILE,
+    cache_path=RESPONSE_CACHE, cache_ttl=CACHE_TTL_DAYS * 86400, cache_max_bytes=CACHE_MAX_MB * 2**20,
+)
+
+class KaohsiungDataSafeScraper(PermitCrawler):
+    """單一年份的高雄市 worker (流程在 permit_crawler.PermitCrawler)"""
+    def __init__(self, target_year, start_num, end_num, output_filename, engine=ENGINE, driver_pool=None):
+        # 🔥 強制將檔名改為 .csv，避免 Excel 開不起來
+        super().__init__(ADAPTER, SETTINGS, target_year, start_num, end_num, output_filename.replace(".xlsx", ".csv"),
+                         engine=engine, driver_pool=driver_pool or DRIVER_POOL)
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # 🧩 分片模式 (多個行程 / 多台主機)：plan 切租約、work 領租約來做、status 看進度
+        # ♻️ reparse：改了解析邏輯後，從 CAPTURE_DIR 存下的原始頁面重建 CSV / 資料庫，不用重爬
+        sys.exit(city_main(ADAPTER, SETTINGS, [TARGET_YEARS], "kaohsiung_v14"))
+
     print(f"🚀 啟動高雄市 v14 數據保全版")
-    print(f"✨ 特點: 強制 .csv 格式 | 立即寫入硬碟 | 平行執行")
-
-    threads = []
-    for year in TARGET_YEARS:
-        t = threading.Thread(target=lambda y: KaohsiungDataSafeScraper(y, START_NUM, END_NUM, f"kaohsiung_v14_{y}.xlsx").run(), args=(year,))
-        threads.append(t)
-        t.start()
-        print(f"⏳ 啟動 [{year}年] 線程，休息 10 秒再啟動下一個...")
-        time.sleep(10) 
-
-    for t in threads:
-        t.join()
+    print(f"✨ 特點: 強制 .csv 格式 | 立即寫入硬碟 | 共用佇列 {CONCURRENCY} 路平行 | 模式: {CRAWL_MODE}")
+
+    run_city(ADAPTER, SETTINGS, [TARGET_YEARS], lambda year, tag, stamp: f"kaohsiung_v14_{year}.csv",
+             driver_pool=DRIVER_POOL)